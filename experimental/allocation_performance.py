@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+
+'''Compare the cost of allocating and freeing regions with
+`pyglet.graphics.allocation.Allocator` against the previous implementation,
+which searched the allocated blocks linearly.
+
+A buffer is filled with a number of 4-vertex regions (as used by sprites),
+and every other region is freed, leaving holes throughout the buffer.  Then
+regions are repeatedly freed at random and new regions allocated, either of
+the same size (which fill the first hole) or of a larger size (which fit in
+no hole, and are allocated at the end of the buffer).
+
+Usage::
+
+    allocation_performance.py [regions [iterations]]
+
+'''
+
+__docformat__ = 'restructuredtext'
+__version__ = '$Id$'
+
+import random
+import sys
+import time
+
+import pyglet
+pyglet.options['shadow_window'] = False
+from pyglet.graphics import allocation
+
+REGIONS = (1000, 10000, 20000)
+ITERATIONS = 1000
+
+class LinearAllocator(object):
+    '''The previous allocator, with only `alloc` and `dealloc`.'''
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.starts = []
+        self.sizes = []
+
+    def set_capacity(self, size):
+        assert size > self.capacity
+        self.capacity = size
+
+    def alloc(self, size):
+        if not self.starts:
+            if size <= self.capacity:
+                self.starts.append(0)
+                self.sizes.append(size)
+                return 0
+            else:
+                raise allocation.AllocatorMemoryException(size)
+
+        free_start = self.starts[0] + self.sizes[0]
+        for i, (alloc_start, alloc_size) in \
+                enumerate(zip(self.starts[1:], self.sizes[1:])):
+            free_size = alloc_start - free_start
+            if free_size == size:
+                self.sizes[i] += free_size + alloc_size
+                del self.starts[i+1]
+                del self.sizes[i+1]
+                return free_start
+            elif free_size > size:
+                self.sizes[i] += size
+                return free_start
+            free_start = alloc_start + alloc_size
+
+        free_size = self.capacity - free_start
+        if free_size >= size:
+            self.sizes[-1] += size
+            return free_start
+
+        raise allocation.AllocatorMemoryException(
+            self.capacity + size - free_size)
+
+    def dealloc(self, start, size):
+        for i, (alloc_start, alloc_size) in \
+                enumerate(zip(*(self.starts, self.sizes))):
+            p = start - alloc_start
+            if p >= 0 and size <= alloc_size - p:
+                break
+
+        if p == 0 and size == alloc_size:
+            del self.starts[i]
+            del self.sizes[i]
+        elif p == 0:
+            self.starts[i] += size
+            self.sizes[i] -= size
+        elif size == alloc_size - p:
+            self.sizes[i] -= size
+        else:
+            self.sizes[i] = p
+            self.starts.insert(i + 1, start + size)
+            self.sizes.insert(i + 1, alloc_size - (p + size))
+
+def alloc(allocator, size):
+    try:
+        return allocator.alloc(size)
+    except allocation.AllocatorMemoryException, e:
+        allocator.set_capacity(max(allocator.capacity * 2,
+                                   e.requested_capacity))
+        return allocator.alloc(size)
+
+def run(allocator_class, regions, iterations, size):
+    random.seed(1)
+    allocator = allocator_class(16)
+    live = [(alloc(allocator, 4), 4) for i in range(regions)]
+    for start, region_size in live[::2]:
+        allocator.dealloc(start, region_size)
+    live = live[1::2]
+
+    start_time = time.time()
+    for i in range(iterations):
+        j = random.randrange(len(live))
+        allocator.dealloc(*live[j])
+        live[j] = (alloc(allocator, size), size)
+    return (time.time() - start_time) / iterations
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    if args:
+        counts = args[:1]
+    else:
+        counts = REGIONS
+    iterations = (args[1:] or [ITERATIONS])[0]
+
+    print 'Free one region and allocate another, %d iterations' % iterations
+    for size in (4, 6):
+        print 'Allocation size %d' % size
+        for regions in counts:
+            print '  %6d regions:' % regions,
+            for name, allocator_class in (('linear', LinearAllocator),
+                                          ('indexed', allocation.Allocator)):
+                t = run(allocator_class, regions, iterations, size)
+                print '%s %9.2f us ' % (name, t * 1000000),
+            print
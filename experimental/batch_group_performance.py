@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+'''Measure the cost of keeping a batch's draw list up to date while groups
+are added and removed every frame.
+
+A batch is filled with a number of groups, each holding a single vertex list.
+Each "frame" then deletes some of the vertex lists (emptying their groups),
+adds the same number of vertex lists in new groups, and updates the draw list
+as `Batch.draw` would.  No GL context is needed; vertex data is kept in
+system memory and nothing is rendered.
+
+Usage::
+
+    batch_group_performance.py [groups [churn [frames]]]
+
+'''
+
+__docformat__ = 'restructuredtext'
+__version__ = '$Id$'
+
+import gc
+import sys
+import time
+
+import pyglet
+pyglet.options['shadow_window'] = False
+from pyglet import graphics
+from pyglet.gl import GL_QUADS
+
+GROUPS = 10000
+CHURN = 1000
+FRAMES = 20
+
+def add(batch, parent, order):
+    group = graphics.OrderedGroup(order, parent)
+    return batch.add(4, GL_QUADS, group, 'v2f/none')
+
+def run(groups, churn, frames, parent=None):
+    batch = graphics.Batch()
+    vertex_lists = [add(batch, parent, i) for i in range(groups)]
+    batch._update_draw_list()
+
+    next_order = groups
+    update_time = 0.
+    gc.disable()
+    start = time.time()
+    for frame in range(frames):
+        for vertex_list in vertex_lists[:churn]:
+            vertex_list.delete()
+        del vertex_lists[:churn]
+        for i in range(churn):
+            vertex_lists.append(add(batch, parent, next_order))
+            next_order += 1
+
+        t = time.time()
+        batch._update_draw_list()
+        update_time += time.time() - t
+    total_time = time.time() - start
+    gc.enable()
+
+    assert len(batch._draw_list) == groups * 3 + (parent and 2 or 0)
+    return total_time / frames, update_time / frames
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    groups, churn, frames = args + [GROUPS, CHURN, FRAMES][len(args):]
+
+    print '%d groups, %d added and removed per frame, %d frames' % (
+        groups, churn, frames)
+    for name, parent in (('top-level', None),
+                         ('children of one group', graphics.Group())):
+        frame_time, update_time = run(groups, churn, frames, parent)
+        print '  %-24s %8.2f ms/frame (draw list update %.2f ms)' % (
+            name + ':', frame_time * 1000, update_time * 1000)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+'''Compare the time taken to move a number of sprites with `Sprite` and with
+`SpriteArray`.
+
+Each frame, every sprite is moved and rotated.  No window is opened and the
+batch is not drawn; only the cost of updating the vertex data is measured.
+
+Usage::
+
+    sprite_array_performance.py [sprites [frames]]
+
+'''
+
+__docformat__ = 'restructuredtext'
+__version__ = '$Id$'
+
+import sys
+import time
+
+import pyglet
+pyglet.options['shadow_window'] = False
+from pyglet import graphics, image, sprite
+from pyglet.gl import GL_TEXTURE_2D
+
+SPRITES = 10000
+FRAMES = 10
+
+def run_sprites(img, count, frames):
+    batch = graphics.Batch()
+    sprites = [sprite.Sprite(img, i % 640, i % 480, batch=batch)
+               for i in range(count)]
+    start = time.time()
+    for frame in range(frames):
+        for s in sprites:
+            s.x += 1
+            s.rotation += 1
+    return (time.time() - start) / frames
+
+def run_sprite_array(img, count, frames):
+    batch = graphics.Batch()
+    sprites = sprite.SpriteArray(img, count, batch=batch)
+    for i in range(count):
+        sprites.x[i] = i % 640
+        sprites.y[i] = i % 480
+    start = time.time()
+    for frame in range(frames):
+        if sprite.numpy is not None:
+            sprites.x += 1
+            sprites.rotation += 1
+        else:
+            for i in range(count):
+                sprites.x[i] += 1
+                sprites.rotation[i] += 1
+        sprites.update()
+    return (time.time() - start) / frames
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    count = (args[:1] or [SPRITES])[0]
+    frames = (args[1:] or [FRAMES])[0]
+
+    # The texture is never bound, so need not exist in OpenGL.
+    img = image.Texture(16, 16, GL_TEXTURE_2D, 1)
+    print '%d sprites, mean time per frame:' % count
+    print '  Sprite:      %8.2f ms' % (run_sprites(img, count, frames) * 1000)
+    print '  SpriteArray: %8.2f ms' % (
+        run_sprite_array(img, count, frames) * 1000)
@@ -135,6 +135,16 @@ if getattr(sys, 'frozen', None):
 #:     Otherwise the Carbon implementation is preferred.
 #:
 #:     **Since:** pyglet 1.2
+#: graphics_shrink_threshold
+#:     Fraction of a vertex domain's capacity below which its usage must
+#:     remain before its buffers are halved in size, or None (the default)
+#:     to never shrink them.  A value such as 0.25 suits applications that
+#:     delete many vertex lists.  See
+#:     `pyglet.graphics.vertexdomain.VertexDomain.shrink_threshold`.
+#: graphics_shrink_frames
+#:     Number of consecutive frames for which a vertex domain's usage must
+#:     remain below ``graphics_shrink_threshold`` before its buffers are
+#:     halved in size.
 #:
 options = {
     'audio': ('directsound', 'pulse', 'openal', 'silent'),
@@ -154,6 +164,8 @@ options = {
     'debug_win32': False,
     'debug_x11': False,
     'graphics_vbo': True,
+    'graphics_shrink_threshold': None,
+    'graphics_shrink_frames': 300,
     'shadow_window': True,
     'vsync': None,
     'xsync': True,
@@ -179,6 +191,8 @@ _option_types = {
     'debug_win32': bool,
     'debug_x11': bool,
     'graphics_vbo': bool,
+    'graphics_shrink_threshold': float,
+    'graphics_shrink_frames': int,
     'shadow_window': bool,
     'vsync': bool,
     'xsync': bool,
@@ -214,6 +228,8 @@ def _read_environment():
                 options[key] = value in ('true', 'TRUE', 'True', '1')
             elif _option_types[key] is int:
                 options[key] = int(value)
+            elif _option_types[key] is float:
+                options[key] = float(value)
         except KeyError:
             pass
 _read_environment()
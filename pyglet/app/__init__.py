@@ -136,6 +136,41 @@ def exit():
     '''
     event_loop.exit()
 
+_executor = None
+
+def get_executor():
+    '''Get the executor used by `run_in_executor`.
+
+    The executor is created the first time it is needed.
+
+    :since: pyglet 1.2
+
+    :rtype: `pyglet.app.executor.Executor`
+    '''
+    global _executor
+    if _executor is None:
+        from pyglet.app.executor import Executor
+        _executor = Executor()
+    return _executor
+
+def run_in_executor(func, *args, **kwargs):
+    '''Run a function on a worker thread, and pass its result to a
+    callback on the main thread.
+
+    The callback is given as the ``callback`` keyword argument; other
+    arguments are passed to the function.  See
+    `pyglet.app.executor.Executor.submit` for details.
+
+    This is a convenience function, equivalent to::
+
+        pyglet.app.get_executor().submit(func, *args, **kwargs)
+
+    :since: pyglet 1.2
+
+    :rtype: `pyglet.app.executor.Job`
+    '''
+    return get_executor().submit(func, *args, **kwargs)
+
 from pyglet.app.base import EventLoop
 if _is_epydoc:
     from pyglet.app.base import PlatformEventLoop
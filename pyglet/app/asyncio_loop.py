@@ -0,0 +1,254 @@
+# ----------------------------------------------------------------------------
+# pyglet
+# Copyright (c) 2006-2008 Alex Holkner
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of pyglet nor the names of its
+#    contributors may be used to endorse or promote products
+#    derived from this software without specific prior written
+#    permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# ----------------------------------------------------------------------------
+
+'''Run the application on an asyncio event loop.
+
+Applications that use `asyncio` for networking or other work can let the
+asyncio event loop own the main thread, and run pyglet on it, instead of
+calling `pyglet.app.run`::
+
+    import asyncio
+    import pyglet
+    from pyglet.app.asyncio_loop import AsyncioEventLoop
+
+    window = pyglet.window.Window()
+    event_loop = AsyncioEventLoop()
+    pyglet.app.event_loop = event_loop
+    event_loop.run()
+
+The event loop calls the clock's scheduled functions when they are due,
+using ``loop.call_at``, and dispatches events posted with
+`PlatformEventLoop.post_event` as soon as they are posted, from any thread.
+While windows are open, their events are polled every `poll_interval`
+seconds.
+
+Coroutines can wait for the next clock tick, or for an amount of clock time,
+with the futures returned by `AsyncioEventLoop.wait_tick` and
+`AsyncioEventLoop.sleep_async`.
+
+The `asyncio` module is imported only when an `AsyncioEventLoop` is created
+without an asyncio event loop, or when the asyncio event loop has no
+``create_future`` method (Python 3.4 and early releases of 3.5).  On
+Python 2, where there is no `asyncio` module, `ImportError` is raised in
+these cases; an `AsyncioEventLoop` can still run on any object providing
+the parts of the asyncio event loop interface it uses (``time``,
+``call_at``, ``call_soon_threadsafe``, ``create_future`` and
+``run_until_complete``).
+
+:since: pyglet 1.2
+'''
+
+__docformat__ = 'restructuredtext'
+__version__ = '$Id: $'
+
+from pyglet import app
+from pyglet.app.base import EventLoop
+
+def _import_asyncio():
+    try:
+        import asyncio
+    except ImportError:
+        raise ImportError('AsyncioEventLoop requires the asyncio module '
+                          '(Python 3.4 or later), or an asyncio event loop')
+    return asyncio
+
+class AsyncioEventLoop(EventLoop):
+    '''Event loop that runs on an asyncio event loop.
+
+    :Ivariables:
+        `loop` : `asyncio.AbstractEventLoop`
+            The asyncio event loop.
+        `poll_interval` : float
+            Maximum time in seconds between polls for window events, while
+            windows are open.
+
+    '''
+    _idle_handle = None
+    _exit_future = None
+    _started = False
+    _old_notify = None
+
+    def __init__(self, loop=None, poll_interval=1 / 60.):
+        '''Create an event loop.
+
+        :Parameters:
+            `loop` : `asyncio.AbstractEventLoop`
+                The asyncio event loop to run on.  Defaults to
+                ``asyncio.get_event_loop()``.
+            `poll_interval` : float
+                Maximum time in seconds between polls for window events,
+                while windows are open.
+
+        '''
+        super(AsyncioEventLoop, self).__init__()
+        if loop is None:
+            loop = _import_asyncio().get_event_loop()
+        self.loop = loop
+        self.poll_interval = poll_interval
+
+    def run(self):
+        '''Run the asyncio event loop until `exit` is called.
+
+        Equivalent to calling `start`, running the asyncio event loop until
+        `exit` is called, then calling `stop`.
+        '''
+        self.start()
+        try:
+            self.loop.run_until_complete(self._exit_future)
+        finally:
+            self.stop()
+
+    def start(self):
+        '''Begin processing events, scheduled functions and window updates
+        on the asyncio event loop, without running it.
+
+        Use this if the application runs the asyncio event loop itself; call
+        `stop` once it has finished.
+        '''
+        self.has_exit = False
+        self._exit_future = self._create_future()
+        self._legacy_setup()
+
+        platform_event_loop = app.platform_event_loop
+        platform_event_loop.start()
+
+        # The platform event loop is not stepped while it waits for events,
+        # so cannot be notified of posted events in its usual way.  Any
+        # notify already set on the instance is restored by stop().
+        self._old_notify = platform_event_loop.__dict__.get('notify')
+        platform_event_loop.notify = self._notify
+        self._started = True
+
+        self.dispatch_event('on_enter')
+        self.is_running = True
+        self._schedule_idle(0)
+
+    def stop(self):
+        '''Stop processing events started by `start`.
+
+        Does nothing if `start` has not been called since the last call to
+        `stop`.
+        '''
+        if not self._started:
+            return
+        self._started = False
+
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        self.is_running = False
+        self.dispatch_event('on_exit')
+
+        platform_event_loop = app.platform_event_loop
+        if self._old_notify is not None:
+            platform_event_loop.notify = self._old_notify
+            self._old_notify = None
+        elif 'notify' in platform_event_loop.__dict__:
+            del platform_event_loop.notify
+        platform_event_loop.stop()
+
+    def wait_tick(self):
+        '''Get a future that is done at the next tick of the clock.
+
+        The result of the future is the time in seconds since the previous
+        tick.
+
+        :rtype: `asyncio.Future`
+        '''
+        return self.sleep_async(0)
+
+    def sleep_async(self, delay):
+        '''Get a future that is done after `delay` seconds of clock time.
+
+        Unlike ``asyncio.sleep``, this follows the event loop's `clock`; for
+        example, a `pyglet.clock.VirtualClock`.  The result of the future is
+        the actual time elapsed.  Unlike `EventLoop.sleep`, this does not
+        block.
+
+        :Parameters:
+            `delay` : float
+                Clock time to wait, in seconds.
+
+        :rtype: `asyncio.Future`
+        '''
+        future = self._create_future()
+        def callback(dt):
+            if not future.done():
+                future.set_result(dt)
+        handle = self.clock.schedule_once(callback, delay)
+        def cancel(future):
+            if future.cancelled():
+                handle.cancel()
+        future.add_done_callback(cancel)
+        self._schedule_idle(0)
+        return future
+
+    def _create_future(self):
+        if hasattr(self.loop, 'create_future'):
+            return self.loop.create_future()
+        return _import_asyncio().Future(loop=self.loop)
+
+    def _notify(self):
+        # Called from any thread when an event is posted, or exit called.
+        self.loop.call_soon_threadsafe(self._schedule_idle, 0)
+
+    def _schedule_idle(self, timeout):
+        # Run _idle after timeout seconds, or not until notified if None.
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        if timeout is not None:
+            self._idle_handle = self.loop.call_at(self.loop.time() + timeout,
+                                                  self._idle)
+
+    def _idle(self):
+        self._idle_handle = None
+        if not self.is_running:
+            return
+
+        platform_event_loop = app.platform_event_loop
+        platform_event_loop.dispatch_posted_events()
+        if app.windows:
+            platform_event_loop.step(0)
+
+        if self.has_exit:
+            if not self._exit_future.done():
+                self._exit_future.set_result(None)
+            return
+
+        timeout = self.idle()
+        if app.windows and self.poll_interval is not None:
+            if timeout is None or timeout > self.poll_interval:
+                timeout = self.poll_interval
+        self._schedule_idle(timeout)
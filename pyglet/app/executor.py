@@ -0,0 +1,344 @@
+# ----------------------------------------------------------------------------
+# pyglet
+# Copyright (c) 2006-2008 Alex Holkner
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of pyglet nor the names of its
+#    contributors may be used to endorse or promote products
+#    derived from this software without specific prior written
+#    permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# ----------------------------------------------------------------------------
+
+'''Run functions on a pool of threads, delivering their results on the main
+thread.
+
+Slow work, such as path finding or decoding images, can be moved off the
+main thread so that it does not delay drawing.  The function's result is
+passed to a callback on the main thread, through the event queue of
+`pyglet.app.platform_event_loop`, so the callback can safely use windows and
+OpenGL::
+
+    def on_path_found(path):
+        unit.follow(path)
+
+    job = pyglet.app.run_in_executor(find_path, start, goal,
+                                     callback=on_path_found)
+    ...
+    job.cancel()    # The unit was destroyed; on_path_found won't be called.
+
+Results are delivered while `pyglet.app.run` is running, or whenever the
+application calls `PlatformEventLoop.dispatch_posted_events`.
+
+:since: pyglet 1.2
+'''
+
+__docformat__ = 'restructuredtext'
+__version__ = '$Id: $'
+
+import sys
+import threading
+
+from pyglet import app
+from pyglet import event
+
+_is_epydoc = hasattr(sys, 'is_epydoc') and sys.is_epydoc
+
+class Job(object):
+    '''A function submitted to an `Executor`.
+
+    :Ivariables:
+        `func` : callable
+            The function.
+        `args` : tuple
+            Positional arguments to pass to the function.
+        `kwargs` : dict
+            Keyword arguments to pass to the function.
+        `callback` : callable
+            Function called on the main thread with the result, or None.
+        `error_callback` : callable
+            Function called on the main thread with the exception raised by
+            the function, or None.
+        `result` : object
+            Value returned by the function, once it has returned.
+        `exception` : Exception
+            Exception raised by the function, or None.  If the job has no
+            `error_callback`, this is the only way the exception is
+            reported.
+        `traceback` : traceback
+            Traceback of `exception`, or None.
+        `cancelled` : bool
+            True if `cancel` succeeded.
+
+    '''
+    # States of a job.
+    PENDING, RUNNING, FINISHED, DELIVERED = range(4)
+
+    result = None
+    exception = None
+    traceback = None
+    cancelled = False
+
+    def __init__(self, executor, func, args, kwargs,
+                 callback, error_callback):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.callback = callback
+        self.error_callback = error_callback
+
+        self._executor = executor
+        self._state = self.PENDING
+        self._finished = threading.Event()
+
+    def cancel(self):
+        '''Prevent the job's callbacks from being called.
+
+        If the function has not yet started, it is not run.  A function that
+        is already running cannot be interrupted, but its result is
+        discarded.
+
+        :rtype: bool
+        :return: False if the callback has already been called, otherwise
+            True.
+        '''
+        return self._executor._cancel(self)
+
+    def wait(self, timeout=None):
+        '''Block until the function has returned or raised an exception.
+
+        This does not wait for the callback, which is called later on the
+        main thread.  Unless the job was cancelled, the event delivering the
+        result has been posted by the time this returns, so a following call
+        to `PlatformEventLoop.dispatch_posted_events` calls the callback.
+        It should not be called on the main thread with a job that is
+        waiting for the main thread.
+
+        :Parameters:
+            `timeout` : float
+                Maximum time to wait, in seconds, or None to wait
+                indefinitely.
+
+        :rtype: bool
+        :return: True if the function has finished or the job was cancelled
+            before it started, False on timeout.
+        '''
+        self._finished.wait(timeout)
+        return self._finished.isSet()
+
+    def _run(self):
+        try:
+            self.result = self.func(*self.args, **self.kwargs)
+        except Exception, e:
+            self.exception = e
+            self.traceback = sys.exc_info()[2]
+
+class Executor(event.EventDispatcher):
+    '''Pool of worker threads running jobs in order of submission.
+
+    Threads are started as jobs are submitted, up to `max_workers`, and
+    wait for further jobs once started.
+    '''
+    def __init__(self, max_workers=4):
+        '''Create an executor.
+
+        :Parameters:
+            `max_workers` : int
+                Maximum number of threads to run jobs on.
+
+        '''
+        self.max_workers = max_workers
+
+        self._condition = threading.Condition()
+        self._queue = []
+        self._threads = []
+        self._idle_threads = 0
+        self._running_jobs = 0
+        self._stopped = False
+
+    def submit(self, func, *args, **kwargs):
+        '''Run a function on a worker thread.
+
+        Any positional and keyword arguments, other than ``callback`` and
+        ``error_callback``, are passed to the function.
+
+        :Parameters:
+            `func` : callable
+                The function to run.
+            `callback` : callable
+                Function to call on the main thread with the function's
+                result.
+            `error_callback` : callable
+                Function to call on the main thread with the exception, if
+                the function raises one.  Whether or not this is given, the
+                exception is stored on the job as `Job.exception`; it is
+                never raised on the main thread.
+
+        :rtype: `Job`
+        '''
+        callback = kwargs.pop('callback', None)
+        error_callback = kwargs.pop('error_callback', None)
+        job = Job(self, func, args, kwargs, callback, error_callback)
+
+        self._condition.acquire()
+        try:
+            if self._stopped:
+                raise RuntimeError('Executor has been shut down')
+            self._queue.append(job)
+            if (self._idle_threads < len(self._queue) and
+                len(self._threads) < self.max_workers):
+                thread = threading.Thread(target=self._run_worker)
+                thread.setDaemon(True)
+                self._threads.append(thread)
+                thread.start()
+            self._condition.notify()
+        finally:
+            self._condition.release()
+        return job
+
+    def _get_queue_depth(self):
+        self._condition.acquire()
+        result = len(self._queue)
+        self._condition.release()
+        return result
+
+    queue_depth = property(_get_queue_depth,
+                           doc='''Number of jobs waiting for a thread.
+
+    :type: int
+    ''')
+
+    def _get_running_jobs(self):
+        self._condition.acquire()
+        result = self._running_jobs
+        self._condition.release()
+        return result
+
+    running_jobs = property(_get_running_jobs,
+                            doc='''Number of jobs currently being run.
+
+    :type: int
+    ''')
+
+    def shutdown(self, wait=True):
+        '''Cancel all waiting jobs and stop the threads once their current
+        jobs finish.
+
+        :Parameters:
+            `wait` : bool
+                If True, block until the threads have stopped.
+
+        '''
+        self._condition.acquire()
+        self._stopped = True
+        for job in self._queue:
+            job.cancelled = True
+            job._finished.set()
+        del self._queue[:]
+        threads = list(self._threads)
+        self._condition.notifyAll()
+        self._condition.release()
+
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def _cancel(self, job):
+        self._condition.acquire()
+        try:
+            if job._state == job.DELIVERED:
+                return False
+            if job._state == job.PENDING:
+                self._queue.remove(job)
+                job._finished.set()
+            job.cancelled = True
+            return True
+        finally:
+            self._condition.release()
+
+    def _run_worker(self):
+        condition = self._condition
+        while True:
+            condition.acquire()
+            self._idle_threads += 1
+            while not self._queue and not self._stopped:
+                condition.wait()
+            self._idle_threads -= 1
+            if self._stopped:
+                self._threads.remove(threading.currentThread())
+                condition.release()
+                return
+            job = self._queue.pop(0)
+            job._state = job.RUNNING
+            self._running_jobs += 1
+            condition.release()
+
+            job._run()
+
+            condition.acquire()
+            job._state = job.FINISHED
+            self._running_jobs -= 1
+            cancelled = job.cancelled
+            condition.release()
+
+            # Post the event first, so that it is in the queue once wait()
+            # returns.
+            if not cancelled:
+                app.platform_event_loop.post_event(self, 'on_job_complete',
+                                                   job)
+            job._finished.set()
+
+    def on_job_complete(self, job):
+        # Default handler, on the main thread: call the job's callbacks.
+        self._condition.acquire()
+        try:
+            if job.cancelled:
+                return
+            job._state = job.DELIVERED
+        finally:
+            self._condition.release()
+
+        if job.exception is not None:
+            if job.error_callback is not None:
+                job.error_callback(job.exception)
+        elif job.callback is not None:
+            job.callback(job.result)
+
+    if _is_epydoc:
+        def on_job_complete(self, job):
+            '''A job's function has returned or raised an exception.
+
+            This event is dispatched on the main thread, for jobs that have
+            not been cancelled.  The default handler calls the job's
+            callbacks.
+
+            :Parameters:
+                `job` : `Job`
+                    The job.
+
+            :event:
+            '''
+
+Executor.register_event_type('on_job_complete')
@@ -102,6 +102,34 @@ You can cancel a function scheduled with any of these methods using
 
     clock.unschedule(animate)
 
+This removes every occurrence of the function from the schedule, and takes
+time proportional to the number of scheduled functions.  Each of the
+`schedule` methods also returns a handle, whose ``cancel`` method removes
+just that occurrence, in constant time::
+
+    handle = clock.schedule_once(explode, 5, sprite=alien)
+    ...
+    handle.cancel()
+
+Profiling scheduled functions
+=============================
+
+To find which scheduled functions are slowing down an application, enable
+profiling on the clock.  The time taken by each call of each scheduled
+function is then measured::
+
+    profile = clock.get_default().enable_profiling(threshold=0.01)
+
+    @profile.event
+    def on_slow_callback(func, duration):
+        print '%r took %f seconds' % (func, duration)
+
+    ...
+    for stats in profile.get_report():
+        print stats.func, stats.calls, stats.total_time, stats.max_time
+
+Profiling is disabled by default, when it has no cost.
+
 Displaying FPS
 ==============
 
@@ -136,16 +164,35 @@ limiting/measurement.  Each clock must be "ticked" separately.
 Multiple and derived clocks potentially allow you to separate "game-time" and
 "wall-time", or to synchronise your clock to an audio or video stream instead
 of the system clock.
+
+Simulating time
+===============
+
+A `VirtualClock` never sleeps or reads the system time.  Each `tick` moves
+its time straight to when the next scheduled function is due, so that a
+simulation runs as fast as the CPU allows, and gives the same results each
+time it is run::
+
+    clk = clock.VirtualClock()
+    clk.schedule_interval(update_world, 1 / 60.)
+    clk.schedule_once(end_of_level, 300)
+    clk.advance(300)    # Calls update_world 18000 times, then end_of_level
 '''
 
 __docformat__ = 'restructuredtext'
 __version__ = '$Id$'
 
+import bisect
+import heapq
+import math
 import time
 import sys
 import ctypes
 
 import pyglet.lib
+from pyglet import event
+
+_is_epydoc = hasattr(sys, 'is_epydoc') and sys.is_epydoc
 
 if sys.platform in ('win32', 'cygwin'):
     # Win32 Sleep function is only 10-millisecond resolution, so instead
@@ -175,22 +222,38 @@ else:
     _default_time_function = time.time
 
 class _ScheduledItem(object):
-    __slots__ = ['func', 'args', 'kwargs']
-    def __init__(self, func, args, kwargs):
+    __slots__ = ['func', 'args', 'kwargs', 'clock']
+    def __init__(self, func, args, kwargs, clock):
         self.func = func
         self.args = args
         self.kwargs = kwargs
+        self.clock = clock
+
+    def cancel(self):
+        '''Remove this function from the clock's schedule.  No error is
+        raised if it has already been removed.
+        '''
+        self.clock._cancel_item(self)
 
 class _ScheduledIntervalItem(object):
+    # next_ts is None while the item is not in the clock's scheduler: after
+    # a one-shot is called, or while it is being called.
     __slots__ = ['func', 'interval', 'last_ts', 'next_ts', 
-                 'args', 'kwargs']
-    def __init__(self, func, interval, last_ts, next_ts, args, kwargs):
+                 'args', 'kwargs', 'clock']
+    def __init__(self, func, interval, last_ts, next_ts, args, kwargs, clock):
         self.func = func
         self.interval = interval
         self.last_ts = last_ts
         self.next_ts = next_ts
         self.args = args
         self.kwargs = kwargs
+        self.clock = clock
+
+    def cancel(self):
+        '''Remove this function from the clock's schedule.  No error is
+        raised if it has already been called or removed.
+        '''
+        self.clock._cancel_interval_item(self)
 
 def _dummy_schedule_func(*args, **kwargs):
     '''Dummy function that does nothing, placed onto zombie scheduled items
@@ -198,6 +261,259 @@ def _dummy_schedule_func(*args, **kwargs):
     '''
     pass
 
+class CallbackStatistics(object):
+    '''Statistics of the calls to one scheduled function.
+
+    :Ivariables:
+        `func` : function
+            The scheduled function.
+        `calls` : int
+            Number of times the function was called.
+        `total_time` : float
+            Total time spent in the function, in seconds.
+        `max_time` : float
+            Longest time spent in a single call, in seconds.
+
+    '''
+    def __init__(self, func):
+        self.func = func
+        self.calls = 0
+        self.total_time = 0.
+        self.max_time = 0.
+
+    def __repr__(self):
+        return '%s(%r, calls=%d, total_time=%f, max_time=%f)' % (
+            self.__class__.__name__, self.func,
+            self.calls, self.total_time, self.max_time)
+
+class ClockProfile(event.EventDispatcher):
+    '''Times the functions called by a clock.
+
+    Use `Clock.enable_profiling` to construct a profile.
+
+    :Ivariables:
+        `threshold` : float
+            Duration in seconds above which a call dispatches
+            `on_slow_callback`.
+        `time` : function
+            Function returning the current time, used to measure calls.
+
+    '''
+    def __init__(self, threshold, time_function=_default_time_function):
+        self.threshold = threshold
+        self.time = time_function
+        self._statistics = {}
+
+    def get_report(self):
+        '''Get the statistics of each function called since profiling was
+        enabled or last reset.
+
+        :rtype: list of `CallbackStatistics`
+        :return: The statistics, in descending order of total time.
+        '''
+        report = self._statistics.values()
+        report.sort(key=lambda stats: stats.total_time, reverse=True)
+        return report
+
+    def reset(self):
+        '''Discard the statistics of all functions.'''
+        self._statistics.clear()
+
+    def _call(self, func, dt, args, kwargs):
+        start = self.time()
+        func(dt, *args, **kwargs)
+        duration = self.time() - start
+
+        stats = self._statistics.get(func)
+        if stats is None:
+            stats = self._statistics[func] = CallbackStatistics(func)
+        stats.calls += 1
+        stats.total_time += duration
+        if duration > stats.max_time:
+            stats.max_time = duration
+
+        if duration > self.threshold:
+            self.dispatch_event('on_slow_callback', func, duration)
+
+    if _is_epydoc:
+        def on_slow_callback(self, func, duration):
+            '''A scheduled function took longer than `threshold` to return.
+
+            :Parameters:
+                `func` : function
+                    The scheduled function.
+                `duration` : float
+                    Time taken by the call, in seconds.
+
+            :event:
+            '''
+
+ClockProfile.register_event_type('on_slow_callback')
+
+class _IntervalHeap(object):
+    '''Binary heap of schedule interval items.
+
+    Removed items are left in the heap, recognised by their func having been
+    replaced with `_dummy_schedule_func`, until they reach the top or make up
+    most of the heap.
+    '''
+    def __init__(self):
+        # Heap of (next_ts, sequence, item).  The sequence number orders
+        # items due at the same time by when they were scheduled.
+        self._heap = []
+        self._sequence = 0
+        self._removed = 0
+
+    def __len__(self):
+        return len(self._heap) - self._removed
+
+    def __iter__(self):
+        for next_ts, sequence, item in self._heap:
+            if item.func is not _dummy_schedule_func:
+                yield item
+
+    def push(self, item):
+        heapq.heappush(self._heap, (item.next_ts, self._sequence, item))
+        self._sequence += 1
+
+    def remove(self, item):
+        # The item's func must already have been replaced.
+        self._removed += 1
+        if self._removed * 2 > len(self._heap):
+            self._heap = [entry for entry in self._heap
+                          if entry[2].func is not _dummy_schedule_func]
+            heapq.heapify(self._heap)
+            self._removed = 0
+
+    def pop_due(self, ts):
+        heap = self._heap
+        due = []
+        while heap and heap[0][0] <= ts:
+            item = heapq.heappop(heap)[2]
+            if item.func is _dummy_schedule_func:
+                self._removed -= 1
+            else:
+                due.append(item)
+        return due
+
+    def get_next_ts(self):
+        heap = self._heap
+        while heap and heap[0][2].func is _dummy_schedule_func:
+            heapq.heappop(heap)
+            self._removed -= 1
+        if heap:
+            return heap[0][0]
+        return None
+
+class _TimerWheel(object):
+    '''Hashed timer wheel of schedule interval items.
+
+    Time is divided into ticks of `resolution` seconds, and each item is kept
+    in the slot of the tick it is due in, modulo the number of slots.  Items
+    are pushed and removed in constant time; finding the elapsed items visits
+    each slot elapsed since the previous search, including items due in later
+    revolutions of the wheel.
+    '''
+    slots = 512
+
+    def __init__(self, resolution):
+        self.resolution = float(resolution)
+        self._buckets = [set() for i in range(self.slots)]
+
+        # Map of item to (slot, sequence).
+        self._items = {}
+        self._sequence = 0
+
+        # Last tick whose slot contains no elapsed items, or None if the
+        # wheel has not yet been searched.
+        self._tick = None
+
+        # Cached result of get_next_ts, valid if _next_ts_valid.
+        self._next_ts = None
+        self._next_ts_valid = True
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items.keys())
+
+    def _get_tick(self, ts):
+        return int(math.floor(ts / self.resolution))
+
+    def push(self, item):
+        # Items due in a tick already searched are put in the next tick to
+        # be searched.
+        tick = self._get_tick(item.next_ts)
+        if self._tick is not None and tick <= self._tick:
+            tick = self._tick + 1
+        slot = tick % self.slots
+        self._buckets[slot].add(item)
+        self._items[item] = (slot, self._sequence)
+        self._sequence += 1
+
+        if self._next_ts_valid and (self._next_ts is None or
+                                    item.next_ts < self._next_ts):
+            self._next_ts = item.next_ts
+
+    def remove(self, item):
+        slot, sequence = self._items.pop(item)
+        self._buckets[slot].remove(item)
+        if item.next_ts == self._next_ts:
+            self._next_ts_valid = False
+
+    def pop_due(self, ts):
+        target = self._get_tick(ts)
+        if self._tick is None:
+            start = target - self.slots + 1
+        else:
+            start = max(self._tick + 1, target - self.slots + 1)
+
+        due = []
+        items = self._items
+        for tick in xrange(start, target + 1):
+            bucket = self._buckets[tick % self.slots]
+            for item in [item for item in bucket if item.next_ts <= ts]:
+                bucket.remove(item)
+                slot, sequence = items.pop(item)
+                due.append((item.next_ts, sequence, item))
+
+        # Items due later in the target tick may remain in its slot.
+        if self._tick is None or target - 1 > self._tick:
+            self._tick = target - 1
+        if due:
+            self._next_ts_valid = False
+            due.sort()
+        return [item for next_ts, sequence, item in due]
+
+    def get_next_ts(self):
+        if not self._items:
+            return None
+        if self._next_ts_valid:
+            return self._next_ts
+
+        next_ts = None
+        if self._tick is not None:
+            # The earliest item is in the first slot, searching from the
+            # next tick, containing an item due in that slot's tick.
+            resolution = self.resolution
+            for tick in xrange(self._tick + 1, self._tick + 1 + self.slots):
+                end_ts = (tick + 1) * resolution
+                for item in self._buckets[tick % self.slots]:
+                    if (item.next_ts < end_ts and
+                        (next_ts is None or item.next_ts < next_ts)):
+                        next_ts = item.next_ts
+                if next_ts is not None:
+                    break
+
+        if next_ts is None:
+            # All items are more than one revolution in the future.
+            next_ts = min([item.next_ts for item in self._items])
+
+        self._next_ts = next_ts
+        self._next_ts_valid = True
+        return next_ts
+
 class Clock(_ClockBase):
     '''Class for calculating and limiting framerate, and for calling scheduled
     functions.
@@ -218,13 +534,24 @@ class Clock(_ClockBase):
     # List of functions to call every tick.
     _schedule_items = None
 
-    # List of schedule interval items kept in sort order.
+    # Number of cancelled items left in _schedule_items.
+    _cancelled_schedule_items = 0
+
+    # Schedule interval items, in an _IntervalHeap or _TimerWheel.
     _schedule_interval_items = None
 
+    # Elapsed interval items being called by call_scheduled_functions.
+    _due_interval_items = ()
+
     # If True, a sleep(0) is inserted on every tick.   
     _force_sleep = False
 
-    def __init__(self, fps_limit=None, time_function=_default_time_function):
+    #: The `ClockProfile` timing scheduled functions, if profiling is
+    #: enabled; otherwise None.
+    profile = None
+
+    def __init__(self, fps_limit=None, time_function=_default_time_function,
+                 scheduler='heap', resolution=0.01):
         '''Initialise a Clock, with optional framerate limit and custom
         time function.
 
@@ -236,6 +563,18 @@ class Clock(_ClockBase):
                 Function to return the elapsed time of the application, 
                 in seconds.  Defaults to time.time, but can be replaced
                 to allow for easy time dilation effects or game pausing.
+            `scheduler` : str
+                How functions scheduled with `schedule_interval`,
+                `schedule_interval_soft` and `schedule_once` are kept.
+                ``"heap"`` (the default) suits most applications;
+                ``"wheel"`` uses a hashed timer wheel, which is faster for
+                very many functions, particularly if most are unscheduled
+                before they are called.
+            `resolution` : float
+                Width in seconds of each slot of the timer wheel, if
+                `scheduler` is ``"wheel"``.  Functions are still called at
+                the first tick after they are due; this should be about the
+                period of the clock's ticks.
 
         '''
 
@@ -249,7 +588,12 @@ class Clock(_ClockBase):
         self.cumulative_time = 0
 
         self._schedule_items = []
-        self._schedule_interval_items = []
+        if scheduler == 'heap':
+            self._schedule_interval_items = _IntervalHeap()
+        elif scheduler == 'wheel':
+            self._schedule_interval_items = _TimerWheel(resolution)
+        else:
+            raise ValueError('Unknown scheduler %r' % scheduler)
 
     def update_time(self):
         '''Get the elapsed time since the last call to `update_time`.
@@ -292,21 +636,40 @@ class Clock(_ClockBase):
         '''
         ts = self.last_ts
         result = False
+        profile = self.profile
 
         # Call functions scheduled for every frame  
         # Dupe list just in case one of the items unchedules itself
         for item in list(self._schedule_items):
             result = True
-            item.func(dt, *item.args, **item.kwargs)
-
-        # Call all scheduled interval functions and reschedule for future.
-        need_resort = False
-        # Dupe list just in case one of the items unchedules itself
-        for item in list(self._schedule_interval_items):
-            if item.next_ts > ts:
-                break
+            if profile is None:
+                item.func(dt, *item.args, **item.kwargs)
+            else:
+                profile._call(item.func, dt, item.args, item.kwargs)
+
+        # Take all elapsed interval items before calling any, so that items
+        # scheduled or rescheduled by the functions are not called until the
+        # next tick.
+        due = self._schedule_interval_items.pop_due(ts)
+        for item in due:
+            item.next_ts = None
+
+        # Call the elapsed functions and reschedule them for future.  Items
+        # unscheduled in the meantime have their func replaced.
+        self._due_interval_items = due
+        taken_times = None
+        for item in due:
+            if item.func is _dummy_schedule_func:
+                continue
             result = True
-            item.func(ts - item.last_ts, *item.args, **item.kwargs)
+            if profile is None:
+                item.func(ts - item.last_ts, *item.args, **item.kwargs)
+            else:
+                profile._call(item.func, ts - item.last_ts,
+                              item.args, item.kwargs)
+            if item.func is _dummy_schedule_func:
+                # Unscheduled by its own function; not in the scheduler.
+                continue
             if item.interval:
                 # Try to keep timing regular, even if overslept this time;
                 # but don't schedule in the past (which could lead to
@@ -320,25 +683,46 @@ class Clock(_ClockBase):
                     else:
                         # Missed by heaps, do a soft reschedule to avoid 
                         # lumping everything together.
-                        item.next_ts = self._get_soft_next_ts(ts, item.interval)
+                        if taken_times is None:
+                            taken_times = self._get_taken_times()
+                        item.next_ts = self._get_soft_next_ts(
+                            ts, item.interval, taken_times)
                         # Fake last_ts to avoid repeatedly over-scheduling in
                         # future.  Unfortunately means the next reported dt is
                         # incorrect (looks like interval but actually isn't).
                         item.last_ts = item.next_ts - item.interval
-                need_resort = True
+                self._schedule_interval_items.push(item)
+                if taken_times is not None:
+                    bisect.insort(taken_times, item.next_ts)
             else:
                 item.next_ts = None
+        self._due_interval_items = ()
+
+        return result
 
-        # Remove finished one-shots.
-        self._schedule_interval_items = \
-            [item for item in self._schedule_interval_items \
-             if item.next_ts is not None]
+    def enable_profiling(self, threshold=0.01):
+        '''Begin timing each call of each scheduled function.
 
-        if need_resort:
-            # TODO bubble up changed items might be faster
-            self._schedule_interval_items.sort(key=lambda a: a.next_ts)
+        If profiling is already enabled, the existing profile is kept and
+        its threshold changed.
 
-        return result
+        :Parameters:
+            `threshold` : float
+                Duration in seconds above which a call dispatches the
+                profile's ``on_slow_callback`` event.
+
+        :rtype: `ClockProfile`
+        :return: The profile, also available as `profile`.
+        '''
+        if self.profile is None:
+            self.profile = ClockProfile(threshold)
+        else:
+            self.profile.threshold = threshold
+        return self.profile
+
+    def disable_profiling(self):
+        '''Stop timing scheduled functions, and discard the profile.'''
+        self.profile = None
 
     def tick(self, poll=False):
         '''Signify that one frame has passed.
@@ -429,19 +813,20 @@ class Clock(_ClockBase):
 
         :since: pyglet 1.1
         '''
-        if self._schedule_items or not sleep_idle:
+        if (len(self._schedule_items) > self._cancelled_schedule_items or
+            not sleep_idle):
             if not self.period_limit:
                 return 0.
             else:
                 wake_time = self.next_ts
-                if self._schedule_interval_items:
-                    wake_time = min(wake_time,
-                                    self._schedule_interval_items[0].next_ts)
+                next_ts = self._schedule_interval_items.get_next_ts()
+                if next_ts is not None:
+                    wake_time = min(wake_time, next_ts)
                 return max(wake_time - self.time(), 0.)
 
-        if self._schedule_interval_items:
-            return max(self._schedule_interval_items[0].next_ts - self.time(),
-                       0)
+        next_ts = self._schedule_interval_items.get_next_ts()
+        if next_ts is not None:
+            return max(next_ts - self.time(), 0)
             
         return None
 
@@ -504,21 +889,18 @@ class Clock(_ClockBase):
         :Parameters:
             `func` : function
                 The function to call each frame.
+
+        :return: A handle whose ``cancel`` method unschedules the function.
         '''
-        item = _ScheduledItem(func, args, kwargs)
+        item = _ScheduledItem(func, args, kwargs, self)
         self._schedule_items.append(item)
+        return item
 
     def _schedule_item(self, func, last_ts, next_ts, interval, *args, **kwargs):
         item = _ScheduledIntervalItem(
-            func, interval, last_ts, next_ts, args, kwargs)
-
-        # Insert in sort order
-        for i, other in enumerate(self._schedule_interval_items):
-            if other.next_ts is not None and other.next_ts > next_ts:
-                self._schedule_interval_items.insert(i, item)
-                break
-        else:
-            self._schedule_interval_items.append(item)
+            func, interval, last_ts, next_ts, args, kwargs, self)
+        self._schedule_interval_items.push(item)
+        return item
 
     def schedule_interval(self, func, interval, *args, **kwargs):
         '''Schedule a function to be called every `interval` seconds.
@@ -534,6 +916,7 @@ class Clock(_ClockBase):
             `interval` : float
                 The number of seconds to wait between each call.
 
+        :return: A handle whose ``cancel`` method unschedules the function.
         '''
         last_ts = self.last_ts or self.next_ts
 
@@ -548,7 +931,8 @@ class Clock(_ClockBase):
             last_ts = ts
 
         next_ts = last_ts + interval
-        self._schedule_item(func, last_ts, next_ts, interval, *args, **kwargs)
+        return self._schedule_item(func, last_ts, next_ts, interval,
+                                   *args, **kwargs)
 
     def schedule_interval_soft(self, func, interval, *args, **kwargs):
         '''Schedule a function to be called every `interval` seconds,
@@ -580,6 +964,7 @@ class Clock(_ClockBase):
             `interval` : float
                 The number of seconds to wait between each call.
 
+        :return: A handle whose ``cancel`` method unschedules the function.
         '''
         last_ts = self.last_ts or self.next_ts
 
@@ -590,21 +975,28 @@ class Clock(_ClockBase):
 
         next_ts = self._get_soft_next_ts(last_ts, interval)
         last_ts = next_ts - interval
-        self._schedule_item(func, last_ts, next_ts, interval, *args, **kwargs)
+        return self._schedule_item(func, last_ts, next_ts, interval,
+                                   *args, **kwargs)
+
+    def _get_taken_times(self):
+        # Sorted list of the times scheduled interval items are due, for
+        # _get_soft_next_ts.
+        times = [item.next_ts for item in self._schedule_interval_items]
+        times.sort()
+        return times
+
+    def _get_soft_next_ts(self, last_ts, interval, taken_times=None):
+        # taken_times is the result of _get_taken_times, which the caller
+        # can keep up to date across several calls.
+        if taken_times is None:
+            taken_times = self._get_taken_times()
 
-    def _get_soft_next_ts(self, last_ts, interval):
         def taken(ts, e):
             '''Return True if the given time has already got an item
             scheduled nearby.
             '''
-            for item in self._schedule_interval_items:
-                if item.next_ts is None:
-                    pass
-                elif abs(item.next_ts - ts) <= e:
-                    return True
-                elif item.next_ts > ts + e:
-                    return False
-            return False
+            i = bisect.bisect_left(taken_times, ts - e)
+            return i < len(taken_times) and taken_times[i] <= ts + e
 
         # Binary division over interval:
         #
@@ -650,6 +1042,8 @@ class Clock(_ClockBase):
                 The function to call when the timer lapses.
             `delay` : float
                 The number of seconds to wait before the timer lapses.
+
+        :return: A handle whose ``cancel`` method unschedules the function.
         '''
         last_ts = self.last_ts or self.next_ts
 
@@ -659,7 +1053,7 @@ class Clock(_ClockBase):
             last_ts = ts
 
         next_ts = last_ts + delay
-        self._schedule_item(func, last_ts, next_ts, 0, *args, **kwargs)
+        return self._schedule_item(func, last_ts, next_ts, 0, *args, **kwargs)
 
     def unschedule(self, func):
         '''Remove a function from the schedule.  
@@ -667,6 +1061,10 @@ class Clock(_ClockBase):
         If the function appears in the schedule more than once, all occurrences
         are removed.  If the function was not scheduled, no error is raised.
 
+        This takes time proportional to the number of scheduled functions;
+        to remove many functions, keep the handles returned when they were
+        scheduled, and call their ``cancel`` methods instead.
+
         :Parameters:
             `func` : function
                 The function to remove from the schedule.
@@ -679,18 +1077,148 @@ class Clock(_ClockBase):
             if item.func == func:
                 item.func = _dummy_schedule_func
 
-        for item in self._schedule_interval_items:
+        for item in self._due_interval_items:
             if item.func == func:
                 item.func = _dummy_schedule_func
+
+        for item in list(self._schedule_interval_items):
+            if item.func == func:
+                item.func = _dummy_schedule_func
+                self._schedule_interval_items.remove(item)
     
-        # Now remove matching items from both schedule lists.
+        # Now remove matching and cancelled items from the list of functions
+        # called every frame.
         self._schedule_items = \
             [item for item in self._schedule_items \
                   if item.func is not _dummy_schedule_func]
+        self._cancelled_schedule_items = 0
+
+    def _cancel_item(self, item):
+        # Cancelled items are removed from the list of functions called every
+        # frame once they make up half of it.
+        if item.func is _dummy_schedule_func:
+            return
+        item.func = _dummy_schedule_func
+        self._cancelled_schedule_items += 1
+        if self._cancelled_schedule_items * 2 > len(self._schedule_items):
+            self._schedule_items = \
+                [item for item in self._schedule_items \
+                      if item.func is not _dummy_schedule_func]
+            self._cancelled_schedule_items = 0
+
+    def _cancel_interval_item(self, item):
+        if item.func is _dummy_schedule_func:
+            return
+        item.func = _dummy_schedule_func
+        if item.next_ts is not None:
+            self._schedule_interval_items.remove(item)
+
+class VirtualClock(Clock):
+    '''Clock whose time advances only when it is ticked, without sleeping.
+
+    Each `tick` advances the time to when the next scheduled function is
+    due, and calls it.  If functions are scheduled every frame, each tick
+    advances the time by at most `frame_period`.
+
+    :since: pyglet 1.2
+    '''
+    def __init__(self, start_time=0., frame_period=1 / 60.,
+                 scheduler='heap', resolution=0.01):
+        '''Create a virtual clock.
 
-        self._schedule_interval_items = \
-            [item for item in self._schedule_interval_items \
-                  if item.func is not _dummy_schedule_func]
+        :Parameters:
+            `start_time` : float
+                Initial time of the clock, in seconds.
+            `frame_period` : float
+                Time in seconds between ticks while functions are scheduled
+                with `schedule`.
+            `scheduler` : str
+                See `Clock.__init__`.
+            `resolution` : float
+                See `Clock.__init__`.
+
+        '''
+        self._time = start_time
+        self.frame_period = frame_period
+        super(VirtualClock, self).__init__(time_function=self._get_time,
+                                           scheduler=scheduler,
+                                           resolution=resolution)
+
+    def _get_time(self):
+        return self._time
+
+    def sleep(self, microseconds):
+        # Advance the time rather than sleeping, for callers of Clock.sleep.
+        self._time += microseconds / 1000000.
+
+    def _get_wake_time(self):
+        # Time the next tick should advance to, or None if nothing is
+        # scheduled.
+        wake_time = None
+        if len(self._schedule_items) > self._cancelled_schedule_items:
+            wake_time = self._time + self.frame_period
+        next_ts = self._schedule_interval_items.get_next_ts()
+        if next_ts is not None and (wake_time is None or next_ts < wake_time):
+            wake_time = next_ts
+        return wake_time
+
+    def tick(self, poll=False):
+        '''Advance the time to when the next function is scheduled, and call
+        the functions due.
+
+        The framerate limit is ignored.
+
+        :Parameters:
+            `poll` : bool
+                If True, the time is not advanced; only functions already
+                due are called.
+
+        :rtype: float
+        :return: The number of seconds since the last "tick", or 0 if this was
+            the first frame.
+        '''
+        if not poll:
+            wake_time = self._get_wake_time()
+            if wake_time is not None and wake_time > self._time:
+                self._time = wake_time
+
+        delta_t = self.update_time()
+        self.call_scheduled_functions(delta_t)
+        return delta_t
+
+    def advance(self, dt):
+        '''Advance the time by `dt` seconds, calling the functions that fall
+        due in order, each at the time it is due.
+
+        :Parameters:
+            `dt` : float
+                Number of seconds to advance the time by.
+
+        '''
+        end_time = self._time + dt
+        while True:
+            wake_time = self._get_wake_time()
+            if wake_time is None or wake_time > end_time:
+                break
+            self.tick()
+        self._time = end_time
+
+    def get_sleep_time(self, sleep_idle):
+        '''Get the time until the next item is scheduled.
+
+        A virtual clock never needs to sleep, so this is 0 if any functions
+        are scheduled (or `sleep_idle` is False), otherwise None.
+
+        :Parameters:
+            `sleep_idle` : bool
+                If True, the application intends to sleep through its idle
+                time.
+
+        :rtype: float
+        '''
+        if not sleep_idle or self._get_wake_time() is not None:
+            return 0.
+        return None
 
 # Default clock.
 _default = Clock()
@@ -793,8 +1321,10 @@ def schedule(func, *args, **kwargs):
     :Parameters:
         `func` : function
             The function to call each frame.
+
+    :return: A handle whose ``cancel`` method unschedules the function.
     '''
-    _default.schedule(func, *args, **kwargs)
+    return _default.schedule(func, *args, **kwargs)
 
 def schedule_interval(func, interval, *args, **kwargs):
     '''Schedule 'func' to be called every 'interval' seconds on the default
@@ -809,8 +1339,9 @@ def schedule_interval(func, interval, *args, **kwargs):
         `interval` : float
             The number of seconds to wait between each call.
 
+    :return: A handle whose ``cancel`` method unschedules the function.
     '''
-    _default.schedule_interval(func, interval, *args, **kwargs)
+    return _default.schedule_interval(func, interval, *args, **kwargs)
 
 def schedule_interval_soft(func, interval, *args, **kwargs):
     '''Schedule 'func' to be called every 'interval' seconds on the default
@@ -830,8 +1361,9 @@ def schedule_interval_soft(func, interval, *args, **kwargs):
         `interval` : float
             The number of seconds to wait between each call.
 
+    :return: A handle whose ``cancel`` method unschedules the function.
     '''
-    _default.schedule_interval_soft(func, interval, *args, **kwargs)
+    return _default.schedule_interval_soft(func, interval, *args, **kwargs)
 
 def schedule_once(func, delay, *args, **kwargs):
     '''Schedule 'func' to be called once after 'delay' seconds (can be
@@ -847,9 +1379,10 @@ def schedule_once(func, delay, *args, **kwargs):
             The function to call when the timer lapses.
         `delay` : float
             The number of seconds to wait before the timer lapses.
- 
+
+    :return: A handle whose ``cancel`` method unschedules the function.
     ''' 
-    _default.schedule_once(func, delay, *args, **kwargs)
+    return _default.schedule_once(func, delay, *args, **kwargs)
 
 def unschedule(func):
     '''Remove 'func' from the default clock's schedule.  No error
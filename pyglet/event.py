@@ -157,6 +157,11 @@ class EventDispatcher(object):
     # Placeholder empty stack; real stack is created only if needed
     _event_stack = ()
 
+    # Map of event type to tuple of stack handlers, from the top of the
+    # stack; created by dispatch_event and discarded whenever the stack
+    # changes.
+    _handler_cache = None
+
     @classmethod
     def register_event_type(cls, name):
         '''Register an event type with the dispatcher.
@@ -190,6 +195,7 @@ class EventDispatcher(object):
 
         # Place dict full of new handlers at beginning of stack
         self._event_stack.insert(0, {})
+        self._handler_cache = None
         self.set_handlers(*args, **kwargs)
 
     def _get_handlers(self, args, kwargs):
@@ -242,6 +248,7 @@ class EventDispatcher(object):
             self._event_stack = [{}]
 
         self._event_stack[0][name] = handler
+        self._handler_cache = None
 
     def pop_handlers(self):
         '''Pop the top level of event handlers off the stack.
@@ -249,6 +256,7 @@ class EventDispatcher(object):
         assert self._event_stack and 'No handlers pushed'
 
         del self._event_stack[0]
+        self._handler_cache = None
 
     def remove_handlers(self, *args, **kwargs):
         '''Remove event handlers from the event stack.
@@ -290,6 +298,7 @@ class EventDispatcher(object):
         # Remove the frame if it's empty.
         if not frame:
             self._event_stack.remove(frame)
+        self._handler_cache = None
 
     def remove_handler(self, name, handler):
         '''Remove a single event handler.
@@ -311,6 +320,7 @@ class EventDispatcher(object):
             try:
                 if frame[name] is handler:
                     del frame[name]
+                    self._handler_cache = None
                     break
             except KeyError:
                 pass
@@ -342,37 +352,53 @@ class EventDispatcher(object):
             is always ``None``.
 
         '''
-        assert event_type in self.event_types, "%r not found in %r.event_types == %r" % (event_type, self, self.event_types)
+        # Stack handlers for the event type, as a tuple; the stack can be
+        # modified by the handlers without affecting this dispatch.
+        cache = self._handler_cache
+        if cache is None:
+            cache = self._handler_cache = {}
+        handlers = cache.get(event_type)
+        if handlers is None:
+            assert event_type in self.event_types, "%r not found in %r.event_types == %r" % (event_type, self, self.event_types)
+            handlers = cache[event_type] = \
+                self._get_stack_handlers(event_type)
 
         invoked = False
 
-        # Search handler stack for matching event handlers
-        for frame in list(self._event_stack):
-            handler = frame.get(event_type, None)
-            if handler:
-                try:
-                    invoked = True
-                    if handler(*args):
-                        return EVENT_HANDLED
-                except TypeError:
-                    self._raise_dispatch_exception(event_type, args, handler)
-
+        # Call each stack handler, from the top of the stack
+        for handler in handlers:
+            try:
+                invoked = True
+                if handler(*args):
+                    return EVENT_HANDLED
+            except TypeError:
+                self._raise_dispatch_exception(event_type, args, handler)
 
-        # Check instance for an event handler
-        if hasattr(self, event_type):
+        # Check instance for an event handler.  This is looked up on each
+        # dispatch, as it may be assigned to the instance at any time.
+        handler = getattr(self, event_type, None)
+        if handler is not None:
             try:
                 invoked = True
-                if getattr(self, event_type)(*args):
+                if handler(*args):
                     return EVENT_HANDLED
             except TypeError:
-                self._raise_dispatch_exception(
-                    event_type, args, getattr(self, event_type))
+                self._raise_dispatch_exception(event_type, args, handler)
 
         if invoked:
             return EVENT_UNHANDLED
 
         return False
 
+    def _get_stack_handlers(self, event_type):
+        # Collect the handlers for an event type from the handler stack.
+        handlers = []
+        for frame in self._event_stack:
+            handler = frame.get(event_type, None)
+            if handler:
+                handlers.append(handler)
+        return tuple(handlers)
+
     def _raise_dispatch_exception(self, event_type, args, handler):
         # A common problem in applications is having the wrong number of
         # arguments in an event handler.  This is caught as a TypeError in
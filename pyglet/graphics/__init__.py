@@ -161,15 +161,30 @@ video drivers, and requires indexed vertex lists.
 __docformat__ = 'restructuredtext'
 __version__ = '$Id: $'
 
+import bisect
+import copy
 import ctypes
+import itertools
+import struct
+import weakref
 
 import pyglet
 from pyglet.gl import *
 from pyglet import gl
 from pyglet.graphics import vertexbuffer, vertexattribute, vertexdomain
+from pyglet.graphics import statistics
 
 _debug_graphics_batch = pyglet.options['debug_graphics_batch']
 
+# Batch.save file format: the magic string, format version and length of the
+# header, followed by the header and the data of each buffer, each padded to
+# a multiple of _batch_file_alignment bytes.  The header is encoded by
+# _pack_batch_header.
+_batch_file_magic = 'PYGBATCH'
+_batch_file_version = 2
+_batch_file_header = '<8sII'
+_batch_file_alignment = 16
+
 def draw(size, mode, *data):
     '''Draw a primitive immediately.
 
@@ -264,6 +279,13 @@ def _parse_data(data):
     formats = tuple(formats)
     return formats, initial_arrays
 
+def _set_block_attribute_data(domain, start, count, initial_arrays):
+    '''Set the initial data of a block of vertices, as returned by
+    `_parse_data`.'''
+    for i, array in initial_arrays:
+        attribute = domain.attributes[i]
+        attribute.set_region(attribute.buffer, start, count, array)
+
 def _get_default_batch():
     shared_object_space = gl.current_context.object_space
     try:
@@ -316,9 +338,49 @@ class Batch(object):
     sent to the graphics card in a single operation.
 
     Call `VertexList.delete` to remove a vertex list from the batch.
+
+    :Ivariables:
+        `merge_state` : bool
+            If True, redundant state changes are removed from the draw list
+            when it is compiled; see `__init__`.
+        `removed_transitions` : int
+            The number of ``set_state`` and ``unset_state`` calls removed
+            from the draw list the last time it was compiled with
+            `merge_state` enabled.
+        `compact_threshold` : float
+            Fragmentation above which the batch's vertex domains are
+            compacted automatically, or ``None``; see `__init__`.  Changes
+            only affect domains created afterwards.
+        `statistics` : `pyglet.graphics.statistics.BatchStatistics`
+            Statistics of the most recently drawn frames, or ``None`` if
+            statistics are not enabled; see `enable_statistics`.
+
     '''
-    def __init__(self):
-        '''Create a graphics batch.'''
+    statistics = None
+
+    def __init__(self, merge_state=False, compact_threshold=None):
+        '''Create a graphics batch.
+
+        :Parameters:
+            `merge_state` : bool
+                If True, the draw list is given an extra compilation pass that
+                removes redundant state changes.  Calls to group methods that
+                are not overridden from `Group` (for example, those of
+                `OrderedGroup`) are dropped, and where one group's
+                ``unset_state`` would be followed immediately by
+                ``set_state`` of a group of the same class that is equal to
+                it apart from its parent, both calls are dropped so that
+                their vertex lists are drawn together.  This makes each draw
+                list update proportional to the size of the batch, so is
+                disabled by default.
+            `compact_threshold` : float
+                If not ``None``, each vertex domain in the batch is compacted
+                when a vertex list is deleted and the fraction of its free
+                space that lies between vertex lists exceeds this value, if
+                doing so would allow its buffers to shrink.  See
+                `VertexDomain.compact_threshold`.
+
+        '''
         # Mapping to find domain.  
         # group -> (attributes, mode, indexed) -> domain
         self.group_map = {}
@@ -326,12 +388,29 @@ class Batch(object):
         # Mapping of group to list of children.
         self.group_children = {}
 
-        # List of top-level groups
+        # List of top-level groups, kept in sort order.
         self.top_groups = []
 
         self._draw_list = []
         self._draw_list_dirty = False
 
+        # Draw list of each group's subtree, and the draw lists of the
+        # children of each group (keyed on the parent group, or None for
+        # top-level groups) in the same order as group_children and
+        # top_groups.  Only groups that have changed since the last draw list
+        # update are revisited; see _invalidate_group.
+        self._group_draw_lists = {}
+        self._child_draw_lists = {None: []}
+        self._dirty_children = {}
+
+        self.merge_state = merge_state
+        self.removed_transitions = 0
+        self.compact_threshold = compact_threshold
+
+        # Functions to call before the batch is next drawn; see
+        # defer_update.
+        self._deferred_updates = []
+
     def add(self, count, mode, group, *data):
         '''Add a vertex list to the batch.
 
@@ -392,6 +471,99 @@ class Batch(object):
 
         return vlist 
 
+    def add_many(self, n, count, mode, group, *data):
+        '''Add a number of vertex lists of the same size to the batch.
+
+        This is equivalent to calling `add` `n` times, but is considerably
+        faster: the vertex lists are allocated as a single block, and each
+        attribute's initial data is written in one operation.  The vertex
+        lists can still be modified, migrated and deleted individually.
+
+        :Parameters:
+            `n` : int
+                The number of vertex lists to add.
+            `count` : int
+                The number of vertices in each list.
+            `mode` : int
+                OpenGL drawing mode enumeration; for example, one of
+                ``GL_POINTS``, ``GL_LINES``, ``GL_TRIANGLES``, etc.
+                See the module summary for additional information.
+            `group` : `Group`
+                Group of the vertex lists, or ``None`` if no group is
+                required.
+            `data` : data items
+                Attribute formats and initial data for the vertex lists.
+                See the module summary for details.  Initial data is given
+                for all vertex lists, one after the other, as a single flat
+                sequence (or array, if NumPy is available).
+
+        :rtype: list of `VertexList`
+        '''
+        formats, initial_arrays = _parse_data(data)
+        domain = self._get_domain(False, mode, group, formats)
+
+        # Create vertex lists and initialize
+        vlists = domain.create_many(n, count)
+        if vlists:
+            _set_block_attribute_data(domain, vlists[0].start, n * count,
+                                      initial_arrays)
+        return vlists
+
+    def add_many_indexed(self, n, count, mode, group, indices, *data):
+        '''Add a number of indexed vertex lists of the same size to the
+        batch.
+
+        This is equivalent to calling `add_indexed` `n` times with the same
+        indices, but is considerably faster; see `add_many`.
+
+        :Parameters:
+            `n` : int
+                The number of vertex lists to add.
+            `count` : int
+                The number of vertices in each list.
+            `mode` : int
+                OpenGL drawing mode enumeration; for example, one of
+                ``GL_POINTS``, ``GL_LINES``, ``GL_TRIANGLES``, etc.
+                See the module summary for additional information.
+            `group` : `Group`
+                Group of the vertex lists, or ``None`` if no group is
+                required.
+            `indices` : sequence
+                Sequence of integers giving indices into each vertex list.
+                The same indices are used for every vertex list.
+            `data` : data items
+                Attribute formats and initial data for the vertex lists.
+                See `add_many`.
+
+        :rtype: list of `IndexedVertexList`
+        '''
+        formats, initial_arrays = _parse_data(data)
+        domain = self._get_domain(True, mode, group, formats)
+
+        # Create vertex lists and initialize
+        index_count = len(indices)
+        vlists = domain.create_many(n, count, index_count)
+        if vlists:
+            start = vlists[0].start
+            region = domain.get_index_region(vlists[0].index_start,
+                                             n * index_count)
+            if vertexbuffer.numpy is not None:
+                numpy = vertexbuffer.numpy
+                offsets = numpy.arange(start, start + n * count, count)
+                index_data = offsets[:, numpy.newaxis] + \
+                    numpy.asarray(indices, dtype=offsets.dtype)
+                numpy.ctypeslib.as_array(region.array)[:] = \
+                    index_data.reshape(-1)
+            else:
+                index_data = []
+                for offset in range(start, start + n * count, count):
+                    index_data.extend([i + offset for i in indices])
+                region.array[:] = index_data
+            region.invalidate()
+            _set_block_attribute_data(domain, start, n * count,
+                                      initial_arrays)
+        return vlists
+
     def migrate(self, vertex_list, mode, group, batch):
         '''Migrate a vertex list to another batch and/or group.
 
@@ -419,6 +591,19 @@ class Batch(object):
         domain = batch._get_domain(False, mode, group, formats)
         vertex_list.migrate(domain)
 
+    def compact(self):
+        '''Compact each vertex domain in the batch, so that its vertex lists
+        are contiguous and its buffers no larger than needed.
+
+        This is worthwhile after many vertex lists have been deleted from
+        the batch.  The ``start`` of any vertex list may change, and any
+        attribute arrays previously retrieved from the batch's vertex lists
+        become invalid.  See `VertexDomain.compact`.
+        '''
+        for domain_map in self.group_map.values():
+            for domain in domain_map.values():
+                domain.compact()
+
     def _get_domain(self, indexed, mode, group, formats):
         if group is None:
             group = null_group
@@ -440,30 +625,79 @@ class Batch(object):
             else:
                 domain = vertexdomain.create_domain(*formats)
             domain.__formats = formats
+            domain._on_empty = self._create_empty_handler(group)
+            domain.compact_threshold = self.compact_threshold
             domain_map[key] = domain
-            self._draw_list_dirty = True 
+            self._invalidate_group(group)
 
         return domain
 
+    def _create_empty_handler(self, group):
+        # The domain must not hold a strong reference to the batch, as
+        # domains have a finalizer and would not be collected.
+        batch_ref = weakref.ref(self)
+        def on_empty():
+            batch = batch_ref()
+            if batch is not None:
+                batch._invalidate_group(group)
+        return on_empty
+
     def _add_group(self, group):
         self.group_map[group] = {}
         if group.parent is None:
-            self.top_groups.append(group)
+            siblings = self.top_groups
         else:
             if group.parent not in self.group_map:
                 self._add_group(group.parent)
             if group.parent not in self.group_children:
                 self.group_children[group.parent] = []
-            self.group_children[group.parent].append(group)
+                self._child_draw_lists[group.parent] = []
+            siblings = self.group_children[group.parent]
+        draw_list = self._group_draw_lists[group] = []
+        i = bisect.bisect_right(siblings, group)
+        siblings.insert(i, group)
+        self._child_draw_lists[group.parent].insert(i, draw_list)
+        self._invalidate_group(group)
+
+    def _remove_group(self, group):
+        del self.group_map[group]
+        if group.parent is None:
+            siblings = self.top_groups
+        else:
+            siblings = self.group_children[group.parent]
+        i = _find_group(siblings, group)
+        del siblings[i]
+        del self._child_draw_lists[group.parent][i]
+        del self._group_draw_lists[group]
+        if group in self.group_children:
+            del self.group_children[group]
+            del self._child_draw_lists[group]
+
+    def _invalidate_group(self, group):
+        '''Mark a group as needing to be revisited on the next draw list
+        update, along with each of its ancestors.
+        '''
+        dirty_children = self._dirty_children
+        while group is not None:
+            siblings = dirty_children.setdefault(group.parent, set())
+            if group in siblings:
+                break
+            siblings.add(group)
+            group = group.parent
         self._draw_list_dirty = True
 
     def _update_draw_list(self):
         '''Visit group tree in preorder and create a list of bound methods
         to call.
-        '''
 
+        Only groups invalidated since the last update (and their ancestors)
+        are visited.  The draw lists of all other groups are reused, so
+        adding or removing a group costs little more than updating the
+        draw lists of its ancestors.
+        '''
         def visit(group):
-            draw_list = []
+            draw_list = self._group_draw_lists[group]
+            draw_list[:] = [group.set_state]
 
             # Draw domains using this group
             domain_map = self.group_map[group]
@@ -472,39 +706,34 @@ class Batch(object):
                 if domain._is_empty():
                     del domain_map[(formats, mode, indexed)]
                     continue
-                draw_list.append(
-                    (lambda d, m: lambda: d.draw(m))(domain, mode))
+                draw_list.append(_create_domain_draw(domain, mode))
 
-            # Sort and visit child groups of this group
+            # Visit changed child groups of this group
             children = self.group_children.get(group)
             if children:
-                children.sort()
-                for child in list(children):
-                    draw_list.extend(visit(child))
+                draw_list.extend(itertools.chain(*update_children(group)))
 
             if children or domain_map:
-                return [group.set_state] + draw_list + [group.unset_state]
+                draw_list.append(group.unset_state)
             else:
                 # Remove unused group from batch
-                del self.group_map[group]
-                if group.parent:
-                    self.group_children[group.parent].remove(group)
-                try:
-                    del self.group_children[group]
-                except KeyError:
-                    pass
-                try:
-                    self.top_groups.remove(group)
-                except ValueError:
-                    pass
-                return []
+                self._remove_group(group)
 
-        self._draw_list = []
+        def update_children(parent):
+            for child in self._dirty_children.pop(parent, ()):
+                if child in self.group_map:
+                    visit(child)
+            return self._child_draw_lists[parent]
 
-        self.top_groups.sort()
-        for group in list(self.top_groups):
-            self._draw_list.extend(visit(group))
+        self._draw_list = list(itertools.chain(*update_children(None)))
+        if self.merge_state:
+            self._draw_list, self.removed_transitions = \
+                _merge_state(self._draw_list)
+        if self.statistics is not None:
+            self._draw_list = self.statistics._instrument(self._draw_list)
 
+        # Any remaining entries refer to groups no longer in the batch.
+        self._dirty_children.clear()
         self._draw_list_dirty = False
 
         if _debug_graphics_batch:
@@ -534,9 +763,183 @@ class Batch(object):
         for group in self.top_groups:
             dump(group)
         
+    def save(self, file, group_key=repr):
+        '''Write the contents of the batch to a file, from which it can be
+        recreated with `load`.
+
+        The vertex data of each domain is written as the raw contents of its
+        buffers, so that loading requires no work for each vertex.  Groups
+        are not written; instead a key is written for each group, from which
+        the ``group_factory`` given to `load` recreates it.
+
+        :Parameters:
+            `file` : file-like object
+                File opened for writing in binary mode.
+            `group_key` : callable
+                Function returning a key for a group, which must be a str,
+                unicode, int, float, bool or None, or a tuple of these.
+                Defaults to `repr`, giving, for example,
+                ``'OrderedGroup(1)'``.
+
+        :rtype: list of `VertexList`
+        :return: The vertex lists written, in the same order as the vertex
+            lists returned by `load`.
+        '''
+        # Groups, parents first, as (key, parent index) pairs.
+        groups = []
+        group_indices = {}
+        def add_group(group):
+            if group is null_group:
+                return None
+            if group not in group_indices:
+                parent_index = None
+                if group.parent is not None:
+                    parent_index = add_group(group.parent)
+                group_indices[group] = len(groups)
+                groups.append((group_key(group), parent_index))
+            return group_indices[group]
+
+        domains = []
+        data = []
+        vertex_lists = []
+        for group in self.group_map:
+            group_index = add_group(group)
+            for (formats, mode, indexed), domain in \
+                    self.group_map[group].items():
+                if domain._is_empty():
+                    continue
+                info, domain_data, domain_lists = domain._save()
+                domains.append((group_index, formats, mode, indexed, info,
+                                [len(d) for d in domain_data]))
+                data.extend(domain_data)
+                vertex_lists.extend(domain_lists)
+
+        header = _pack_batch_header({
+            'merge_state': self.merge_state,
+            'compact_threshold': self.compact_threshold,
+            'groups': groups,
+            'domains': domains,
+        })
+        file.write(struct.pack(_batch_file_header,
+            _batch_file_magic, _batch_file_version, len(header)))
+        file.write(header)
+        file.write(_get_batch_file_padding(
+            struct.calcsize(_batch_file_header) + len(header)))
+        for d in data:
+            file.write(d)
+            file.write(_get_batch_file_padding(len(d)))
+        return vertex_lists
+
+    @classmethod
+    def load(cls, file, group_factory):
+        '''Create a batch from a file written by `save`.
+
+        The file is read sequentially, so it can be any file-like object
+        with a ``read`` method, including an ``mmap.mmap``.  Each buffer is
+        restored with a single copy.
+
+        :Parameters:
+            `file` : file-like object
+                File opened for reading in binary mode.
+            `group_factory` : callable
+                Function called with the key written for each group (see
+                `save`) and the group's parent (already created, or
+                ``None``), returning the new group.  Distinct keys must
+                give groups that are not equal.
+
+        :rtype: (`Batch`, list of `VertexList`)
+        :return: The batch, and its vertex lists, in the order of the list
+            returned by `save`.
+        '''
+        header_size = struct.calcsize(_batch_file_header)
+        magic, version, length = struct.unpack(_batch_file_header,
+                                               file.read(header_size))
+        if magic != _batch_file_magic:
+            raise ValueError('Not a saved batch')
+        if version != _batch_file_version:
+            raise ValueError('Unsupported batch file version %d' % version)
+        header = _unpack_batch_header(file.read(length))
+        file.read(len(_get_batch_file_padding(header_size + length)))
+
+        batch = cls(header['merge_state'], header['compact_threshold'])
+        groups = []
+        for key, parent_index in header['groups']:
+            parent = None
+            if parent_index is not None:
+                parent = groups[parent_index]
+            groups.append(group_factory(key, parent))
+
+        vertex_lists = []
+        for group_index, formats, mode, indexed, info, lengths in \
+                header['domains']:
+            data = []
+            for length in lengths:
+                data.append(file.read(length))
+                file.read(len(_get_batch_file_padding(length)))
+            group = None
+            if group_index is not None:
+                group = groups[group_index]
+            domain = batch._get_domain(indexed, mode, group, formats)
+            vertex_lists.extend(domain._load(info, data))
+        return batch, vertex_lists
+
+    def enable_statistics(self, history=60):
+        '''Begin collecting statistics each time the batch is drawn.
+
+        The statistics are available from the `statistics` attribute.  While
+        they are being collected, each call made to draw the batch is
+        counted, at a small cost in performance.
+
+        :Parameters:
+            `history` : int
+                Number of frames over which statistics are summarised.
+
+        :rtype: `pyglet.graphics.statistics.BatchStatistics`
+        '''
+        self.statistics = statistics.BatchStatistics(history)
+        self._draw_list_dirty = True
+        return self.statistics
+
+    def disable_statistics(self):
+        '''Stop collecting statistics, and remove the overhead of doing
+        so.'''
+        if self.statistics is not None:
+            self.statistics._disable_upload_counters()
+        self.statistics = None
+        self._draw_list_dirty = True
+
+    def defer_update(self, func):
+        '''Call a function once, before the batch is next drawn.
+
+        Objects whose vertex data depends on several properties, such as
+        `pyglet.sprite.Sprite` in deferred mode, use this to recompute the
+        data once per frame, however many of the properties were changed.
+
+        :Parameters:
+            `func` : callable
+                Function to call with no arguments.
+
+        '''
+        self._deferred_updates.append(func)
+
+    def flush_updates(self):
+        '''Call the functions given to `defer_update` since the batch was
+        last drawn.
+
+        This is done automatically by `draw`, `draw_subset` and
+        `BatchSubset.draw`.
+        '''
+        while self._deferred_updates:
+            updates = self._deferred_updates
+            self._deferred_updates = []
+            for func in updates:
+                func()
+
     def draw(self):
         '''Draw the batch.
         '''
+        if self._deferred_updates:
+            self.flush_updates()
         if self._draw_list_dirty:
             self._update_draw_list()
 
@@ -546,9 +949,10 @@ class Batch(object):
     def draw_subset(self, vertex_lists):
         '''Draw only some vertex lists in the batch.
 
-        The use of this method is highly discouraged, as it is quite
-        inefficient.  Usually an application can be redesigned so that batches
-        can always be drawn in their entirety, using `draw`.
+        Usually an application can be designed so that batches can always be
+        drawn in their entirety, using `draw`, which is more efficient.  If
+        the same subset is drawn repeatedly, create it once with `get_subset`
+        and draw that instead.
 
         The given vertex lists must belong to this batch; behaviour is
         undefined if this condition is not met.
@@ -558,29 +962,244 @@ class Batch(object):
                 Vertex lists to draw.
 
         '''
-        # Horrendously inefficient.
+        self.get_subset(vertex_lists).draw()
+
+    def get_subset(self, vertex_lists):
+        '''Prepare some of the vertex lists in the batch for drawing.
+
+        The vertex lists are grouped by domain, and the vertices of each
+        domain drawn with a single ``glMultiDrawArrays`` or
+        ``glMultiDrawElements`` call, setting only the state of the groups
+        containing them.  The subset can be drawn repeatedly until any of
+        its vertex lists are resized, migrated or deleted, or groups are
+        added to or removed from the batch.
+
+        The given vertex lists must belong to this batch; behaviour is
+        undefined if this condition is not met.
+
+        :Parameters:
+            `vertex_lists` : sequence of `VertexList` or `IndexedVertexList`
+                Vertex lists to include in the subset.
+
+        :rtype: `BatchSubset`
+        '''
+        return BatchSubset(self, vertex_lists)
+
+class BatchSubset(object):
+    '''Some of the vertex lists of a batch, prepared for drawing.
+
+    Use `Batch.get_subset` to construct a subset.
+    '''
+    def __init__(self, batch, vertex_lists):
+        self._batch = batch
+
+        # Vertex lists to draw in each domain, and the ranges of each
+        # domain to draw with the domain version they were computed for.
+        self._domain_lists = {}
+        for vertex_list in vertex_lists:
+            self._domain_lists.setdefault(vertex_list.domain, []).append(
+                vertex_list)
+        self._domain_subsets = {}
+
+        # Groups containing the vertex lists, and their ancestors
+        groups = set()
+        for group, domain_map in batch.group_map.items():
+            for domain in domain_map.values():
+                if domain in self._domain_lists:
+                    while group is not None and group not in groups:
+                        groups.add(group)
+                        group = group.parent
+                    break
+
         def visit(group):
-            group.set_state()
+            self._draw_list.append(group.set_state)
 
             # Draw domains using this group
-            domain_map = self.group_map[group]
+            domain_map = batch.group_map[group]
             for (_, mode, _), domain in domain_map.items():
-                for list in vertex_lists:
-                    if list.domain is domain:
-                        list.draw(mode)
-
-            # Sort and visit child groups of this group
-            children = self.group_children.get(group)
-            if children:
-                children.sort()
-                for child in children:
+                if domain in self._domain_lists:
+                    self._draw_list.append(
+                        (lambda d, m: lambda: self._draw_domain(d, m))(
+                            domain, mode))
+
+            # Visit child groups of this group (already in sort order)
+            for child in batch.group_children.get(group, ()):
+                if child in groups:
                     visit(child)
 
-            group.unset_state()
+            self._draw_list.append(group.unset_state)
 
-        self.top_groups.sort()
-        for group in self.top_groups:
-            visit(group)
+        self._draw_list = []
+        for group in batch.top_groups:
+            if group in groups:
+                visit(group)
+
+    def _draw_domain(self, domain, mode):
+        version, subset = self._domain_subsets.get(domain, (None, None))
+        if version != domain._version:
+            # The domain was compacted or resized since the subset was
+            # last drawn.
+            subset = domain.get_subset(self._domain_lists[domain])
+            self._domain_subsets[domain] = (domain._version, subset)
+        domain.draw_subset(mode, subset)
+
+    def draw(self):
+        '''Draw the vertex lists in the subset.'''
+        if self._batch._deferred_updates:
+            self._batch.flush_updates()
+        for func in self._draw_list:
+            func()
+
+def _pack_batch_header(value):
+    # Encode the Batch.save header, made of dicts with str keys, lists,
+    # tuples, str, unicode, int, float, bool and None, as a str.  Lists are
+    # decoded as tuples.
+    parts = []
+    def pack(value):
+        if value is None:
+            parts.append('N')
+        elif value is True:
+            parts.append('T')
+        elif value is False:
+            parts.append('F')
+        elif isinstance(value, (int, long)):
+            parts.append(struct.pack('<cq', 'i', value))
+        elif isinstance(value, float):
+            parts.append(struct.pack('<cd', 'd', value))
+        elif isinstance(value, str):
+            parts.append(struct.pack('<cI', 's', len(value)))
+            parts.append(value)
+        elif isinstance(value, unicode):
+            value = value.encode('utf-8')
+            parts.append(struct.pack('<cI', 'u', len(value)))
+            parts.append(value)
+        elif isinstance(value, (tuple, list)):
+            parts.append(struct.pack('<cI', 't', len(value)))
+            for item in value:
+                pack(item)
+        elif isinstance(value, dict):
+            parts.append(struct.pack('<cI', 'm', len(value)))
+            for key, item in value.items():
+                pack(key)
+                pack(item)
+        else:
+            raise TypeError('Cannot save %r in a batch file' % (value,))
+    pack(value)
+    return ''.join(parts)
+
+def _unpack_batch_header(data):
+    # Decode the result of _pack_batch_header.  Raises ValueError if the
+    # data is invalid.
+    def unpack(offset):
+        tag = data[offset:offset + 1]
+        offset += 1
+        if tag == 'N':
+            return None, offset
+        elif tag == 'T':
+            return True, offset
+        elif tag == 'F':
+            return False, offset
+        elif tag == 'i':
+            value, = struct.unpack('<q', data[offset:offset + 8])
+            return value, offset + 8
+        elif tag == 'd':
+            value, = struct.unpack('<d', data[offset:offset + 8])
+            return value, offset + 8
+        length, = struct.unpack('<I', data[offset:offset + 4])
+        offset += 4
+        if tag in ('s', 'u'):
+            value = data[offset:offset + length]
+            if len(value) != length:
+                raise ValueError('Truncated batch file header')
+            if tag == 'u':
+                value = value.decode('utf-8')
+            return value, offset + length
+        elif tag == 't':
+            items = []
+            for i in xrange(length):
+                item, offset = unpack(offset)
+                items.append(item)
+            return tuple(items), offset
+        elif tag == 'm':
+            items = {}
+            for i in xrange(length):
+                key, offset = unpack(offset)
+                items[key], offset = unpack(offset)
+            return items, offset
+        raise ValueError('Invalid batch file header')
+
+    try:
+        value, offset = unpack(0)
+    except struct.error:
+        raise ValueError('Truncated batch file header')
+    except TypeError:
+        # Unhashable dict key
+        raise ValueError('Invalid batch file header')
+    if offset != len(data):
+        raise ValueError('Invalid batch file header')
+    return value
+
+def _get_batch_file_padding(size):
+    # Return the bytes to write after size bytes to align the next write.
+    return '\0' * (-size % _batch_file_alignment)
+
+def _create_domain_draw(domain, mode):
+    # Return a function drawing all of domain, which can be identified in a
+    # draw list by its domain and mode attributes.
+    def draw():
+        domain.draw(mode)
+    draw.domain = domain
+    draw.mode = mode
+    return draw
+
+def _find_group(groups, group):
+    # Return the index of group in a sorted list of groups, without
+    # comparing it against every element.
+    i = bisect.bisect_left(groups, group)
+    while i < len(groups):
+        if groups[i] is group or groups[i] == group:
+            return i
+        elif group < groups[i]:
+            break
+        i += 1
+    # The groups are not totally ordered (e.g., different group classes)
+    return groups.index(group)
+
+def _merge_state(draw_list):
+    # Return a copy of draw_list with redundant set_state and unset_state
+    # calls removed, and the number of calls removed.
+    noop_functions = (Group.__dict__['set_state'],
+                      Group.__dict__['unset_state'])
+    merged = []
+    for func in draw_list:
+        function = getattr(func, 'im_func', None)
+        if function is None:
+            # Domain draw
+            merged.append(func)
+            continue
+        elif function in noop_functions:
+            continue
+        elif (merged and function.__name__ == 'set_state' and
+              getattr(merged[-1], '__name__', None) == 'unset_state' and
+              _is_state_equal(merged[-1].im_self, func.im_self)):
+            # The state is already set; skip unsetting and setting it again.
+            merged.pop()
+            continue
+        merged.append(func)
+    return merged, len(draw_list) - len(merged)
+
+def _is_state_equal(group, other):
+    # Groups are equal only if their parents are, but by the time two
+    # groups' state changes are adjacent, any differences in their parents'
+    # state have already been removed.  Compare other with its parent
+    # replaced by group's.
+    if group is other or group == other:
+        return True
+    if group.__class__ is not other.__class__ or group.parent is other.parent:
+        return False
+    other = copy.copy(other)
+    other.parent = group.parent
+    return group == other
 
 class Group(object):
     '''Group of common OpenGL state.
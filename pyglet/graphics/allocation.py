@@ -49,6 +49,8 @@ responsibility to maintain the allocated regions.
 
 __docformat__ = 'restructuredtext'
 __version__ = '$Id: $'
+
+import bisect
  
 # Common cases:
 # -regions will be the same size (instances of same object, e.g. sprites)
@@ -116,6 +118,21 @@ class Allocator(object):
         self.starts = []
         self.sizes = []
 
+        # Index of the free space between blocks (not including any space
+        # before the first block or after the last).  Each free block is
+        # keyed on its start index, and bucketed by its size class (see
+        # _get_size_class) into a sorted list of starts.  For the example
+        # above:
+        #
+        # _free_sizes = {3: 2, 15: 5}
+        # _free_starts = {2: [3], 5: [15]}
+        #
+        # The block containing a region is found by bisecting starts.
+
+        self._free_sizes = {}
+        self._free_starts = {}
+        self._fragmented_free_size = 0
+
     def set_capacity(self, size):
         '''Resize the maximum buffer size.
         
@@ -158,30 +175,27 @@ class Allocator(object):
             else:
                 raise AllocatorMemoryException(size)
 
-        # Allocate in a free space
-        free_start = self.starts[0] + self.sizes[0]
-        for i, (alloc_start, alloc_size) in \
-                enumerate(zip(self.starts[1:], self.sizes[1:])):
-            # Danger!  
-            # i is actually index - 1 because of slicing above...
-            # starts[i]   points to the block before this free space
-            # starts[i+1] points to the block after this free space, and is
-            #             always valid.
-            free_size = alloc_start - free_start
+        # Allocate in the first free space large enough
+        free_start = self._find_free(size)
+        if free_start is not None:
+            free_size = self._free_sizes[free_start]
+            # Index of the block before this free space
+            i = bisect.bisect_left(self.starts, free_start) - 1
+            self._remove_free(free_start)
             if free_size == size:
-                # Merge previous block with this one (removing this free space)
-                self.sizes[i] += free_size + alloc_size
-                del self.starts[i+1]
-                del self.sizes[i+1]
-                return free_start
-            elif free_size > size:
+                # Merge previous block with next (removing this free space)
+                self.sizes[i] += free_size + self.sizes[i + 1]
+                del self.starts[i + 1]
+                del self.sizes[i + 1]
+            else:
                 # Increase size of previous block to intrude into this free
                 # space.
                 self.sizes[i] += size
-                return free_start
-            free_start = alloc_start + alloc_size
+                self._add_free(free_start + size, free_size - size)
+            return free_start
         
         # Allocate at end of capacity
+        free_start = self.starts[-1] + self.sizes[-1]
         free_size = self.capacity - free_start
         if free_size >= size:
             self.sizes[-1] += size
@@ -225,16 +239,8 @@ class Allocator(object):
             return start
             
         # Find which block it lives in
-        for i, (alloc_start, alloc_size) in \
-                enumerate(zip(*(self.starts, self.sizes))):
-            p = start - alloc_start
-            if p >= 0 and size <= alloc_size - p:
-                break
-        if not (p >= 0 and size <= alloc_size - p):
-            print zip(self.starts, self.sizes)
-            print start, size, new_size
-            print p, alloc_start, alloc_size
-        assert p >= 0 and size <= alloc_size - p, 'Region not allocated'
+        i, p = self._find_block(start, size)
+        alloc_size = self.sizes[i]
 
         if size == alloc_size - p:
             # Region is at end of block.  Find how much free space is after
@@ -251,12 +257,17 @@ class Allocator(object):
             if free_size == new_size - size and not is_final_block:
                 # Merge block with next (region is expanded in place to
                 # exactly fill the free space)
+                self._remove_free(start + size)
                 self.sizes[i] += free_size + self.sizes[i + 1]
                 del self.starts[i + 1]
                 del self.sizes[i + 1]
                 return start
             elif free_size > new_size - size:
                 # Expand region in place
+                if not is_final_block:
+                    self._remove_free(start + size)
+                    self._add_free(start + new_size,
+                                   free_size - (new_size - size))
                 self.sizes[i] += new_size - size
                 return start
 
@@ -293,25 +304,42 @@ class Allocator(object):
         assert self.starts
         
         # Find which block needs to be split
-        for i, (alloc_start, alloc_size) in \
-                enumerate(zip(*(self.starts, self.sizes))):
-            p = start - alloc_start
-            if p >= 0 and size <= alloc_size - p:
-                break
-        
-        # Assert we left via the break
-        assert p >= 0 and size <= alloc_size - p, 'Region not allocated'
+        i, p = self._find_block(start, size)
+        alloc_start = self.starts[i]
+        alloc_size = self.sizes[i]
+        is_first_block = i == 0
+        is_final_block = i == len(self.starts) - 1
 
         if p == 0 and size == alloc_size:
-            # Remove entire block
+            # Remove entire block, joining the free space either side of it
+            if not is_first_block:
+                free_start = self.starts[i - 1] + self.sizes[i - 1]
+                if free_start < alloc_start:
+                    self._remove_free(free_start)
+            if not is_final_block:
+                if alloc_start + alloc_size < self.starts[i + 1]:
+                    self._remove_free(alloc_start + alloc_size)
+                if not is_first_block:
+                    self._add_free(free_start,
+                                   self.starts[i + 1] - free_start)
             del self.starts[i]
             del self.sizes[i]
         elif p == 0:
             # Truncate beginning of block
+            if not is_first_block:
+                free_start = self.starts[i - 1] + self.sizes[i - 1]
+                if free_start < alloc_start:
+                    self._remove_free(free_start)
+                self._add_free(free_start, start + size - free_start)
             self.starts[i] += size
             self.sizes[i] -= size
         elif size == alloc_size - p:
             # Truncate end of block
+            if not is_final_block:
+                free_end = self.starts[i + 1]
+                if start + size < free_end:
+                    self._remove_free(start + size)
+                self._add_free(start, free_end - start)
             self.sizes[i] -= size
         else:
             # Reduce size of left side, insert block at right side
@@ -334,6 +362,58 @@ class Allocator(object):
             self.sizes[i] = p
             self.starts.insert(i + 1, start + size)
             self.sizes.insert(i + 1, alloc_size - (p + size))
+            self._add_free(start, size)
+
+    def _find_block(self, start, size):
+        # Return the index of the block containing the region, and the
+        # offset of the region within it.
+        i = bisect.bisect_right(self.starts, start) - 1
+        p = start - self.starts[i]
+        assert i >= 0 and size <= self.sizes[i] - p, 'Region not allocated'
+        return i, p
+
+    def _find_free(self, size):
+        # Return the start of the first free space (other than at the end of
+        # the buffer) of at least size, or None.  Any free space in a larger
+        # size class is large enough, so only the first of each of those
+        # needs to be considered; free spaces in the same size class as size
+        # are checked in order until one is large enough.
+        size_class = _get_size_class(size)
+        best_start = None
+        for free_class, free_starts in self._free_starts.items():
+            if free_class > size_class:
+                if best_start is None or free_starts[0] < best_start:
+                    best_start = free_starts[0]
+
+        free_starts = self._free_starts.get(size_class)
+        if free_starts:
+            free_sizes = self._free_sizes
+            for free_start in free_starts:
+                if best_start is not None and free_start > best_start:
+                    break
+                if free_sizes[free_start] >= size:
+                    return free_start
+        return best_start
+
+    def _add_free(self, start, size):
+        self._free_sizes[start] = size
+        self._fragmented_free_size += size
+        size_class = _get_size_class(size)
+        free_starts = self._free_starts.get(size_class)
+        if free_starts is None:
+            self._free_starts[size_class] = [start]
+        else:
+            bisect.insort(free_starts, start)
+
+    def _remove_free(self, start):
+        size = self._free_sizes.pop(start)
+        self._fragmented_free_size -= size
+        size_class = _get_size_class(size)
+        free_starts = self._free_starts[size_class]
+        if len(free_starts) == 1:
+            del self._free_starts[size_class]
+        else:
+            del free_starts[bisect.bisect_left(free_starts, start)]
 
     def get_allocated_regions(self):
         '''Get a list of (aggregate) allocated regions.
@@ -353,18 +433,7 @@ class Allocator(object):
 
         :rtype: int
         '''
-        if not self.starts:
-            return 0
-
-        # Variation of search for free block.
-        total_free = 0
-        free_start = self.starts[0] + self.sizes[0]
-        for i, (alloc_start, alloc_size) in \
-                enumerate(zip(self.starts[1:], self.sizes[1:])):
-            total_free += alloc_start - free_start
-            free_start = alloc_start + alloc_size
-
-        return total_free
+        return self._fragmented_free_size
 
     def get_free_size(self):
         '''Return the amount of space unused.
@@ -402,3 +471,15 @@ class Allocator(object):
 
     def __repr__(self):
         return '<%s %s>' % (self.__class__.__name__, str(self))
+
+def _get_size_class(size):
+    # Small sizes each have their own class, so that a free space of the
+    # same class as an allocation always fits it; larger sizes are classed
+    # by the index of their highest set bit (32 and up).
+    if size < 32:
+        return size
+    size_class = 27
+    while size > 1:
+        size >>= 1
+        size_class += 1
+    return size_class
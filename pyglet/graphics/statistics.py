@@ -0,0 +1,249 @@
+# ----------------------------------------------------------------------------
+# pyglet
+# Copyright (c) 2006-2008 Alex Holkner
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of pyglet nor the names of its
+#    contributors may be used to endorse or promote products
+#    derived from this software without specific prior written
+#    permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+# ----------------------------------------------------------------------------
+# $Id:$
+
+'''Rendering statistics for batches.
+
+Statistics are collected for a `pyglet.graphics.Batch` only after its
+`enable_statistics` method is called.  Each call to `Batch.draw` then records
+a `FrameStatistics`, available from the batch's `statistics` attribute::
+
+    batch.enable_statistics()
+    ...
+    batch.draw()
+    print batch.statistics.frame.draw_calls
+
+    mean, maximum = batch.statistics.get_summary()
+
+When statistics are enabled the batch draws through wrappers that count each
+call, and the buffers of its domains count the data they upload; when they
+are disabled (the default) the batch draws exactly as it would otherwise, so
+there is no overhead.
+'''
+
+__docformat__ = 'restructuredtext'
+__version__ = '$Id: $'
+
+class FrameStatistics(object):
+    '''Statistics for one call to `Batch.draw`.
+
+    :Ivariables:
+        `draw_calls` : int
+            Number of OpenGL draw calls (``glDrawArrays``,
+            ``glMultiDrawArrays``, etc.) issued.
+        `draw_ranges` : int
+            Number of contiguous ranges of vertices drawn by those calls.
+        `set_state_calls` : int
+            Number of calls to `Group.set_state`.
+        `unset_state_calls` : int
+            Number of calls to `Group.unset_state`.
+        `vertices` : int
+            Number of vertices submitted; for indexed domains, the number of
+            indices.
+        `uploaded_bytes` : int
+            Number of bytes uploaded to the buffers of the domains drawn
+            while drawing.
+        `upload_calls` : int
+            Number of OpenGL calls used to upload those bytes.
+        `domains` : int
+            Number of vertex domains drawn.
+        `fragmentation` : float
+            Fraction of the free space in the domains drawn that lies
+            between vertex lists, and so cannot be used to extend them.
+
+    '''
+    fields = ('draw_calls', 'draw_ranges',
+              'set_state_calls', 'unset_state_calls',
+              'vertices', 'uploaded_bytes', 'upload_calls',
+              'domains', 'fragmentation')
+
+    def __init__(self):
+        for name in self.fields:
+            setattr(self, name, 0)
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__,
+            ', '.join(['%s=%r' % (name, getattr(self, name))
+                       for name in self.fields]))
+
+class BatchStatistics(object):
+    '''Statistics of the most recent frames drawn by a batch.
+
+    :Ivariables:
+        `history` : int
+            Maximum number of frames kept.
+        `frames` : list of `FrameStatistics`
+            Statistics of the most recent frames, oldest first.
+
+    '''
+    def __init__(self, history=60):
+        self.history = history
+        self.frames = []
+        self._reset_counters()
+
+    def _get_frame(self):
+        if self.frames:
+            return self.frames[-1]
+
+    frame = property(_get_frame,
+                     doc='''Statistics of the most recent frame, or ``None``
+                     if no frames have been drawn.
+
+                     :type: `FrameStatistics`
+                     ''')
+
+    def get_summary(self):
+        '''Get the mean and maximum of each statistic over the frames in
+        `frames`.
+
+        :rtype: (`FrameStatistics`, `FrameStatistics`)
+        :return: The mean and maximum, or ``(None, None)`` if no frames have
+            been drawn.
+        '''
+        if not self.frames:
+            return None, None
+
+        mean = FrameStatistics()
+        maximum = FrameStatistics()
+        for name in FrameStatistics.fields:
+            values = [getattr(frame, name) for frame in self.frames]
+            setattr(mean, name, sum(values) / float(len(values)))
+            setattr(maximum, name, max(values))
+        return mean, maximum
+
+    def reset(self):
+        '''Discard the statistics of all frames.'''
+        del self.frames[:]
+
+    def _reset_counters(self):
+        self._draw_calls = 0
+        self._draw_ranges = 0
+        self._set_state_calls = 0
+        self._unset_state_calls = 0
+        self._vertices = 0
+        self._uploaded_bytes = 0
+        self._upload_calls = 0
+
+    def _instrument(self, draw_list):
+        # Return a copy of a batch's draw list that counts the calls made by
+        # the original.  Domain draws are recognised by the ``domain``
+        # attribute given to them by the batch.
+        domains = []
+        instrumented = [self._begin_frame]
+        for func in draw_list:
+            domain = getattr(func, 'domain', None)
+            if domain is not None:
+                domains.append(domain)
+                func = self._create_counted_draw(func, domain)
+            elif getattr(func, '__name__', None) == 'set_state':
+                func = self._create_counted_set_state(func)
+            elif getattr(func, '__name__', None) == 'unset_state':
+                func = self._create_counted_unset_state(func)
+            instrumented.append(func)
+        instrumented.append(self._end_frame)
+
+        self._domains = domains
+        return instrumented
+
+    def _create_counted_draw(self, func, domain):
+        def draw():
+            draw_calls, ranges, vertices = domain._get_draw_counts()
+            self._draw_calls += draw_calls
+            self._draw_ranges += ranges
+            self._vertices += vertices
+            func()
+        return draw
+
+    def _create_counted_set_state(self, func):
+        def set_state():
+            self._set_state_calls += 1
+            func()
+        return set_state
+
+    def _create_counted_unset_state(self, func):
+        def unset_state():
+            self._unset_state_calls += 1
+            func()
+        return unset_state
+
+    def _get_upload_counters(self):
+        # Domains may replace their buffers, so are asked for them each time,
+        # and new buffers begin counting uploads when first seen.
+        uploaded_bytes = upload_calls = 0
+        for domain in self._domains:
+            for buffer in domain._get_buffers():
+                buffer.enable_upload_statistics()
+                uploaded_bytes += buffer.uploaded_bytes
+                upload_calls += buffer.upload_calls
+        return uploaded_bytes, upload_calls
+
+    def _disable_upload_counters(self):
+        # Called when statistics are disabled, so that buffers no longer
+        # count their uploads.
+        for domain in self._domains:
+            for buffer in domain._get_buffers():
+                buffer.disable_upload_statistics()
+        self._domains = []
+
+    def _begin_frame(self):
+        self._reset_counters()
+        self._uploaded_bytes, self._upload_calls = \
+            self._get_upload_counters()
+
+    def _end_frame(self):
+        frame = FrameStatistics()
+        frame.draw_calls = self._draw_calls
+        frame.draw_ranges = self._draw_ranges
+        frame.set_state_calls = self._set_state_calls
+        frame.unset_state_calls = self._unset_state_calls
+        frame.vertices = self._vertices
+
+        uploaded_bytes, upload_calls = self._get_upload_counters()
+        frame.uploaded_bytes = uploaded_bytes - self._uploaded_bytes
+        frame.upload_calls = upload_calls - self._upload_calls
+
+        frame.domains = len(self._domains)
+        fragmented_free_size = free_size = 0
+        for domain in self._domains:
+            fragmented_free_size += \
+                domain.allocator.get_fragmented_free_size()
+            free_size += domain.allocator.get_free_size()
+        if free_size:
+            frame.fragmentation = fragmented_free_size / float(free_size)
+        else:
+            frame.fragmentation = 0.
+
+        self.frames.append(frame)
+        if len(self.frames) > self.history:
+            del self.frames[0]
@@ -343,8 +343,11 @@ class AbstractAttribute(object):
             ptr_type = ctypes.POINTER(
                 self.c_type * (count * elem_stride - elem_offset))
             region = buffer.get_region(byte_start, byte_size, ptr_type)
-            return vertexbuffer.IndirectArrayRegion(
-                region, array_count, self.count, elem_stride)
+            if vertexbuffer.numpy is not None:
+                region_class = vertexbuffer.StridedArrayRegion
+            else:
+                region_class = vertexbuffer.IndirectArrayRegion
+            return region_class(region, array_count, self.count, elem_stride)
 
     def set_region(self, buffer, start, count, data):
         '''Set the data over a region of the buffer.
@@ -357,7 +360,9 @@ class AbstractAttribute(object):
             `count` : int
                 Number of vertices to set.
             `data` : sequence
-                Sequence of data components.
+                Sequence of data components.  If NumPy is available, this
+                can also be an array, which is copied without conversion
+                to a list.
 
         '''
         if self.stride == self.size:
@@ -365,12 +370,28 @@ class AbstractAttribute(object):
             byte_start = self.stride * start
             byte_size = self.stride * count
             array_count = self.count * count
-            data = (self.c_type * array_count)(*data)
-            buffer.set_data_region(data, byte_start, byte_size)
+            if (vertexbuffer.numpy is not None and
+                isinstance(data, vertexbuffer.numpy.ndarray)):
+                data = vertexbuffer.numpy.ascontiguousarray(data,
+                                                            dtype=self.c_type)
+                assert data.size == array_count, \
+                    'Data for attribute is incorrect length'
+                buffer.set_data_region(data.ctypes.data, byte_start, byte_size)
+            else:
+                # Slice assignment is much faster than passing the data to
+                # the array constructor.  As with the constructor, short
+                # data leaves the remaining components zero.
+                data_count = len(data)
+                if data_count > array_count:
+                    raise IndexError('too many initializers')
+                array = (self.c_type * array_count)()
+                array[:data_count] = data
+                buffer.set_data_region(array, byte_start, byte_size)
         else:
             # interleaved
             region = self.get_region(buffer, start, count)
             region[:] = data
+            region.invalidate()
 
 class ColorAttribute(AbstractAttribute):
     '''Color vertex attribute.'''
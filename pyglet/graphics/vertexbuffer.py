@@ -42,17 +42,30 @@ Buffers can optionally be created "mappable" (incorporating the
 `AbstractMappable` mix-in).  In this case the buffer provides a ``get_region``
 method which provides the most efficient path for updating partial data within
 the buffer.
+
+Mappable buffers created with ``GL_STREAM_DRAW`` usage are
+`StreamingVertexBufferObject` instances, which upload each frame's data to a
+different part of the buffer object so that the upload need not wait for the
+previous frame to be drawn.
+
+If NumPy is installed, interleaved regions are accessed through
+`StridedArrayRegion`, which wraps a strided view over the mapped memory rather
+than copying the whole interleaved region into a list on every access.
 '''
 
 __docformat__ = 'restructuredtext'
 __version__ = '$Id: $'
 
 import ctypes
-import sys
 
 import pyglet
 from pyglet.gl import *
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 _enable_vbo = pyglet.options['graphics_vbo']
 
 # Enable workaround permanently if any VBO is created on a context that has
@@ -106,6 +119,9 @@ def create_mappable_buffer(size,
             True if a `VertexBufferObject` should be created if the driver
             supports it; otherwise only a `VertexArray` is created.
 
+    If a VBO is created with ``GL_STREAM_DRAW`` usage, it is a
+    `StreamingVertexBufferObject`.
+
     :rtype: `AbstractBuffer` with `AbstractMappable`
     '''
     from pyglet import gl
@@ -113,10 +129,50 @@ def create_mappable_buffer(size,
         gl_info.have_version(1, 5) and
         _enable_vbo and
         not gl.current_context._workaround_vbo):
+        if usage == GL_STREAM_DRAW:
+            return StreamingVertexBufferObject(size, target, usage)
         return MappableVertexBufferObject(size, target, usage)
     else:
         return VertexArray(size)
 
+class UploadCounter(object):
+    '''Count of the data uploaded to OpenGL by a buffer.
+
+    :Ivariables:
+        `uploaded_bytes` : int
+            Number of bytes uploaded.
+        `upload_calls` : int
+            Number of OpenGL calls used to upload them.
+
+    '''
+    def __init__(self):
+        self.uploaded_bytes = 0
+        self.upload_calls = 0
+
+    def count(self, size, calls=1):
+        '''Count `size` bytes uploaded with `calls` OpenGL calls.'''
+        self.uploaded_bytes += size
+        self.upload_calls += calls
+
+    def reset(self):
+        '''Reset both counts to zero.'''
+        self.uploaded_bytes = 0
+        self.upload_calls = 0
+
+class _NullUploadCounter(object):
+    # Stands in for an UploadCounter while a buffer's upload statistics are
+    # disabled, so that buffers need not test whether to count.
+    uploaded_bytes = 0
+    upload_calls = 0
+
+    def count(self, size, calls=1):
+        pass
+
+    def reset(self):
+        pass
+
+_null_upload_counter = _NullUploadCounter()
+
 class AbstractBuffer(object):
     '''Abstract buffer of byte data.
 
@@ -130,11 +186,29 @@ class AbstractBuffer(object):
             OpenGL buffer target, for example ``GL_ARRAY_BUFFER``
         `usage` : int
             OpenGL buffer usage, for example ``GL_DYNAMIC_DRAW``
+        `upload_counter` : `UploadCounter`
+            Counter of the data uploaded since upload statistics were
+            enabled with `enable_upload_statistics`.  While they are
+            disabled (the default), uploads are not counted.
+        `uploaded_bytes` : int
+            Number of bytes uploaded to OpenGL since upload statistics were
+            enabled, or since `reset_upload_counters` was last called.
+            Always 0 for buffers in system memory, or if upload statistics
+            are disabled.  Read-only.
+        `upload_calls` : int
+            Number of OpenGL calls used to upload data since upload
+            statistics were enabled, or since `reset_upload_counters` was
+            last called.  Read-only.
 
     '''
 
     ptr = 0
     size = 0
+    upload_counter = _null_upload_counter
+
+    uploaded_bytes = property(
+        lambda self: self.upload_counter.uploaded_bytes)
+    upload_calls = property(lambda self: self.upload_counter.upload_calls)
 
     def bind(self):
         '''Bind this buffer to its OpenGL target.'''
@@ -201,6 +275,27 @@ class AbstractBuffer(object):
         '''Delete this buffer, reducing system resource usage.'''
         raise NotImplementedError('abstract')
 
+    def enable_upload_statistics(self):
+        '''Begin counting the data uploaded to OpenGL.
+
+        Does nothing if upload statistics are already enabled.
+        '''
+        if self.upload_counter is _null_upload_counter:
+            self.upload_counter = UploadCounter()
+
+    def disable_upload_statistics(self):
+        '''Stop counting the data uploaded to OpenGL, discarding the
+        counts.'''
+        self.upload_counter = _null_upload_counter
+
+    def reset_upload_counters(self):
+        '''Reset `uploaded_bytes` and `upload_calls` to zero.
+
+        Call this at the start of each frame to count the uploads made
+        during that frame.
+        '''
+        self.upload_counter.reset()
+
 class AbstractMappable(object):
     def get_region(self, start, size, ptr_type):
         '''Map a region of the buffer into a ctypes array of the desired
@@ -319,12 +414,14 @@ class VertexBufferObject(AbstractBuffer):
         glBindBuffer(self.target, self.id)
         glBufferData(self.target, self.size, data, self.usage)
         glPopClientAttrib()
+        self.upload_counter.count(self.size)
 
     def set_data_region(self, data, start, length):
         glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
         glBindBuffer(self.target, self.id)
         glBufferSubData(self.target, start, length, data)
         glPopClientAttrib()
+        self.upload_counter.count(length)
 
     def map(self, invalidate=False):
         glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
@@ -366,52 +463,68 @@ class VertexBufferObject(AbstractBuffer):
         self.size = size
         glBufferData(self.target, self.size, temp, self.usage)
         glPopClientAttrib()
+        self.upload_counter.count(size)
 
 class MappableVertexBufferObject(VertexBufferObject, AbstractMappable):
     '''A VBO with system-memory backed store.
 
-    Updates to the data via `set_data`, `set_data_region` and `map` will be
-    held in local memory until `bind` is called.  The advantage is that fewer
-    OpenGL calls are needed, increasing performance.
+    Updates to the data via `set_data_region`, `map` and buffer regions will
+    be held in local memory until `bind` is called.  The advantage is that
+    fewer OpenGL calls are needed, increasing performance.
+
+    The byte ranges changed since the buffer was last bound are recorded
+    separately, so that scattered changes to a large buffer do not cause the
+    entire span between them to be uploaded.  When the buffer is bound,
+    ranges separated by no more than `merge_gap` bytes are merged, and each
+    resulting range is uploaded with one call.
 
     There may also be less performance penalty for resizing this buffer.
 
-    Updates to data via `map` are committed immediately.
+    Updates to data via `set_data` are committed immediately.
+
+    :Ivariables:
+        `merge_gap` : int
+            Largest number of unchanged bytes between two changed ranges
+            for which the ranges are uploaded together.  Larger values
+            result in fewer, larger uploads.
+
     '''
+    merge_gap = 1024
+
     def __init__(self, size, target, usage):
         super(MappableVertexBufferObject, self).__init__(size, target, usage)
         self.data = (ctypes.c_byte * size)()
         self.data_ptr = ctypes.cast(self.data, ctypes.c_void_p).value
-        self._dirty_min = sys.maxint
-        self._dirty_max = 0
+        self._dirty_ranges = []
 
     def bind(self):
         # Commit pending data
         super(MappableVertexBufferObject, self).bind()
-        size = self._dirty_max - self._dirty_min
-        if size > 0:
-            if size == self.size:
+        if self._dirty_ranges:
+            ranges = _merge_ranges(self._dirty_ranges, self.merge_gap)
+            self._dirty_ranges = []
+            if ranges == [(0, self.size)]:
                 glBufferData(self.target, self.size, self.data, self.usage)
+                self.upload_counter.count(self.size)
             else:
-                glBufferSubData(self.target, self._dirty_min, size,
-                    self.data_ptr + self._dirty_min)
-            self._dirty_min = sys.maxint
-            self._dirty_max = 0
+                data_ptr = self.data_ptr
+                count = self.upload_counter.count
+                for start, end in ranges:
+                    glBufferSubData(self.target, start, end - start,
+                                    data_ptr + start)
+                    count(end - start)
 
     def set_data(self, data):
         super(MappableVertexBufferObject, self).set_data(data)
         ctypes.memmove(self.data, data, self.size)
-        self._dirty_min = 0
-        self._dirty_max = self.size
+        self._dirty_ranges = []
 
     def set_data_region(self, data, start, length):
         ctypes.memmove(self.data_ptr + start, data, length)
-        self._dirty_min = min(start, self._dirty_min)
-        self._dirty_max = max(start + length, self._dirty_max)
+        self._invalidate_range(start, start + length)
 
     def map(self, invalidate=False):
-        self._dirty_min = 0
-        self._dirty_max = self.size
+        self._dirty_ranges = [(0, self.size)]
         return self.data
 
     def unmap(self):
@@ -433,8 +546,103 @@ class MappableVertexBufferObject(VertexBufferObject, AbstractMappable):
         glBufferData(self.target, self.size, self.data, self.usage)
         glPopClientAttrib()
 
-        self._dirty_min = sys.maxint
-        self._dirty_max = 0
+        self._dirty_ranges = []
+        self.upload_counter.count(size)
+
+    def _invalidate_range(self, start, end):
+        ranges = self._dirty_ranges
+        if ranges:
+            # Changes are commonly made in order, or to the same region
+            # repeatedly; extend the last range rather than adding another.
+            last_start, last_end = ranges[-1]
+            if start <= last_end and end >= last_start:
+                if start < last_start or end > last_end:
+                    ranges[-1] = (min(start, last_start), max(end, last_end))
+                return
+        ranges.append((start, end))
+
+class StreamingVertexBufferObject(MappableVertexBufferObject):
+    '''A mappable VBO for data that is replaced every frame.
+
+    Rewriting a buffer that is still being read by the previous frame's
+    draw calls causes the driver to wait for them to complete.  This buffer
+    object instead holds `segments` copies of the data, one after another.
+    Each time the buffer is bound after its data has changed, the entire
+    data is uploaded to the next segment and `ptr` is set to the offset of
+    that segment, so the segments drawn in the previous frames are left
+    untouched.  When the ring of segments wraps around, the buffer object's
+    storage is orphaned, allowing the driver to allocate new storage rather
+    than wait for the old to be released.
+
+    As each segment is stale by the time it is reused, data is always
+    uploaded in its entirety; use this buffer only for data that changes
+    almost entirely between frames.
+
+    :Ivariables:
+        `segments` : int
+            Number of copies of the data held by the buffer object.
+
+    '''
+    segments = 3
+
+    def __init__(self, size, target, usage):
+        super(StreamingVertexBufferObject, self).__init__(size, target, usage)
+        self._segment = 0
+        self._allocate_segments()
+
+    def _allocate_segments(self):
+        glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+        glBindBuffer(self.target, self.id)
+        glBufferData(self.target, self.size * self.segments, None,
+                     self.usage)
+        glPopClientAttrib()
+
+        # Upload the data to the first segment when next bound.
+        self._segment = self.segments - 1
+        self._dirty_ranges = [(0, self.size)]
+
+    def bind(self):
+        glBindBuffer(self.target, self.id)
+        if self._dirty_ranges:
+            self._dirty_ranges = []
+            segment = (self._segment + 1) % self.segments
+            if segment == 0:
+                # Orphan the storage read by previous frames
+                glBufferData(self.target, self.size * self.segments, None,
+                             self.usage)
+            self.ptr = segment * self.size
+            glBufferSubData(self.target, self.ptr, self.size, self.data)
+            self._segment = segment
+            self.upload_counter.count(self.size)
+
+    def set_data(self, data):
+        ctypes.memmove(self.data, data, self.size)
+        self._dirty_ranges = [(0, self.size)]
+
+    def resize(self, size):
+        data = (ctypes.c_byte * size)()
+        ctypes.memmove(data, self.data, min(size, self.size))
+        self.data = data
+        self.data_ptr = ctypes.cast(self.data, ctypes.c_void_p).value
+
+        self.size = size
+        self.ptr = 0
+        self._allocate_segments()
+
+def _merge_ranges(ranges, merge_gap):
+    # Sort a list of (start, end) ranges and merge those that overlap or are
+    # separated by no more than merge_gap.
+    ranges.sort()
+    merged = []
+    start, end = ranges[0]
+    for range_start, range_end in ranges:
+        if range_start - end > merge_gap:
+            merged.append((start, end))
+            start = range_start
+        if range_end > end:
+            end = range_end
+    merged.append((start, end))
+    return merged
 
 class AbstractBufferRegion(object):
     '''A mapped region of a buffer.
@@ -464,9 +672,7 @@ class VertexBufferObjectRegion(AbstractBufferRegion):
         self.array = array
 
     def invalidate(self):
-        buffer = self.buffer
-        buffer._dirty_min = min(buffer._dirty_min, self.start)
-        buffer._dirty_max = max(buffer._dirty_max, self.end)
+        self.buffer._invalidate_range(self.start, self.end)
 
 class VertexArrayRegion(AbstractBufferRegion):
     '''A mapped region of a vertex array.
@@ -514,8 +720,8 @@ class IndirectArrayRegion(AbstractBufferRegion):
         self.array = self
 
     def __repr__(self):
-        return 'IndirectArrayRegion(size=%d, count=%d, stride=%d)' % (
-            self.size, self.count, self.stride)
+        return '%s(size=%d, count=%d, stride=%d)' % (
+            self.__class__.__name__, self.size, self.count, self.stride)
 
     def __getitem__(self, index):
         count = self.count
@@ -594,3 +800,61 @@ class IndirectArrayRegion(AbstractBufferRegion):
 
     def invalidate(self):
         self.region.invalidate()
+
+class StridedArrayRegion(IndirectArrayRegion):
+    '''A mapped region of interleaved data accessed through a NumPy view.
+
+    This region is used in place of `IndirectArrayRegion` when NumPy is
+    available.  It presents the same flat, contiguous-looking interface, but
+    slices are read from and written to a strided view over the mapped
+    memory, so the rest of the interleaved buffer is never copied.  As with
+    `IndirectArrayRegion`, reading a slice returns a list; use `view` to
+    work with the data as an array without copying it.  Assigning a NumPy
+    array to a slice copies it straight into the buffer.
+
+    :Ivariables:
+        `view` : ``numpy.ndarray``
+            Two-dimensional array of shape ``(vertices, component_count)``
+            sharing memory with the mapped region.  Writes to the view are
+            written directly to the buffer (call `invalidate` afterwards).
+
+    '''
+    def __init__(self, region, size, component_count, component_stride):
+        super(StridedArrayRegion, self).__init__(
+            region, size, component_count, component_stride)
+        data = numpy.ctypeslib.as_array(region.array)
+        self.view = numpy.lib.stride_tricks.as_strided(data,
+            shape=(size // component_count, component_count),
+            strides=(component_stride * data.itemsize, data.itemsize))
+
+    def _get_rows(self, index):
+        # Return the slice of rows in `view` covered by `index`, or None if
+        # the slice does not fall on whole-vertex boundaries.
+        start, stop, step = index.indices(self.size)
+        count = self.count
+        if step == 1 and start % count == 0 and stop % count == 0:
+            return slice(start // count, max(start, stop) // count)
+        return None
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return super(StridedArrayRegion, self).__getitem__(index)
+
+        rows = self._get_rows(index)
+        if rows is not None:
+            return self.view[rows].reshape(-1).tolist()
+        return self.view.flat[index].tolist()
+
+    def __setitem__(self, index, value):
+        if not isinstance(index, slice):
+            super(StridedArrayRegion, self).__setitem__(index, value)
+            return
+
+        rows = self._get_rows(index)
+        if rows is not None:
+            view = self.view[rows]
+            view[...] = numpy.reshape(value, view.shape)
+        else:
+            if len(value) != len(xrange(*index.indices(self.size))):
+                raise ValueError('Can only assign sequence of same size')
+            self.view.flat[index] = value
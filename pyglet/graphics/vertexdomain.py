@@ -43,7 +43,9 @@ new vertices.
 
 Domains can optionally be indexed, in which case they also manage a buffer
 containing vertex indices.  This buffer is grown separately and has no size
-relation to the attribute buffers.
+relation to the attribute buffers.  Indices are stored as 16-bit integers
+until the domain holds more vertices than can be addressed with them, at
+which point the index buffer is converted to 32-bit integers.
 
 Applications can create vertices (and optionally, indices) within a domain
 with the `VertexDomain.create` method.  This returns a `VertexList`
@@ -54,14 +56,32 @@ buffers automatically.
 The entire domain can be efficiently drawn in one step with the
 `VertexDomain.draw` method, assuming all the vertices comprise primitives of
 the same OpenGL primitive mode.
+
+As vertex lists are deleted and resized the free space within a domain
+becomes fragmented, and the buffers may grow even though the number of
+vertices in use does not.  `VertexDomain.compact` moves all vertex lists to
+the start of the buffers and shrinks them; this can also be done
+automatically by setting `VertexDomain.compact_threshold`.
+
+Buffers are never shrunk as vertex lists are deleted.  If
+`VertexDomain.shrink_threshold` is set, each time the entire domain is drawn
+(usually once per frame) the domain checks whether its usage is below it.  If
+it remains so for `VertexDomain.shrink_frames` consecutive draws, the domain
+is compacted and its buffers are halved in size, moving vertex lists and
+invalidating any regions obtained from them.  The defaults are given by the
+``graphics_shrink_threshold`` option, which is None (never shrink), and the
+``graphics_shrink_frames`` option.
 '''
 
 __docformat__ = 'restructuredtext'
 __version__ = '$Id: $'
 
+import bisect
 import ctypes
 import re
+import weakref
 
+import pyglet
 from pyglet.gl import *
 from pyglet.graphics import allocation, vertexattribute, vertexbuffer
 
@@ -77,6 +97,13 @@ _gl_usages = {
     'none': GL_STREAM_DRAW_ARB, # Force no VBO
 }
 
+# Largest vertex index that can be stored with each index type.
+_max_indices = {
+    GL_UNSIGNED_BYTE: 0xff,
+    GL_UNSIGNED_SHORT: 0xffff,
+    GL_UNSIGNED_INT: 0xffffffff,
+}
+
 def _nearest_pow2(v):
     # From http://graphics.stanford.edu/~seander/bithacks.html#RoundUpPowerOf2
     # Credit: Sean Anderson
@@ -97,8 +124,11 @@ def create_attribute_usage(format):
 
     If the usage is not given it defaults to 'dynamic'.  The usage corresponds
     to the OpenGL VBO usage hint, and for ``static`` also indicates a
-    preference for interleaved arrays.  If ``none`` is specified a buffer
-    object is not created, and vertex data is stored in system memory.
+    preference for interleaved arrays.  For ``stream``, the attribute is
+    given its own `vertexbuffer.StreamingVertexBufferObject`, which is
+    uploaded to a different region of video memory each frame.  If ``none``
+    is specified a buffer object is not created, and vertex data is stored
+    in system memory.
 
     Some examples:
 
@@ -146,6 +176,109 @@ def create_indexed_domain(*attribute_usage_formats):
                         for f in attribute_usage_formats]
     return IndexedVertexDomain(attribute_usages)
 
+def _compact_blocks(allocator, regions, start_name, count_name):
+    # Give each allocated block of allocator a new start so that the blocks
+    # are contiguous from 0, and update the start attribute of each of the
+    # objects in regions, which lie within the blocks, to match.  Regions
+    # of vertex lists that have been garbage collected without being deleted
+    # remain allocated, and are moved with the others.  Return a list of
+    # (old_start, new_start, count) for each block, and the total count.
+    starts, sizes = allocator.get_allocated_regions()
+    blocks = []
+    new_start = 0
+    for start, size in zip(starts, sizes):
+        blocks.append((start, new_start, size))
+        new_start += size
+
+    starts = list(starts)
+    for region in regions:
+        if getattr(region, count_name) == 0:
+            # Not allocated
+            continue
+        start = getattr(region, start_name)
+        old_block_start, new_block_start, size = \
+            blocks[bisect.bisect_right(starts, start) - 1]
+        setattr(region, start_name, start - old_block_start + new_block_start)
+    return blocks, new_start
+
+def _move_buffer_regions(buffer, element_size, blocks):
+    # Apply the moves of blocks returned by _compact_blocks to the elements
+    # of a buffer.  Blocks only move towards the start of the buffer, and are
+    # moved in order, so no block is overwritten before it is moved.
+    moves = [block for block in blocks if block[0] != block[1]]
+    if not moves:
+        return
+    ptr = ctypes.addressof(buffer.map())
+    for old_start, new_start, count in moves:
+        ctypes.memmove(ptr + new_start * element_size,
+                       ptr + old_start * element_size,
+                       count * element_size)
+    buffer.unmap()
+
+def _get_ranges(ranges):
+    # Sort a list of (start, count) ranges and merge adjacent ranges.  Return
+    # a ctypes array of starts and one of counts.
+    ranges.sort()
+    starts = []
+    counts = []
+    end = None
+    for start, count in ranges:
+        if count == 0:
+            continue
+        if start == end:
+            counts[-1] += count
+        else:
+            starts.append(start)
+            counts.append(count)
+        end = start + count
+    return (GLint * len(starts))(*starts), (GLsizei * len(counts))(*counts)
+
+def _get_draw_counts(allocator):
+    # Return the number of draw calls, ranges and elements used to draw all
+    # the allocated regions of allocator.
+    starts, sizes = allocator.get_allocated_regions()
+    ranges = len(starts)
+    draw_calls = ranges
+    if ranges > 1 and gl_info.have_version(1, 4):
+        draw_calls = 1
+    return draw_calls, ranges, sum(sizes)
+
+def _is_shrinkable(allocator, minimum_capacity, threshold):
+    # Return True if allocator is larger than minimum_capacity and its usage
+    # is below threshold.  Allocator.get_usage counts any space before the
+    # first block as used, so is not used here.
+    if not threshold or allocator.capacity <= minimum_capacity:
+        return False
+    used = allocator.capacity - allocator.get_free_size()
+    if allocator.starts:
+        used -= allocator.starts[0]
+    return used < threshold * allocator.capacity
+
+def _create_allocator(capacity, count):
+    # Create an allocator with the first count elements allocated.
+    allocator = allocation.Allocator(capacity)
+    if count:
+        allocator.alloc(count)
+    return allocator
+
+def _create_allocator_regions(capacity, starts, sizes):
+    # Create an allocator with the given blocks allocated, by allocating
+    # everything up to the end of the last block and freeing the gaps.
+    allocator = allocation.Allocator(capacity)
+    if starts:
+        allocator.alloc(starts[-1] + sizes[-1])
+        end = 0
+        for start, size in zip(starts, sizes):
+            if start > end:
+                allocator.dealloc(end, start - end)
+            end = start + size
+    return allocator
+
+def _get_buffer_data(buffer):
+    # Return the contents of a mappable buffer as a string.
+    return ctypes.string_at(getattr(buffer, 'data_ptr', buffer.ptr),
+                            buffer.size)
+
 class VertexDomain(object):
     '''Management of a set of vertex lists.
 
@@ -155,9 +288,47 @@ class VertexDomain(object):
     _version = 0
     _initial_count = 16
 
+    # Function called with no arguments when the last vertex list is removed
+    # from the domain.  Set by `pyglet.graphics.Batch`.
+    _on_empty = None
+
+    #: Fragmentation of the vertex buffers (as given by
+    #: `Allocator.get_fragmentation`) above which the domain is compacted
+    #: when a vertex list is removed from it, or ``None`` to only compact
+    #: the domain when `compact` is called.  The domain is only compacted
+    #: automatically if doing so would allow its buffers to shrink.
+    #:
+    #: :type: float
+    compact_threshold = None
+
+    #: Usage of the vertex buffers (as given by `Allocator.get_usage`) below
+    #: which the domain is shrunk, if it remains so for `shrink_frames`
+    #: consecutive draws of the whole domain; or ``None`` to never shrink
+    #: the domain.  Defaults to the ``graphics_shrink_threshold`` option,
+    #: which is ``None``.
+    #:
+    #: :type: float
+    shrink_threshold = pyglet.options['graphics_shrink_threshold']
+
+    #: Number of consecutive draws for which the domain's usage must remain
+    #: below `shrink_threshold` before it is shrunk.  Defaults to the
+    #: ``graphics_shrink_frames`` option.
+    #:
+    #: :type: int
+    shrink_frames = pyglet.options['graphics_shrink_frames']
+
+    # Number of consecutive draws for which the domain could be shrunk.
+    _shrink_count = 0
+
     def __init__(self, attribute_usages):
         self.allocator = allocation.Allocator(self._initial_count)
 
+        # Vertex lists allocated in this domain, needed to update their
+        # positions when the domain is compacted.  The keys are weak, as each
+        # vertex list refers to its domain, and the domain has a __del__
+        # method that would prevent the cycle from being collected.
+        self._vertex_lists = weakref.WeakKeyDictionary()
+
         # If there are any MultiTexCoord attributes, then a TexCoord attribute
         # must be converted.
         have_multi_texcoord = False
@@ -245,11 +416,7 @@ class VertexDomain(object):
         try:
             return self.allocator.alloc(count)
         except allocation.AllocatorMemoryException, e:
-            capacity = _nearest_pow2(e.requested_capacity)
-            self._version += 1
-            for buffer, _ in self.buffer_attributes:
-                buffer.resize(capacity * buffer.element_size)
-            self.allocator.set_capacity(capacity)
+            self._set_capacity(_nearest_pow2(e.requested_capacity))
             return self.allocator.alloc(count)
 
     def _safe_realloc(self, start, count, new_count):
@@ -257,13 +424,16 @@ class VertexDomain(object):
         try:
             return self.allocator.realloc(start, count, new_count)
         except allocation.AllocatorMemoryException, e:
-            capacity = _nearest_pow2(e.requested_capacity)
-            self._version += 1
-            for buffer, _ in self.buffer_attributes:
-                buffer.resize(capacity * buffer.element_size)
-            self.allocator.set_capacity(capacity)
+            self._set_capacity(_nearest_pow2(e.requested_capacity))
             return self.allocator.realloc(start, count, new_count)
 
+    def _set_capacity(self, capacity):
+        '''Grow the buffers to hold `capacity` vertices.'''
+        self._version += 1
+        for buffer, _ in self.buffer_attributes:
+            buffer.resize(capacity * buffer.element_size)
+        self.allocator.set_capacity(capacity)
+
     def create(self, count):
         '''Create a `VertexList` in this domain.
 
@@ -276,6 +446,24 @@ class VertexDomain(object):
         start = self._safe_alloc(count)
         return VertexList(self, start, count)
 
+    def create_many(self, n, count):
+        '''Create a number of `VertexList` objects of the same size in this
+        domain.
+
+        The vertex lists are allocated as a single contiguous block, in
+        order, but can be resized and deleted individually.
+
+        :Parameters:
+            `n` : int
+                Number of vertex lists to create.
+            `count` : int
+                Number of vertices in each vertex list.
+
+        :rtype: list of `VertexList`
+        '''
+        start = self._safe_alloc(n * count)
+        return [VertexList(self, start + i * count, count) for i in range(n)]
+
     def draw(self, mode, vertex_list=None):
         '''Draw vertices in the domain.
 
@@ -305,24 +493,178 @@ class VertexDomain(object):
             glDrawArrays(mode, vertex_list.start, vertex_list.count)
         else:
             starts, sizes = self.allocator.get_allocated_regions()
-            primcount = len(starts)
-            if primcount == 0:
-                pass
-            elif primcount == 1:
-                # Common case
-                glDrawArrays(mode, starts[0], sizes[0])
-            elif gl_info.have_version(1, 4):
-                starts = (GLint * primcount)(*starts)
-                sizes = (GLsizei * primcount)(*sizes)
-                glMultiDrawArrays(mode, starts, sizes, primcount)
-            else:
-                for start, size in zip(starts, sizes):
-                    glDrawArrays(mode, start, size)
+            self._draw_ranges(mode, starts, sizes)
 
         for buffer, _ in self.buffer_attributes:
             buffer.unbind()
         glPopClientAttrib()
 
+        if vertex_list is None:
+            self._check_shrink()
+
+    def draw_subset(self, mode, subset):
+        '''Draw some of the vertex lists in the domain.
+
+        :Parameters:
+            `mode` : int
+                OpenGL drawing mode, e.g. ``GL_POINTS``, ``GL_LINES``, etc.
+            `subset` : (starts, sizes)
+                The vertex lists to draw, as returned by `get_subset`.
+
+        '''
+        glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+        for buffer, attributes in self.buffer_attributes:
+            buffer.bind()
+            for attribute in attributes:
+                attribute.enable()
+                attribute.set_pointer(attribute.buffer.ptr)
+        if vertexbuffer._workaround_vbo_finish:
+            glFinish()
+
+        self._draw_ranges(mode, *subset)
+
+        for buffer, _ in self.buffer_attributes:
+            buffer.unbind()
+        glPopClientAttrib()
+
+    def get_subset(self, vertex_lists):
+        '''Get the ranges of vertices to draw for some of the vertex lists in
+        the domain.
+
+        The vertex lists' ranges are sorted, and adjacent ranges are merged,
+        so that they can be drawn with a single ``glMultiDrawArrays`` call.
+        The result can be kept and drawn repeatedly with `draw_subset`, until
+        any of the vertex lists are resized, migrated or deleted, or the
+        domain is compacted.
+
+        :Parameters:
+            `vertex_lists` : sequence of `VertexList`
+                Vertex lists belonging to this domain.
+
+        :rtype: (starts, sizes)
+        '''
+        return _get_ranges([(vertex_list.start, vertex_list.count)
+                            for vertex_list in vertex_lists])
+
+    def _draw_ranges(self, mode, starts, sizes):
+        # starts and sizes are sequences of equal length, or ctypes arrays.
+        primcount = len(starts)
+        if primcount == 0:
+            pass
+        elif primcount == 1:
+            # Common case
+            glDrawArrays(mode, starts[0], sizes[0])
+        elif gl_info.have_version(1, 4):
+            if not isinstance(starts, ctypes.Array):
+                starts = (GLint * primcount)(*starts)
+                sizes = (GLsizei * primcount)(*sizes)
+            glMultiDrawArrays(mode, starts, sizes, primcount)
+        else:
+            for start, size in zip(starts, sizes):
+                glDrawArrays(mode, start, size)
+
+    def compact(self):
+        '''Move all vertex lists to the start of the domain, removing the
+        free space between them, and shrink the buffers to fit.
+
+        Each contiguous run of vertex lists is moved with a single copy
+        within each buffer, and the buffers are uploaded in one operation
+        the next time they are bound.  The ``start`` of each vertex list is
+        updated, and any attribute arrays previously retrieved from the
+        vertex lists become invalid.
+        '''
+        self._compact(self._initial_count)
+
+    def _compact(self, capacity):
+        # Compact the domain, shrinking the buffers to the smallest power of
+        # two that fits the vertex lists, but no smaller than capacity.
+        # Return the blocks moved, as given by _compact_blocks.
+        blocks, count = _compact_blocks(self.allocator,
+                                        self._vertex_lists.keys(),
+                                        'start', 'count')
+        self._version += 1
+
+        capacity = max(_nearest_pow2(count), capacity)
+        for buffer, _ in self.buffer_attributes:
+            _move_buffer_regions(buffer, buffer.element_size, blocks)
+            if capacity < self.allocator.capacity:
+                buffer.resize(capacity * buffer.element_size)
+        self.allocator = _create_allocator(
+            min(capacity, self.allocator.capacity), count)
+        return blocks
+
+    def _check_compact(self):
+        # Called when a vertex list is removed.
+        allocator = self.allocator
+        if (self.compact_threshold is not None and allocator.starts and
+            allocator.get_fragmentation() > self.compact_threshold):
+            used = sum(allocator.sizes)
+            if max(_nearest_pow2(used), self._initial_count) < \
+                    allocator.capacity:
+                self.compact()
+
+    def _check_shrink(self):
+        # Called each time the whole domain is drawn.
+        if not self._is_shrinkable():
+            self._shrink_count = 0
+            return
+
+        self._shrink_count += 1
+        if self._shrink_count >= self.shrink_frames:
+            self._shrink_count = 0
+            self._shrink()
+
+    def _is_shrinkable(self):
+        return _is_shrinkable(self.allocator, self._initial_count,
+                              self.shrink_threshold)
+
+    def _shrink(self):
+        # Halve the capacity of the buffers, compacting the vertex lists so
+        # that they fit.  Growing again by the same amount doubles the
+        # buffers only once, so usage oscillating around the threshold does
+        # not cause the buffers to be resized every few frames.
+        self._compact(max(self.allocator.capacity // 2, self._initial_count))
+
+    def _get_draw_counts(self):
+        # Used by pyglet.graphics.statistics
+        return _get_draw_counts(self.allocator)
+
+    def _save(self):
+        # Used by Batch.save.  Return a description of the vertex lists and
+        # allocated regions, the contents of each buffer, and the vertex
+        # lists in the order described.
+        starts, sizes = self.allocator.get_allocated_regions()
+        vertex_lists = sorted(self._vertex_lists.keys(),
+                              key=lambda v: v.start)
+        info = {
+            'capacity': self.allocator.capacity,
+            'starts': list(starts),
+            'sizes': list(sizes),
+            'vertex_lists': [(v.start, v.count) for v in vertex_lists],
+        }
+        data = [_get_buffer_data(buffer)
+                for buffer, _ in self.buffer_attributes]
+        return info, data, vertex_lists
+
+    def _load(self, info, data):
+        # Used by Batch.load.  Restore the contents of an empty domain from
+        # the result of _save, and return its vertex lists.
+        self._load_vertices(info, data)
+        return [VertexList(self, start, count)
+                for start, count in info['vertex_lists']]
+
+    def _load_vertices(self, info, data):
+        if info['capacity'] > self.allocator.capacity:
+            self._set_capacity(info['capacity'])
+        for (buffer, _), buffer_data in zip(self.buffer_attributes, data):
+            buffer.set_data_region(buffer_data, 0, len(buffer_data))
+        self.allocator = _create_allocator_regions(
+            self.allocator.capacity, info['starts'], info['sizes'])
+        self._version += 1
+
+    def _get_buffers(self):
+        return [buffer for buffer, _ in self.buffer_attributes]
+
     def _is_empty(self):
         return not self.allocator.starts
 
@@ -340,6 +682,7 @@ class VertexList(object):
         self.domain = domain
         self.start = start
         self.count = count
+        domain._vertex_lists[self] = True
 
     def get_size(self):
         '''Get the number of vertices in the list.
@@ -396,7 +739,13 @@ class VertexList(object):
 
     def delete(self):
         '''Delete this group.'''
-        self.domain.allocator.dealloc(self.start, self.count)
+        domain = self.domain
+        domain.allocator.dealloc(self.start, self.count)
+        del domain._vertex_lists[self]
+        if domain._on_empty is not None and domain._is_empty():
+            domain._on_empty()
+        else:
+            domain._check_compact()
 
     def migrate(self, domain):
         '''Move this group from its current domain and add to the specified
@@ -421,9 +770,16 @@ class VertexList(object):
             new.array[:] = old.array[:]
             new.invalidate()
 
-        self.domain.allocator.dealloc(self.start, self.count)
+        old_domain = self.domain
+        old_domain.allocator.dealloc(self.start, self.count)
+        del old_domain._vertex_lists[self]
+        domain._vertex_lists[self] = True
         self.domain = domain
         self.start = new_start
+        if old_domain._on_empty is not None and old_domain._is_empty():
+            old_domain._on_empty()
+        else:
+            old_domain._check_compact()
 
         self._colors_cache_version = None
         self._fog_coords_cache_version = None
@@ -601,10 +957,17 @@ class IndexedVertexDomain(VertexDomain):
 
     Construction of an indexed vertex domain is usually done with the
     `create_indexed_domain` function.
+
+    If the domain grows to hold more vertices than can be addressed with
+    `index_gl_type`, the index buffer is converted to ``GL_UNSIGNED_INT``.
+    If it is later compacted or shrunk to a capacity that can again be
+    addressed with the index type it was created with, the index buffer is
+    converted back.  Index arrays previously retrieved from its vertex lists
+    become invalid, as they do whenever the buffers are resized.
     '''
     _initial_index_count = 16
 
-    def __init__(self, attribute_usages, index_gl_type=GL_UNSIGNED_INT):
+    def __init__(self, attribute_usages, index_gl_type=GL_UNSIGNED_SHORT):
         super(IndexedVertexDomain, self).__init__(attribute_usages)
 
         self.index_allocator = allocation.Allocator(self._initial_index_count)
@@ -616,15 +979,41 @@ class IndexedVertexDomain(VertexDomain):
             self.index_allocator.capacity * self.index_element_size,
             target=GL_ELEMENT_ARRAY_BUFFER)
 
+        # Index type to convert back to after compaction.
+        self._initial_index_gl_type = index_gl_type
+
+    def _set_capacity(self, capacity):
+        super(IndexedVertexDomain, self)._set_capacity(capacity)
+        if capacity - 1 > _max_indices[self.index_gl_type]:
+            self._set_index_gl_type(GL_UNSIGNED_INT)
+
+    def _set_index_gl_type(self, index_gl_type):
+        # Copy the indices into a new buffer of the given type.
+        old_buffer = self.index_buffer
+        old_c_type = self.index_c_type
+        capacity = self.index_allocator.capacity
+
+        self.index_gl_type = index_gl_type
+        self.index_c_type = vertexattribute._c_types[index_gl_type]
+        self.index_element_size = ctypes.sizeof(self.index_c_type)
+        self.index_buffer = vertexbuffer.create_mappable_buffer(
+            capacity * self.index_element_size,
+            target=GL_ELEMENT_ARRAY_BUFFER)
+        self._version += 1
+
+        old = old_buffer.get_region(0, capacity * ctypes.sizeof(old_c_type),
+            ctypes.POINTER(old_c_type * capacity))
+        new = self.get_index_region(0, capacity)
+        new.array[:] = old.array[:]
+        new.invalidate()
+        old_buffer.delete()
+
     def _safe_index_alloc(self, count):
         '''Allocate indices, resizing the buffers if necessary.'''
         try:
             return self.index_allocator.alloc(count)
         except allocation.AllocatorMemoryException, e:
-            capacity = _nearest_pow2(e.requested_capacity)
-            self._version += 1
-            self.index_buffer.resize(capacity * self.index_element_size)
-            self.index_allocator.set_capacity(capacity)
+            self._set_index_capacity(_nearest_pow2(e.requested_capacity))
             return self.index_allocator.alloc(count)
 
     def _safe_index_realloc(self, start, count, new_count):
@@ -632,12 +1021,15 @@ class IndexedVertexDomain(VertexDomain):
         try:
             return self.index_allocator.realloc(start, count, new_count)
         except allocation.AllocatorMemoryException, e:
-            capacity = _nearest_pow2(e.requested_capacity)
-            self._version += 1
-            self.index_buffer.resize(capacity * self.index_element_size)
-            self.index_allocator.set_capacity(capacity)
+            self._set_index_capacity(_nearest_pow2(e.requested_capacity))
             return self.index_allocator.realloc(start, count, new_count)
 
+    def _set_index_capacity(self, capacity):
+        '''Grow the index buffer to hold `capacity` indices.'''
+        self._version += 1
+        self.index_buffer.resize(capacity * self.index_element_size)
+        self.index_allocator.set_capacity(capacity)
+
     def create(self, count, index_count):
         '''Create an `IndexedVertexList` in this domain.
 
@@ -652,6 +1044,120 @@ class IndexedVertexDomain(VertexDomain):
         index_start = self._safe_index_alloc(index_count)
         return IndexedVertexList(self, start, count, index_start, index_count)
 
+    def create_many(self, n, count, index_count):
+        '''Create a number of `IndexedVertexList` objects of the same size in
+        this domain.
+
+        The vertices and indices of the vertex lists are each allocated as a
+        single contiguous block, in order, but the vertex lists can be
+        resized and deleted individually.
+
+        :Parameters:
+            `n` : int
+                Number of vertex lists to create.
+            `count` : int
+                Number of vertices in each vertex list.
+            `index_count` : int
+                Number of indices in each vertex list.
+
+        :rtype: list of `IndexedVertexList`
+        '''
+        start = self._safe_alloc(n * count)
+        index_start = self._safe_index_alloc(n * index_count)
+        return [IndexedVertexList(self, start + i * count, count,
+                                  index_start + i * index_count, index_count)
+                for i in range(n)]
+
+    def compact(self):
+        '''Move all vertex lists and their indices to the start of the
+        domain, removing the free space between them, and shrink the
+        buffers to fit.
+
+        The indices of vertex lists that are moved are updated.  See
+        `VertexDomain.compact`.
+        '''
+        self._compact(self._initial_count, self._initial_index_count)
+
+    def _compact(self, capacity, index_capacity):
+        blocks = super(IndexedVertexDomain, self)._compact(capacity)
+
+        index_blocks, index_count = _compact_blocks(
+            self.index_allocator, self._vertex_lists.keys(),
+            'index_start', 'index_count')
+
+        capacity = max(_nearest_pow2(index_count), index_capacity)
+        _move_buffer_regions(self.index_buffer, self.index_element_size,
+                             index_blocks)
+        if capacity < self.index_allocator.capacity:
+            self.index_buffer.resize(capacity * self.index_element_size)
+        self.index_allocator = _create_allocator(
+            min(capacity, self.index_allocator.capacity), index_count)
+
+        # Offset each index by the distance the block of vertices it refers
+        # to moved.  All allocated indices are updated, including those of
+        # vertex lists that are no longer referenced.
+        if index_count and [block for block in blocks
+                            if block[0] != block[1]]:
+            starts = [old_start for old_start, _, _ in blocks]
+            offsets = [new_start - old_start
+                       for old_start, new_start, _ in blocks]
+            bisect_right = bisect.bisect_right
+            region = self.get_index_region(0, index_count)
+            region.array[:] = [i + offsets[bisect_right(starts, i) - 1]
+                               for i in region.array]
+            region.invalidate()
+
+        # Convert back to the original index type once the remapped indices
+        # all fit it.
+        index_gl_type = self._initial_index_gl_type
+        if (self.index_gl_type != index_gl_type and
+            self.allocator.capacity - 1 <= _max_indices[index_gl_type]):
+            self._set_index_gl_type(index_gl_type)
+
+    def _save(self):
+        info, data, vertex_lists = super(IndexedVertexDomain, self)._save()
+        starts, sizes = self.index_allocator.get_allocated_regions()
+        info['index_capacity'] = self.index_allocator.capacity
+        info['index_starts'] = list(starts)
+        info['index_sizes'] = list(sizes)
+        info['index_gl_type'] = self.index_gl_type
+        info['vertex_lists'] = [
+            (v.start, v.count, v.index_start, v.index_count)
+            for v in vertex_lists]
+        data.append(_get_buffer_data(self.index_buffer))
+        return info, data, vertex_lists
+
+    def _load(self, info, data):
+        self._load_vertices(info, data[:-1])
+        if info['index_gl_type'] != self.index_gl_type:
+            self._set_index_gl_type(info['index_gl_type'])
+        if info['index_capacity'] > self.index_allocator.capacity:
+            self._set_index_capacity(info['index_capacity'])
+        self.index_buffer.set_data_region(data[-1], 0, len(data[-1]))
+        self.index_allocator = _create_allocator_regions(
+            self.index_allocator.capacity,
+            info['index_starts'], info['index_sizes'])
+        return [IndexedVertexList(self, *args)
+                for args in info['vertex_lists']]
+
+    def _is_shrinkable(self):
+        return (super(IndexedVertexDomain, self)._is_shrinkable() or
+                _is_shrinkable(self.index_allocator,
+                               self._initial_index_count,
+                               self.shrink_threshold))
+
+    def _shrink(self):
+        # Halve whichever of the vertex and index buffers are underused.
+        capacity = self.allocator.capacity
+        if super(IndexedVertexDomain, self)._is_shrinkable():
+            capacity = max(capacity // 2, self._initial_count)
+        index_capacity = self.index_allocator.capacity
+        if _is_shrinkable(self.index_allocator, self._initial_index_count,
+                          self.shrink_threshold):
+            index_capacity = max(index_capacity // 2,
+                                 self._initial_index_count)
+        self._compact(capacity, index_capacity)
+
     def get_index_region(self, start, count):
         '''Get a region of the index buffer.
 
@@ -700,30 +1206,64 @@ class IndexedVertexDomain(VertexDomain):
                     vertex_list.index_start * self.index_element_size)
         else:
             starts, sizes = self.index_allocator.get_allocated_regions()
-            primcount = len(starts)
-            if primcount == 0:
-                pass
-            elif primcount == 1:
-                # Common case
-                glDrawElements(mode, sizes[0], self.index_gl_type,
-                    self.index_buffer.ptr + starts[0])
-            elif gl_info.have_version(1, 4):
-                starts = [s * self.index_element_size + self.index_buffer.ptr for s in starts]
-                starts = ctypes.cast((GLuint * primcount)(*starts), ctypes.POINTER(ctypes.c_void_p))
-                sizes = (GLsizei * primcount)(*sizes)
-                glMultiDrawElements(mode, sizes, GL_UNSIGNED_INT, starts,
-                                    primcount)
-            else:
-                for start, size in zip(starts, sizes):
-                    glDrawElements(mode, size, self.index_gl_type,
-                        self.index_buffer.ptr +
-                            start * self.index_element_size)
+            self._draw_ranges(mode, starts, sizes)
 
         self.index_buffer.unbind()
         for buffer, _ in self.buffer_attributes:
             buffer.unbind()
         glPopClientAttrib()
 
+        if vertex_list is None:
+            self._check_shrink()
+
+    def _get_draw_counts(self):
+        return _get_draw_counts(self.index_allocator)
+
+    def _get_buffers(self):
+        return super(IndexedVertexDomain, self)._get_buffers() + \
+            [self.index_buffer]
+
+    def draw_subset(self, mode, subset):
+        self.index_buffer.bind()
+        super(IndexedVertexDomain, self).draw_subset(mode, subset)
+        self.index_buffer.unbind()
+
+    def get_subset(self, vertex_lists):
+        '''Get the ranges of indices to draw for some of the vertex lists in
+        the domain.  See `VertexDomain.get_subset`.
+
+        :Parameters:
+            `vertex_lists` : sequence of `IndexedVertexList`
+                Vertex lists belonging to this domain.
+
+        :rtype: (starts, sizes)
+        '''
+        return _get_ranges([(vertex_list.index_start, vertex_list.index_count)
+                            for vertex_list in vertex_lists])
+
+    def _draw_ranges(self, mode, starts, sizes):
+        # starts and sizes give ranges of the index buffer.
+        primcount = len(starts)
+        ptr = self.index_buffer.ptr
+        element_size = self.index_element_size
+        if primcount == 0:
+            pass
+        elif primcount == 1:
+            # Common case
+            glDrawElements(mode, sizes[0], self.index_gl_type,
+                           ptr + starts[0] * element_size)
+        elif gl_info.have_version(1, 4):
+            offsets = (ctypes.c_void_p * primcount)(
+                *[ptr + start * element_size for start in starts])
+            if not isinstance(sizes, ctypes.Array):
+                sizes = (GLsizei * primcount)(*sizes)
+            glMultiDrawElements(mode, sizes, self.index_gl_type, offsets,
+                                primcount)
+        else:
+            for start, size in zip(starts, sizes):
+                glDrawElements(mode, size, self.index_gl_type,
+                               ptr + start * element_size)
+
 class IndexedVertexList(VertexList):
     '''A list of vertices within an `IndexedVertexDomain` that are indexed.
     Use `IndexedVertexDomain.create` to construct this list.
@@ -771,8 +1311,9 @@ class IndexedVertexList(VertexList):
 
     def delete(self):
         '''Delete this group.'''
-        super(IndexedVertexList, self).delete()
+        # Indices must be freed first, in case the domain is compacted.
         self.domain.index_allocator.dealloc(self.index_start, self.index_count)
+        super(IndexedVertexList, self).delete()
 
     def _set_index_data(self, data):
         # TODO without region
@@ -87,15 +87,60 @@ however a sprite can belong to at most one batch.  See the documentation for
 `pyglet.graphics` for more details on batched rendering, and grouping of
 sprites within batches.
 
+To draw many thousands of similar sprites, such as particles, use a
+`SpriteArray`, which stores the properties of all its sprites in arrays and
+computes their vertices at once.
+
+Normally each change to a sprite's position, rotation, scale, color or
+opacity is written to its vertices immediately.  A sprite created with
+``deferred=True`` instead writes its vertices once, before it (or its batch)
+is next drawn, so changing several of its properties in a frame costs no
+more than changing one::
+
+    ball = pyglet.sprite.Sprite(ball_image, batch=batch, deferred=True)
+    ball.x += 10
+    ball.y += 10
+    ball.rotation += 10  # vertices are computed once, in batch.draw()
+
+
+Culling sprites
+===============
+
+When only a small part of a large world is on screen, add its sprites to a
+`SpriteCuller` and call its `cull` method with the visible rectangle before
+drawing.  Sprites entirely outside the rectangle are hidden, without
+affecting their `visible` property, until a later `cull` finds them inside
+it again::
+
+    culler = pyglet.sprite.SpriteCuller()
+    for ball in ball_sprites:
+        culler.add(ball)
+
+    @window.event
+    def on_draw():
+        culler.cull(view_x, view_y, window.width, window.height)
+        batch.draw()
+
+The culler keeps the sprites in a grid of square cells, so that `cull` only
+examines sprites in the cells overlapping the rectangle, and those that were
+visible after the previous call.
+
 :since: pyglet 1.1
 '''
 
 __docformat__ = 'restructuredtext'
 __version__ = '$Id$'
 
+import array
+import heapq
 import math
 import sys
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from pyglet.gl import *
 from pyglet import clock
 from pyglet import event
@@ -104,6 +149,107 @@ from pyglet import image
 
 _is_epydoc = hasattr(sys, 'is_epydoc') and sys.is_epydoc
 
+class _SpriteAnimator(object):
+    '''Advances the frames of all animated sprites.
+
+    Rather than each sprite scheduling its own clock function, a single
+    function is scheduled with `Clock.schedule` on the default clock while
+    any sprite is animated.  It keeps its own time by adding up the time
+    elapsed on that clock, read with `Clock.time`, so follows whatever clock
+    is in use, such as a `pyglet.clock.VirtualClock`.  Sprites are kept in a
+    heap
+    ordered by the time their next frame is due; sprites removed from the
+    heap are only marked as such, and discarded when they reach the top.
+    '''
+    def __init__(self):
+        # Heap of [due time, sequence number, sprite]; the sprite is None
+        # if it has been removed.
+        self._heap = []
+        self._sequence = 0
+        self._count = 0
+        self._time = 0.
+        self._clock = None
+        self._clock_ts = None
+        self._handle = None
+
+    def _push(self, sprite, ts):
+        entry = [ts, self._sequence, sprite]
+        self._sequence += 1
+        self._count += 1
+        sprite._animation_entry = entry
+        heapq.heappush(self._heap, entry)
+
+    def _schedule(self):
+        # Schedule the update on the default clock, if it is not already.
+        default = clock.get_default()
+        if self._clock is not default:
+            self._unschedule()
+            self._clock = default
+            self._clock_ts = default.time()
+            self._handle = default.schedule(self._update)
+
+    def _get_time(self):
+        # Add the time elapsed on the clock since last called.
+        ts = self._clock.time()
+        self._time += ts - self._clock_ts
+        self._clock_ts = ts
+        return self._time
+
+    def _unschedule(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._clock = None
+
+    def add(self, sprite, duration):
+        '''Show the next frame of a sprite's animation after `duration`
+        seconds.'''
+        self._schedule()
+        self._push(sprite, self._get_time() + duration)
+
+    def remove(self, sprite):
+        '''Stop advancing a sprite's animation.'''
+        entry = sprite._animation_entry
+        if entry is None:
+            return
+
+        entry[2] = None
+        sprite._animation_entry = None
+        self._count -= 1
+        if not self._count:
+            del self._heap[:]
+            self._unschedule()
+        elif len(self._heap) > 2 * self._count:
+            # Mostly removed entries; rebuild the heap without them.
+            self._heap = [e for e in self._heap if e[2] is not None]
+            heapq.heapify(self._heap)
+
+    def _update(self, dt):
+        now = self._get_time()
+
+        # Take all due entries before advancing any sprites, so that frames
+        # with no duration are shown for at least one tick.
+        heap = self._heap
+        due = []
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            sprite = entry[2]
+            if sprite is not None:
+                self._count -= 1
+                sprite._animation_entry = None
+                due.append((entry[0], sprite))
+
+        for ts, sprite in due:
+            duration = sprite._animate(now - ts)
+            if duration is not None:
+                self._push(sprite, now + duration)
+
+        if not self._count:
+            del heap[:]
+            self._unschedule()
+
+_animator = _SpriteAnimator()
+
 class SpriteGroup(graphics.Group):
     '''Shared sprite rendering group.
 
@@ -175,6 +321,15 @@ class Sprite(event.EventDispatcher):
     _scale = 1.0
     _visible = True
     _vertex_list = None
+    _animation_entry = None
+    _culler = None
+    _culled = False
+    _bounds = None
+    _bounds_dirty = False
+    _deferred = False
+    _update_pending = False
+    _position_dirty = False
+    _color_dirty = False
 
     def __init__(self,
                  img, x=0, y=0,
@@ -182,7 +337,8 @@ class Sprite(event.EventDispatcher):
                  blend_dest=GL_ONE_MINUS_SRC_ALPHA,
                  batch=None,
                  group=None,
-                 usage='dynamic'):
+                 usage='dynamic',
+                 deferred=False):
         '''Create a sprite.
 
         :Parameters:
@@ -206,10 +362,15 @@ class Sprite(event.EventDispatcher):
                 Vertex buffer object usage hint, one of ``"none"`` (default),
                 ``"stream"``, ``"dynamic"`` or ``"static"``.  Applies
                 only to vertex data.
+            `deferred` : bool
+                If True, changes to the sprite's position, rotation, scale,
+                color and opacity are written to its vertices only before
+                it is next drawn, with its batch or with `draw`.
 
         '''
         if batch is not None:
             self._batch = batch
+        self._deferred = deferred
 
         self._x = x
         self._y = y
@@ -218,9 +379,8 @@ class Sprite(event.EventDispatcher):
             self._animation = img
             self._frame_index = 0
             self._texture = img.frames[0].image.get_texture()
-            self._next_dt = img.frames[0].duration
-            if self._next_dt:
-                clock.schedule_once(self._animate, self._next_dt)
+            if img.frames[0].duration:
+                _animator.add(self, img.frames[0].duration)
         else:
             self._texture = img.get_texture()
 
@@ -243,7 +403,9 @@ class Sprite(event.EventDispatcher):
         sprite is garbage.
         '''
         if self._animation:
-            clock.unschedule(self._animate)
+            _animator.remove(self)
+        if self._culler is not None:
+            self._culler.remove(self)
         self._vertex_list.delete()
         self._vertex_list = None
         self._texture = None
@@ -251,22 +413,31 @@ class Sprite(event.EventDispatcher):
         # Easy way to break circular reference, speeds up GC
         self._group = None
 
-    def _animate(self, dt):
+    def _animate(self, lateness):
+        # Show the next frame, `lateness` seconds after it was due, and
+        # return the delay until the frame after it, or None.  Called by the
+        # animator.
+        animation = self._animation
         self._frame_index += 1
-        if self._frame_index >= len(self._animation.frames):
+        if self._frame_index >= len(animation.frames):
             self._frame_index = 0
             self.dispatch_event('on_animation_end')
-            if self._vertex_list is None:
-                return # Deleted in event handler.
+            if self._vertex_list is None or self._animation is not animation:
+                return # Deleted or image changed in event handler.
 
-        frame = self._animation.frames[self._frame_index]
+        frame = animation.frames[self._frame_index]
+        old_texture = self._texture
         self._set_texture(frame.image.get_texture())
+        texture = self._texture
+        if (texture.width != old_texture.width or
+            texture.height != old_texture.height or
+            texture.anchor_x != old_texture.anchor_x or
+            texture.anchor_y != old_texture.anchor_y):
+            self._invalidate_bounds()
 
         if frame.duration is not None:
-            duration = frame.duration - (self._next_dt - dt)
-            duration = min(max(0, duration), frame.duration)
-            clock.schedule_once(self._animate, duration)
-            self._next_dt = duration
+            duration = frame.duration - lateness
+            return min(max(0, duration), frame.duration)
         else:
             self.dispatch_event('on_animation_end')
 
@@ -277,6 +448,8 @@ class Sprite(event.EventDispatcher):
         if batch is not None and self._batch is not None:
             self._batch.migrate(self._vertex_list, GL_QUADS, self._group, batch)
             self._batch = batch
+            if self._update_pending:
+                batch.defer_update(self._flush_update)
         else:
             self._vertex_list.delete()
             self._batch = batch
@@ -327,19 +500,18 @@ class Sprite(event.EventDispatcher):
 
     def _set_image(self, img):
         if self._animation is not None:
-            clock.unschedule(self._animate)
+            _animator.remove(self)
             self._animation = None
 
         if isinstance(img, image.Animation):
             self._animation = img
             self._frame_index = 0
             self._set_texture(img.frames[0].image.get_texture())
-            self._next_dt = img.frames[0].duration
-            if self._next_dt:
-                clock.schedule_once(self._animate, self._next_dt)
+            if img.frames[0].duration:
+                _animator.add(self, img.frames[0].duration)
         else:
             self._set_texture(img.get_texture())
-        self._update_position()
+        self._invalidate_position()
 
     image = property(_get_image, _set_image,
                      doc='''Image or animation to display.
@@ -374,10 +546,87 @@ class Sprite(event.EventDispatcher):
                 'c4B', ('t3f', self._texture.tex_coords))
         self._update_position()
         self._update_color()
+        self._position_dirty = self._color_dirty = False
+        self._update_pending = False
+
+    def _invalidate_bounds(self):
+        # The bounds are recomputed, and the sprite moved to its new cells
+        # in the culler, only when next needed: when a deferred sprite's
+        # update is flushed, or at the next cull.
+        self._bounds = None
+        if self._culler is not None and not self._bounds_dirty:
+            self._bounds_dirty = True
+            self._culler._pending.add(self)
+
+    def _invalidate_position(self):
+        self._invalidate_bounds()
+        if self._deferred:
+            self._position_dirty = True
+            self._defer_update()
+        else:
+            self._update_position()
+
+    def _invalidate_color(self):
+        if self._deferred:
+            self._color_dirty = True
+            self._defer_update()
+        else:
+            self._update_color()
+
+    def _defer_update(self):
+        if not self._update_pending:
+            self._update_pending = True
+            if self._batch is not None:
+                self._batch.defer_update(self._flush_update)
+
+    def _flush_update(self):
+        self._update_pending = False
+        if self._vertex_list is None:
+            return # Deleted since the update was deferred.
+        if self._position_dirty:
+            self._update_position()
+            self._position_dirty = False
+        if self._color_dirty:
+            self._update_color()
+            self._color_dirty = False
+        if self._bounds_dirty:
+            self._culler._update(self)
+
+    def _set_culled(self, culled):
+        self._culled = culled
+        if self._deferred:
+            self._position_dirty = True
+            self._defer_update()
+        else:
+            self._update_position()
+
+    def _get_bounds(self):
+        # Axis-aligned bounding box of the sprite, as (x1, y1, x2, y2).
+        if self._bounds is None:
+            self._bounds = self._compute_bounds()
+        return self._bounds
+
+    def _compute_bounds(self):
+        img = self._texture
+        x1 = -img.anchor_x * self._scale
+        y1 = -img.anchor_y * self._scale
+        x2 = x1 + img.width * self._scale
+        y2 = y1 + img.height * self._scale
+        if self._rotation:
+            r = -math.radians(self._rotation)
+            cr = math.cos(r)
+            sr = math.sin(r)
+            xs = [x1 * cr - y1 * sr, x2 * cr - y1 * sr,
+                  x2 * cr - y2 * sr, x1 * cr - y2 * sr]
+            ys = [x1 * sr + y1 * cr, x2 * sr + y1 * cr,
+                  x2 * sr + y2 * cr, x1 * sr + y2 * cr]
+            x1, x2 = min(xs), max(xs)
+            y1, y2 = min(ys), max(ys)
+        return (x1 + self._x, y1 + self._y, x2 + self._x, y2 + self._y)
 
     def _update_position(self):
         img = self._texture
-        if not self._visible:
+        if not self._visible or self._culled:
             self._vertex_list.vertices[:] = [0, 0, 0, 0, 0, 0, 0, 0]
         elif self._rotation:
             x1 = -img.anchor_x * self._scale
@@ -429,7 +678,7 @@ class Sprite(event.EventDispatcher):
         '''
         self._x = x
         self._y = y
-        self._update_position()
+        self._invalidate_position()
 
     position = property(lambda self: (self._x, self._y),
                         lambda self, t: self.set_position(*t),
@@ -440,7 +689,7 @@ class Sprite(event.EventDispatcher):
 
     def _set_x(self, x):
         self._x = x
-        self._update_position()
+        self._invalidate_position()
 
     x = property(lambda self: self._x, _set_x,
                  doc='''X coordinate of the sprite.
@@ -450,7 +699,7 @@ class Sprite(event.EventDispatcher):
 
     def _set_y(self, y):
         self._y = y
-        self._update_position()
+        self._invalidate_position()
 
     y = property(lambda self: self._y, _set_y,
                  doc='''Y coordinate of the sprite.
@@ -460,7 +709,7 @@ class Sprite(event.EventDispatcher):
 
     def _set_rotation(self, rotation):
         self._rotation = rotation
-        self._update_position()
+        self._invalidate_position()
 
     rotation = property(lambda self: self._rotation, _set_rotation,
                         doc='''Clockwise rotation of the sprite, in degrees.
@@ -473,7 +722,7 @@ class Sprite(event.EventDispatcher):
 
     def _set_scale(self, scale):
         self._scale = scale
-        self._update_position()
+        self._invalidate_position()
 
     scale = property(lambda self: self._scale, _set_scale,
                      doc='''Scaling factor.
@@ -502,7 +751,7 @@ class Sprite(event.EventDispatcher):
 
     def _set_opacity(self, opacity):
         self._opacity = opacity
-        self._update_color()
+        self._invalidate_color()
 
     opacity = property(lambda self: self._opacity, _set_opacity,
                        doc='''Blend opacity.
@@ -520,7 +769,7 @@ class Sprite(event.EventDispatcher):
 
     def _set_color(self, rgb):
         self._rgb = map(int, rgb)
-        self._update_color()
+        self._invalidate_color()
 
     color = property(lambda self: self._rgb, _set_color,
                        doc='''Blend color.
@@ -536,7 +785,7 @@ class Sprite(event.EventDispatcher):
 
     def _set_visible(self, visible):
         self._visible = visible
-        self._update_position()
+        self._invalidate_position()
 
     visible = property(lambda self: self._visible, _set_visible,
                        '''True if the sprite will be drawn.
@@ -551,6 +800,8 @@ class Sprite(event.EventDispatcher):
         See the module documentation for hints on drawing multiple sprites
         efficiently.
         '''
+        if self._update_pending:
+            self._flush_update()
         self._group.set_state_recursive()
         self._vertex_list.draw(GL_QUADS)
         self._group.unset_state_recursive()
@@ -567,3 +818,453 @@ class Sprite(event.EventDispatcher):
             '''
 
 Sprite.register_event_type('on_animation_end')
+
+class SpriteCuller(object):
+    '''Hides sprites outside a rectangle.
+
+    Sprites are kept in a spatial hash: a uniform grid of square cells, each
+    holding the sprites whose bounding boxes overlap it.  When a sprite's
+    position, rotation, scale or image changes, its cells are updated at the
+    next call to `cull`, or when its update is flushed if it is deferred, so
+    a sprite changed many times between culls is placed only once.
+
+    Hidden sprites have their vertices collapsed to a point, as if their
+    `Sprite.visible` property were False, so are not rasterized; they still
+    occupy their place in the batch, so need not be reallocated when they
+    become visible again.
+    '''
+    def __init__(self, cell_size=256):
+        '''Create a sprite culler.
+
+        :Parameters:
+            `cell_size` : float
+                Width and height of each cell of the grid.  Cells should be
+                larger than most sprites, and a few times smaller than the
+                rectangles given to `cull`.
+
+        '''
+        self.cell_size = cell_size
+
+        # Map of cell (column, row) to set of sprites.
+        self._cells = {}
+
+        # Cell range (column1, row1, column2, row2) of each sprite.
+        self._sprite_cells = {}
+
+        # Sprites not culled by the last call to `cull`, and sprites added
+        # since.
+        self._unculled = set()
+
+        # Sprites whose cells are out of date.
+        self._pending = set()
+
+    def add(self, sprite):
+        '''Add a sprite to the culler.
+
+        The sprite is not hidden until the next call to `cull`.  A sprite can
+        belong to at most one culler.
+
+        :Parameters:
+            `sprite` : `Sprite`
+                Sprite to add.
+
+        '''
+        if sprite._culler is not None:
+            sprite._culler.remove(sprite)
+        sprite._culler = self
+        self._unculled.add(sprite)
+        self._update(sprite)
+
+    def remove(self, sprite):
+        '''Remove a sprite from the culler, showing it if it was hidden.
+
+        :Parameters:
+            `sprite` : `Sprite`
+                Sprite to remove.
+
+        '''
+        if sprite._culler is not self:
+            return
+
+        self._remove_cells(sprite, self._sprite_cells.pop(sprite))
+        self._unculled.discard(sprite)
+        self._pending.discard(sprite)
+        sprite._culler = None
+        sprite._bounds_dirty = False
+        if sprite._culled and sprite._vertex_list is not None:
+            sprite._set_culled(False)
+
+    def cull(self, x, y, width, height):
+        '''Hide the sprites outside a rectangle, and show those inside it.
+
+        Sprites that overlap the rectangle only partially are shown.
+
+        :Parameters:
+            `x` : float
+                X coordinate of the left edge of the rectangle.
+            `y` : float
+                Y coordinate of the bottom edge of the rectangle.
+            `width` : float
+                Width of the rectangle.
+            `height` : float
+                Height of the rectangle.
+
+        '''
+        for sprite in list(self._pending):
+            self._update(sprite)
+
+        x2 = x + width
+        y2 = y + height
+        column1, row1, column2, row2 = self._get_cell_range(x, y, x2, y2)
+
+        unculled = set()
+        cells = self._cells
+        for column in xrange(column1, column2 + 1):
+            for row in xrange(row1, row2 + 1):
+                cell = cells.get((column, row))
+                if cell:
+                    unculled.update(cell)
+
+        # Sprites in the cells may still lie outside the rectangle.
+        for sprite in list(unculled):
+            sx1, sy1, sx2, sy2 = sprite._get_bounds()
+            if sx2 < x or sx1 > x2 or sy2 < y or sy1 > y2:
+                unculled.remove(sprite)
+
+        for sprite in self._unculled - unculled:
+            sprite._set_culled(True)
+        for sprite in unculled:
+            if sprite._culled:
+                sprite._set_culled(False)
+        self._unculled = unculled
+
+    def _get_cell_range(self, x1, y1, x2, y2):
+        size = float(self.cell_size)
+        return (int(math.floor(x1 / size)), int(math.floor(y1 / size)),
+                int(math.floor(x2 / size)), int(math.floor(y2 / size)))
+
+    def _update(self, sprite):
+        # Move a sprite to the cells overlapping its current bounds.
+        if sprite._bounds_dirty:
+            sprite._bounds_dirty = False
+            self._pending.discard(sprite)
+        cell_range = self._get_cell_range(*sprite._get_bounds())
+        old_cell_range = self._sprite_cells.get(sprite)
+        if cell_range == old_cell_range:
+            return
+
+        if old_cell_range is not None:
+            self._remove_cells(sprite, old_cell_range)
+        self._sprite_cells[sprite] = cell_range
+
+        cells = self._cells
+        column1, row1, column2, row2 = cell_range
+        for column in xrange(column1, column2 + 1):
+            for row in xrange(row1, row2 + 1):
+                key = column, row
+                cell = cells.get(key)
+                if cell is None:
+                    cell = cells[key] = set()
+                cell.add(sprite)
+
+    def _remove_cells(self, sprite, cell_range):
+        cells = self._cells
+        column1, row1, column2, row2 = cell_range
+        for column in xrange(column1, column2 + 1):
+            for row in xrange(row1, row2 + 1):
+                key = column, row
+                cell = cells[key]
+                cell.remove(sprite)
+                if not cell:
+                    del cells[key]
+
+class SpriteArray(object):
+    '''A number of sprites stored as arrays of their properties.
+
+    Creating a `Sprite` for each of many thousands of moving objects is
+    slow, as each sprite's vertices are recomputed and copied whenever any
+    of its properties change.  A sprite array instead holds the position,
+    rotation, scale, color and image of each sprite in separate arrays,
+    which can be modified freely; `update` then computes the vertices of all
+    the sprites at once and writes them to a single vertex list.  If NumPy
+    is installed, the arrays are NumPy arrays and `update` is vectorized;
+    otherwise they are ``array.array`` instances.
+
+    For example, to move 10,000 sprites to the right each frame::
+
+        particles = pyglet.sprite.SpriteArray(particle_image, 10000,
+                                              batch=batch)
+        particles.x[:] = numpy.random.uniform(0, 640, 10000)
+        particles.y[:] = numpy.random.uniform(0, 480, 10000)
+
+        def update(dt):
+            particles.x += 100 * dt
+            particles.update()
+
+    All images displayed by a sprite array must be regions of the same
+    texture, such as the images in a `pyglet.image.atlas.TextureAtlas` or
+    `pyglet.image.TextureGrid`; the sprites are drawn with a single
+    `SpriteGroup`.  Unlike `Sprite`, sprite vertices are not rounded to
+    integer coordinates.
+
+    :Ivariables:
+        `x` : array of float
+            X coordinate of each sprite.
+        `y` : array of float
+            Y coordinate of each sprite.
+        `rotation` : array of float
+            Clockwise rotation of each sprite, in degrees.
+        `scale` : array of float
+            Scaling factor of each sprite.
+        `red` : array of int
+            Red component of the color of each sprite, in the range 0 to
+            255.
+        `green` : array of int
+            Green component of the color of each sprite.
+        `blue` : array of int
+            Blue component of the color of each sprite.
+        `opacity` : array of int
+            Opacity of each sprite.
+        `image_index` : array of int
+            Index into `images` of the image of each sprite.
+        `visible` : array of bool
+            True for each sprite that is drawn.
+        `images` : list of `AbstractImage`
+            Images that can be displayed.
+
+    :since: pyglet 1.2
+    '''
+    _vertex_list = None
+
+    # Name, array typecode, NumPy type and default value of each property.
+    _properties = (
+        ('x', 'f', 'float32', 0),
+        ('y', 'f', 'float32', 0),
+        ('rotation', 'f', 'float32', 0),
+        ('scale', 'f', 'float32', 1),
+        ('red', 'B', 'uint8', 255),
+        ('green', 'B', 'uint8', 255),
+        ('blue', 'B', 'uint8', 255),
+        ('opacity', 'B', 'uint8', 255),
+        ('image_index', 'i', 'int32', 0),
+        ('visible', 'B', 'bool', 1),
+    )
+
+    def __init__(self,
+                 images, count,
+                 blend_src=GL_SRC_ALPHA,
+                 blend_dest=GL_ONE_MINUS_SRC_ALPHA,
+                 batch=None,
+                 group=None,
+                 usage='dynamic'):
+        '''Create a sprite array.
+
+        All sprites initially display the first image at the origin.
+
+        :Parameters:
+            `images` : `AbstractImage` or sequence of `AbstractImage`
+                Image, or images, that the sprites can display.  The
+                textures of all images must be regions of the same texture.
+            `count` : int
+                Number of sprites.
+            `blend_src` : int
+                OpenGL blend source mode.
+            `blend_dest` : int
+                OpenGL blend destination mode.
+            `batch` : `Batch`
+                Optional batch to add the sprites to.
+            `group` : `Group`
+                Optional parent group of the sprites.
+            `usage` : str
+                Vertex buffer object usage hint, one of ``"none"``,
+                ``"stream"`` or ``"dynamic"`` (default).  Applies only to
+                vertex data.
+
+        '''
+        if isinstance(images, image.AbstractImage):
+            images = [images]
+        self.images = list(images)
+        textures = [img.get_texture() for img in self.images]
+        for texture in textures[1:]:
+            if (texture.id != textures[0].id or
+                texture.target != textures[0].target):
+                raise ValueError('All images must share the same texture')
+
+        # Size, anchor and texture coordinates of each image
+        self._image_sizes = []
+        self._image_tex_coords = []
+        for texture in textures:
+            self._image_sizes.append((texture.anchor_x, texture.anchor_y,
+                                      texture.width, texture.height))
+            self._image_tex_coords.append(tuple(texture.tex_coords))
+        if numpy is not None:
+            self._image_sizes = numpy.array(self._image_sizes, 'float32')
+            self._image_tex_coords = numpy.array(self._image_tex_coords,
+                                                 'float32')
+
+        self._batch = batch
+        self._group = SpriteGroup(textures[0], blend_src, blend_dest, group)
+        self._usage = usage
+        self.count = 0
+        for name, typecode, dtype, value in self._properties:
+            setattr(self, name, _create_array(typecode, dtype, 0, value))
+        self.resize(count)
+
+    def __del__(self):
+        try:
+            if self._vertex_list is not None:
+                self._vertex_list.delete()
+        except:
+            pass
+
+    def delete(self):
+        '''Force immediate removal of the sprites from video memory.'''
+        self._vertex_list.delete()
+        self._vertex_list = None
+        self._group = None
+
+    def resize(self, count):
+        '''Change the number of sprites.
+
+        Existing sprites keep their properties; sprites added are given the
+        default properties.  The arrays of properties are replaced, so any
+        references to them must be retrieved again.  `update` is called.
+
+        :Parameters:
+            `count` : int
+                New number of sprites.
+
+        '''
+        for name, typecode, dtype, value in self._properties:
+            old = getattr(self, name)
+            new = _create_array(typecode, dtype, count, value)
+            new[:min(count, self.count)] = old[:count]
+            setattr(self, name, new)
+        self.count = count
+
+        if self._vertex_list is None:
+            if self._batch is None:
+                self._vertex_list = graphics.vertex_list(count * 4,
+                    'v2f/%s' % self._usage, 'c4B', 't3f')
+            else:
+                self._vertex_list = self._batch.add(count * 4, GL_QUADS,
+                    self._group, 'v2f/%s' % self._usage, 'c4B', 't3f')
+        else:
+            self._vertex_list.resize(count * 4)
+        self.update()
+
+    def update(self):
+        '''Write the vertices of all sprites to the vertex list.
+
+        Call this after modifying any of the sprites' properties; until then
+        the sprites are drawn as they were.
+        '''
+        if numpy is not None:
+            self._update_vectorized()
+        else:
+            self._update_sequential()
+
+    def _update_vectorized(self):
+        sizes = self._image_sizes[self.image_index]
+        scale = self.scale
+        x1 = -sizes[:, 0] * scale
+        y1 = -sizes[:, 1] * scale
+        x2 = x1 + sizes[:, 2] * scale
+        y2 = y1 + sizes[:, 3] * scale
+
+        # Corners of each quad before rotation, shape (count, 4).
+        corner_x = numpy.column_stack((x1, x2, x2, x1))
+        corner_y = numpy.column_stack((y1, y1, y2, y2))
+
+        r = numpy.radians(-self.rotation)[:, numpy.newaxis]
+        cr = numpy.cos(r)
+        sr = numpy.sin(r)
+        vertices = numpy.empty((self.count, 4, 2), 'float32')
+        vertices[:, :, 0] = corner_x * cr - corner_y * sr + \
+                            self.x[:, numpy.newaxis]
+        vertices[:, :, 1] = corner_x * sr + corner_y * cr + \
+                            self.y[:, numpy.newaxis]
+        vertices[~self.visible] = 0
+
+        colors = numpy.empty((self.count, 4, 4), 'uint8')
+        colors[:, :, 0] = self.red[:, numpy.newaxis]
+        colors[:, :, 1] = self.green[:, numpy.newaxis]
+        colors[:, :, 2] = self.blue[:, numpy.newaxis]
+        colors[:, :, 3] = self.opacity[:, numpy.newaxis]
+
+        vertex_list = self._vertex_list
+        numpy.ctypeslib.as_array(vertex_list.vertices)[:] = vertices.ravel()
+        numpy.ctypeslib.as_array(vertex_list.colors)[:] = colors.ravel()
+        numpy.ctypeslib.as_array(vertex_list.tex_coords)[:] = \
+            self._image_tex_coords[self.image_index].ravel()
+
+    def _update_sequential(self):
+        vertices = []
+        colors = []
+        tex_coords = []
+        image_sizes = self._image_sizes
+        image_tex_coords = self._image_tex_coords
+        for i in xrange(self.count):
+            image_index = self.image_index[i]
+            if self.visible[i]:
+                anchor_x, anchor_y, width, height = image_sizes[image_index]
+                scale = self.scale[i]
+                x1 = -anchor_x * scale
+                y1 = -anchor_y * scale
+                x2 = x1 + width * scale
+                y2 = y1 + height * scale
+                x = self.x[i]
+                y = self.y[i]
+                r = -math.radians(self.rotation[i])
+                cr = math.cos(r)
+                sr = math.sin(r)
+                vertices.extend((x1 * cr - y1 * sr + x, x1 * sr + y1 * cr + y,
+                                 x2 * cr - y1 * sr + x, x2 * sr + y1 * cr + y,
+                                 x2 * cr - y2 * sr + x, x2 * sr + y2 * cr + y,
+                                 x1 * cr - y2 * sr + x, x1 * sr + y2 * cr + y))
+            else:
+                vertices.extend((0, 0, 0, 0, 0, 0, 0, 0))
+            colors.extend((self.red[i], self.green[i], self.blue[i],
+                           self.opacity[i]) * 4)
+            tex_coords.extend(image_tex_coords[image_index])
+
+        vertex_list = self._vertex_list
+        vertex_list.vertices[:] = vertices
+        vertex_list.colors[:] = colors
+        vertex_list.tex_coords[:] = tex_coords
+
+    def _get_batch(self):
+        return self._batch
+
+    batch = property(_get_batch,
+                     doc='''Graphics batch the sprites belong to, if any.
+
+    :type: `Batch`
+    ''')
+
+    def _get_group(self):
+        return self._group.parent
+
+    group = property(_get_group,
+                     doc='''Parent graphics group.
+
+    :type: `Group`
+    ''')
+
+    def draw(self):
+        '''Draw the sprites.
+
+        Sprite arrays are usually added to a batch instead.
+        '''
+        self._group.set_state_recursive()
+        self._vertex_list.draw(GL_QUADS)
+        self._group.unset_state_recursive()
+
+def _create_array(typecode, dtype, count, value):
+    # Create an array of count copies of value, as a NumPy array of dtype if
+    # NumPy is available, otherwise as an array.array of typecode.
+    if numpy is not None:
+        values = numpy.empty(count, dtype)
+        values.fill(value)
+        return values
+    return array.array(typecode, [value]) * count
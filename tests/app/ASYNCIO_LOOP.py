@@ -0,0 +1,209 @@
+#!/usr/bin/python
+'''Test that the asyncio event loop calls scheduled functions, dispatches
+posted events and completes clock futures.
+
+The event loop is run on a minimal stand-in for an asyncio event loop, whose
+time advances straight to each timer, so that the tests run without asyncio.
+'''
+
+import heapq
+import threading
+import unittest
+
+from pyglet import app
+from pyglet import clock
+from pyglet import event
+from pyglet.app import asyncio_loop
+
+__noninteractive = True
+
+class Dispatcher(event.EventDispatcher):
+    pass
+Dispatcher.register_event_type('on_test')
+
+class FakeHandle(object):
+    def __init__(self, callback, args):
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class FakeFuture(object):
+    def __init__(self):
+        self._done = False
+        self._cancelled = False
+        self._result = None
+        self._callbacks = []
+
+    def done(self):
+        return self._done
+
+    def cancelled(self):
+        return self._cancelled
+
+    def result(self):
+        assert self._done and not self._cancelled
+        return self._result
+
+    def set_result(self, result):
+        assert not self._done
+        self._result = result
+        self._finish()
+
+    def cancel(self):
+        if self._done:
+            return False
+        self._cancelled = True
+        self._finish()
+        return True
+
+    def add_done_callback(self, callback):
+        self._callbacks.append(callback)
+
+    def _finish(self):
+        self._done = True
+        for callback in self._callbacks:
+            callback(self)
+
+class FakeLoop(object):
+    '''The parts of an asyncio event loop used by AsyncioEventLoop.  Time
+    advances to each timer as it is run.
+    '''
+    def __init__(self):
+        self.now = 0.
+        self._timers = []
+        self._sequence = 0
+        self._ready = []
+        self._condition = threading.Condition()
+
+    def time(self):
+        return self.now
+
+    def call_at(self, when, callback, *args):
+        handle = FakeHandle(callback, args)
+        heapq.heappush(self._timers, (when, self._sequence, handle))
+        self._sequence += 1
+        return handle
+
+    def call_soon_threadsafe(self, callback, *args):
+        self._condition.acquire()
+        self._ready.append(FakeHandle(callback, args))
+        self._condition.notify()
+        self._condition.release()
+
+    def create_future(self):
+        return FakeFuture()
+
+    def run_until_complete(self, future):
+        while not future.done():
+            self._condition.acquire()
+            while self._timers and self._timers[0][2].cancelled:
+                heapq.heappop(self._timers)
+            if not self._ready and not self._timers:
+                # Nothing to do until another thread calls
+                # call_soon_threadsafe.
+                self._condition.wait(5.)
+                assert self._ready, 'Event loop would block forever'
+            if self._ready:
+                handle = self._ready.pop(0)
+            else:
+                when, sequence, handle = heapq.heappop(self._timers)
+                self.now = max(self.now, when)
+            self._condition.release()
+            handle.callback(*handle.args)
+        return future.result()
+
+class ASYNCIO_LOOP(unittest.TestCase):
+    def setUp(self):
+        self.loop = FakeLoop()
+        self.old_clock = clock.get_default()
+        clock.set_default(clock.Clock(time_function=self.loop.time))
+        self.event_loop = asyncio_loop.AsyncioEventLoop(self.loop)
+
+    def tearDown(self):
+        clock.set_default(self.old_clock)
+
+    def test_lazy_import(self):
+        try:
+            import asyncio
+        except ImportError:
+            # Python 2: only an asyncio event loop is needed, or the asyncio
+            # module if the loop cannot create futures.
+            self.assertRaises(ImportError, asyncio_loop.AsyncioEventLoop)
+            event_loop = asyncio_loop.AsyncioEventLoop(object())
+            self.assertRaises(ImportError, event_loop.sleep_async, 0)
+
+    def test_stop(self):
+        # Stopping before starting, or twice, does nothing.
+        platform_event_loop = app.platform_event_loop
+        notify = platform_event_loop.notify
+        self.event_loop.stop()
+        self.event_loop.start()
+        self.assertNotEqual(platform_event_loop.notify, notify)
+        self.event_loop.stop()
+        self.assertEqual(platform_event_loop.notify, notify)
+        self.assertEqual('notify' in platform_event_loop.__dict__, False)
+        self.event_loop.stop()
+        self.assertEqual(platform_event_loop.notify, notify)
+
+    def test_schedule(self):
+        calls = []
+        def callback(dt):
+            calls.append(self.loop.now)
+            if len(calls) == 3:
+                app.exit()
+        clock.schedule_interval(callback, 0.25)
+        old_event_loop = app.event_loop
+        app.event_loop = self.event_loop
+        try:
+            self.event_loop.run()
+        finally:
+            app.event_loop = old_event_loop
+        self.assertEqual(calls, [0.25, 0.5, 0.75])
+        self.assertEqual(self.event_loop._idle_handle, None)
+
+    def test_post_event(self):
+        # With nothing scheduled, the event loop waits to be notified of the
+        # posted event.
+        dispatcher = Dispatcher()
+        received = []
+        def on_test(value):
+            received.append(value)
+            self.event_loop.exit()
+        dispatcher.push_handlers(on_test)
+        self.event_loop.start()
+        try:
+            self.loop.run_until_complete(self.event_loop.sleep_async(0))
+            self.assertEqual(self.event_loop._idle_handle, None)
+            thread = threading.Thread(
+                target=app.platform_event_loop.post_event,
+                args=(dispatcher, 'on_test', 42))
+            thread.start()
+            self.loop.run_until_complete(self.event_loop._exit_future)
+            thread.join()
+        finally:
+            self.event_loop.stop()
+        self.assertEqual(received, [42])
+
+    def test_sleep_async(self):
+        self.event_loop.start()
+        try:
+            future = self.event_loop.sleep_async(0.5)
+            self.assertEqual(self.loop.run_until_complete(future), 0.5)
+            self.assertEqual(self.loop.now, 0.5)
+
+            future = self.event_loop.wait_tick()
+            self.loop.run_until_complete(future)
+            self.assertEqual(self.loop.now, 0.5)
+
+            # Cancelling the future unschedules its clock function.
+            future = self.event_loop.sleep_async(1.)
+            future.cancel()
+            self.assertEqual(self.event_loop.clock.get_sleep_time(True), None)
+        finally:
+            self.event_loop.stop()
+
+if __name__ == '__main__':
+    unittest.main()
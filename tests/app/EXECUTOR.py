@@ -0,0 +1,107 @@
+#!/usr/bin/python
+'''Test that the executor runs functions on worker threads and delivers their
+results on the main thread, through the posted event queue.
+'''
+
+import threading
+import unittest
+
+from pyglet import app
+from pyglet.app import executor
+
+__noninteractive = True
+
+class EXECUTOR(unittest.TestCase):
+    def setUp(self):
+        self.executor = executor.Executor(max_workers=2)
+        self.results = []
+
+    def tearDown(self):
+        self.executor.shutdown()
+        app.platform_event_loop.dispatch_posted_events()
+
+    def callback(self, result):
+        self.results.append((result, threading.currentThread()))
+
+    def test_callback(self):
+        job = self.executor.submit(pow, 2, 10, callback=self.callback)
+        self.assertTrue(job.wait(5.))
+        self.assertEqual(job.result, 1024)
+        self.assertEqual(self.results, [])
+
+        app.platform_event_loop.dispatch_posted_events()
+        self.assertEqual(self.results, [(1024, threading.currentThread())])
+        self.assertFalse(job.cancel())
+
+    def test_error_callback(self):
+        errors = []
+        job = self.executor.submit(int, 'x', callback=self.callback,
+                                   error_callback=errors.append)
+        self.assertTrue(job.wait(5.))
+        app.platform_event_loop.dispatch_posted_events()
+        self.assertEqual(self.results, [])
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(isinstance(errors[0], ValueError))
+
+    def test_error_stored(self):
+        # Without an error callback the exception is only stored on the job,
+        # not raised while dispatching.
+        job = self.executor.submit(int, 'x', callback=self.callback)
+        self.assertTrue(job.wait(5.))
+        app.platform_event_loop.dispatch_posted_events()
+        self.assertEqual(self.results, [])
+        self.assertTrue(isinstance(job.exception, ValueError))
+        self.assertNotEqual(job.traceback, None)
+        self.assertEqual(job.result, None)
+        self.assertFalse(job.cancel())
+
+    def test_queue_depth(self):
+        release = threading.Event()
+        started = []
+        two_started = threading.Event()
+        def block(i):
+            started.append(i)
+            if len(started) == 2:
+                two_started.set()
+            release.wait()
+            return i
+
+        jobs = [self.executor.submit(block, i, callback=self.callback)
+                for i in range(5)]
+        two_started.wait(5.)
+        self.assertEqual(sorted(started), [0, 1])
+        self.assertEqual(self.executor.running_jobs, 2)
+        self.assertEqual(self.executor.queue_depth, 3)
+
+        # Cancel a waiting job; its function is never called.
+        self.assertTrue(jobs[4].cancel())
+        self.assertTrue(jobs[4].cancelled)
+        self.assertTrue(jobs[4].wait(0))
+
+        # Cancel a job that has started; its result is discarded.
+        self.assertTrue(jobs[0].wait(0) is False)
+        self.assertTrue(jobs[0].cancel())
+
+        release.set()
+        for job in jobs:
+            self.assertTrue(job.wait(5.))
+        self.assertEqual(self.executor.queue_depth, 0)
+        self.assertEqual(sorted(started), [0, 1, 2, 3])
+
+        app.platform_event_loop.dispatch_posted_events()
+        self.assertEqual(sorted([result for result, thread in self.results]),
+                         [1, 2, 3])
+
+    def test_run_in_executor(self):
+        job = app.run_in_executor(abs, -3, callback=self.callback)
+        self.assertTrue(app.get_executor() is app.get_executor())
+        self.assertTrue(job.wait(5.))
+        app.platform_event_loop.dispatch_posted_events()
+        self.assertEqual(self.results, [(3, threading.currentThread())])
+
+    def test_shutdown(self):
+        self.executor.shutdown()
+        self.assertRaises(RuntimeError, self.executor.submit, abs, 1)
+
+if __name__ == '__main__':
+    unittest.main()
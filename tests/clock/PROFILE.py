@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+'''Test that a clock with profiling enabled times each scheduled function,
+and reports those slower than its threshold.
+'''
+
+__docformat__ = 'restructuredtext'
+__version__ = '$Id: $'
+
+import unittest
+
+from pyglet import clock
+
+__noninteractive = True
+
+class PROFILE(unittest.TestCase):
+    def setUp(self):
+        self.time = 0.
+        self.clock = clock.Clock(time_function=lambda: self.time)
+
+    def tick(self, dt):
+        self.time += dt
+        self.clock.tick()
+
+    def create_callback(self, duration):
+        # Each call advances the time by duration.
+        def callback(dt):
+            self.time += duration
+        return callback
+
+    def test_disabled(self):
+        self.assertEqual(self.clock.profile, None)
+        self.clock.schedule(self.create_callback(0.1))
+        self.tick(1.)
+
+        profile = self.clock.enable_profiling()
+        self.assertTrue(self.clock.enable_profiling() is profile)
+        self.clock.disable_profiling()
+        self.assertEqual(self.clock.profile, None)
+
+    def test_report(self):
+        profile = self.clock.enable_profiling(threshold=1.)
+        profile.time = lambda: self.time
+        fast = self.create_callback(0.1)
+        slow = self.create_callback(0.5)
+        self.clock.schedule(fast)
+        self.clock.schedule_interval(slow, 1.)
+        self.clock.schedule_once(fast, 1.)
+        for i in range(3):
+            self.tick(1.)
+
+        report = profile.get_report()
+        self.assertEqual([stats.func for stats in report], [slow, fast])
+        self.assertEqual(report[0].calls, 3)
+        self.assertAlmostEqual(report[0].total_time, 1.5)
+        self.assertAlmostEqual(report[0].max_time, 0.5)
+        self.assertEqual(report[1].calls, 4)
+        self.assertAlmostEqual(report[1].total_time, 0.4)
+
+        profile.reset()
+        self.assertEqual(profile.get_report(), [])
+
+    def test_slow_callback(self):
+        profile = self.clock.enable_profiling(threshold=0.2)
+        profile.time = lambda: self.time
+        slow_calls = []
+        def on_slow_callback(func, duration):
+            slow_calls.append((func, duration))
+        profile.push_handlers(on_slow_callback)
+
+        fast = self.create_callback(0.1)
+        slow = self.create_callback(0.3)
+        self.clock.schedule(fast)
+        self.clock.schedule_once(slow, 0.5)
+        self.tick(1.)
+        self.tick(1.)
+        self.assertEqual(len(slow_calls), 1)
+        self.assertTrue(slow_calls[0][0] is slow)
+        self.assertAlmostEqual(slow_calls[0][1], 0.3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+'''Test that the handles returned by the schedule methods unschedule just
+their own function, with both the heap and timer wheel schedulers.
+'''
+
+__docformat__ = 'restructuredtext'
+__version__ = '$Id: $'
+
+import unittest
+
+from pyglet import clock
+
+__noninteractive = True
+
+class SCHEDULE_CANCEL(unittest.TestCase):
+    scheduler = 'heap'
+
+    def setUp(self):
+        self.time = 0.
+        self.clock = clock.Clock(time_function=lambda: self.time,
+                                 scheduler=self.scheduler)
+        self.calls = []
+
+    def tick(self, dt):
+        self.time += dt
+        self.clock.tick()
+
+    def callback(self, dt, name):
+        self.calls.append(name)
+
+    def test_once(self):
+        handle = self.clock.schedule_once(self.callback, 1., 'a')
+        self.clock.schedule_once(self.callback, 1., 'b')
+        handle.cancel()
+        self.tick(1.)
+        self.assertEqual(self.calls, ['b'])
+
+        # Cancelling after the function was called, or twice, does nothing.
+        handle.cancel()
+        self.assertEqual(self.clock.get_sleep_time(True), None)
+
+    def test_interval(self):
+        handle = self.clock.schedule_interval(self.callback, 1., 'a')
+        soft_handle = self.clock.schedule_interval_soft(self.callback, 1.,
+                                                        'b')
+        self.tick(1.)
+        self.assertEqual(self.calls, ['b', 'a'])
+        handle.cancel()
+        self.tick(1.)
+        self.assertEqual(self.calls, ['b', 'a', 'b'])
+        soft_handle.cancel()
+        self.assertEqual(self.clock.get_sleep_time(True), None)
+
+    def test_every_frame(self):
+        handle = self.clock.schedule(self.callback, 'a')
+        self.clock.schedule(self.callback, 'b')
+        handle.cancel()
+        handle.cancel()
+        self.tick(1.)
+        self.assertEqual(self.calls, ['b'])
+
+        self.clock.unschedule(self.callback)
+        self.assertEqual(self.clock.get_sleep_time(True), None)
+
+    def test_every_frame_sleep(self):
+        handle = self.clock.schedule(self.callback, 'a')
+        self.assertEqual(self.clock.get_sleep_time(True), 0.)
+        handle.cancel()
+        self.assertEqual(self.clock.get_sleep_time(True), None)
+
+    def test_cancel_during_tick(self):
+        handles = []
+        def cancel(dt):
+            for handle in handles:
+                handle.cancel()
+        self.clock.schedule_once(cancel, 1.)
+        handles.append(self.clock.schedule_once(self.callback, 1., 'a'))
+        handles.append(self.clock.schedule_interval(self.callback, 1., 'b'))
+        self.tick(1.)
+        self.tick(1.)
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.clock.get_sleep_time(True), None)
+
+    def test_unschedule(self):
+        # Unscheduling by function still removes every occurrence, including
+        # those already cancelled.
+        handle = self.clock.schedule_once(self.callback, 1., 'a')
+        self.clock.schedule_once(self.callback, 2., 'b')
+        self.clock.schedule_interval(self.callback, 0.5, 'c')
+        handle.cancel()
+        self.clock.unschedule(self.callback)
+        handle.cancel()
+        self.tick(2.)
+        self.assertEqual(self.calls, [])
+
+    def test_cancel_many(self):
+        handles = [self.clock.schedule_once(self.callback, i * 0.01, i)
+                   for i in range(1, 1001)]
+        for handle in handles[::2]:
+            handle.cancel()
+        self.assertEqual(len(self.clock._schedule_interval_items), 500)
+        self.tick(10.)
+        self.assertEqual(self.calls, range(2, 1001, 2))
+
+class SCHEDULE_CANCEL_WHEEL(SCHEDULE_CANCEL):
+    scheduler = 'wheel'
+
+if __name__ == '__main__':
+    unittest.main()
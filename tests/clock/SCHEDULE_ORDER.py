@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+
+'''Test that scheduled interval functions are called in order of the time
+they are due, and that unscheduling and rescheduling from within scheduled
+functions take effect correctly, with both the heap and timer wheel
+schedulers.
+'''
+
+__docformat__ = 'restructuredtext'
+__version__ = '$Id: $'
+
+import random
+import time
+import unittest
+
+from pyglet import clock
+
+__noninteractive = True
+
+class SCHEDULE_ORDER(unittest.TestCase):
+    scheduler = 'heap'
+
+    def setUp(self):
+        self.time = 0.
+        self.clock = clock.Clock(time_function=lambda: self.time,
+                                 scheduler=self.scheduler)
+        self.calls = []
+
+    def tick(self, dt):
+        self.time += dt
+        self.clock.tick()
+
+    def callback(self, dt, name):
+        self.calls.append(name)
+
+    def test_order(self):
+        delays = range(100)
+        random.shuffle(delays)
+        for delay in delays:
+            self.clock.schedule_once(self.callback, delay / 10., delay)
+        for i in range(100):
+            self.tick(0.1)
+        self.assertEqual(self.calls, range(100))
+        self.assertEqual(self.clock.get_sleep_time(True), None)
+
+    def test_same_time(self):
+        for name in range(10):
+            self.clock.schedule_once(self.callback, 1., name)
+        self.tick(1.)
+        self.assertEqual(self.calls, range(10))
+
+    def test_interval(self):
+        self.clock.schedule_interval(self.callback, 0.125, 'a')
+        self.clock.schedule_interval(self.callback, 0.3, 'b')
+        for i in range(8):
+            self.tick(0.0625)
+        self.assertEqual(self.calls, ['a', 'a', 'b', 'a', 'a'])
+        self.assertAlmostEqual(self.clock.get_sleep_time(True), 0.1125)
+
+    def test_unschedule(self):
+        def unschedule(dt):
+            self.clock.unschedule(self.callback)
+        self.clock.schedule_once(unschedule, 1.)
+        self.clock.schedule_once(self.callback, 1., 'a')
+        self.clock.schedule_interval(self.callback, 0.5, 'b')
+        self.tick(1.)
+        self.assertEqual(self.calls, ['b'])
+        self.tick(1.)
+        self.assertEqual(self.calls, ['b'])
+        self.assertEqual(self.clock.get_sleep_time(True), None)
+
+    def test_unschedule_self(self):
+        # An interval function unscheduling itself, by function or by
+        # handle, is not put back in the scheduler.
+        def unschedule(dt):
+            self.clock.unschedule(unschedule)
+        def cancel(dt):
+            handle.cancel()
+        self.clock.schedule_interval(unschedule, 1.)
+        handle = self.clock.schedule_interval(cancel, 1.)
+        self.clock.schedule_interval(self.callback, 3., 'a')
+        self.tick(1.)
+        self.assertEqual(len(self.clock._schedule_interval_items), 1)
+        self.assertEqual(list(self.clock._schedule_interval_items)[0].args,
+                         ('a',))
+        self.assertAlmostEqual(self.clock.get_sleep_time(True), 2.)
+        self.tick(2.)
+        self.assertEqual(self.calls, ['a'])
+        self.assertEqual(len(self.clock._schedule_interval_items), 1)
+
+    def test_unschedule_many(self):
+        def other(dt):
+            pass
+        for i in range(100):
+            self.clock.schedule_once(other, 1. + i)
+        self.clock.schedule_once(self.callback, 0.5, 'a')
+        self.clock.unschedule(other)
+        self.assertEqual(len(self.clock._schedule_interval_items), 1)
+        self.assertAlmostEqual(self.clock.get_sleep_time(True), 0.5)
+
+    def test_reschedule(self):
+        # A function scheduled from a scheduled function is not called until
+        # the next tick, even if it is already due.
+        def reschedule(dt):
+            self.calls.append('r')
+            self.clock.schedule_once(reschedule, 0)
+        self.clock.schedule_once(reschedule, 0)
+        self.tick(0.1)
+        self.tick(0.1)
+        self.assertEqual(self.calls, ['r', 'r'])
+
+    def test_catch_up(self):
+        # Missing by a little schedules a whole interval from now; missing by
+        # a lot reschedules out of phase with other functions.
+        self.clock.schedule_interval(self.callback, 1., 'a')
+        self.tick(1.02)
+        self.assertEqual(self.calls, ['a'])
+        self.assertAlmostEqual(self.clock.get_sleep_time(True), 1.)
+        self.tick(3.)
+        self.assertEqual(self.calls, ['a', 'a'])
+        self.assertTrue(self.clock.get_sleep_time(True) > 0)
+        self.tick(1.)
+        self.assertEqual(self.calls, ['a', 'a', 'a'])
+
+    def test_catch_up_many(self):
+        # Items missed by a lot are spread over the following interval,
+        # without searching every scheduled item for each.
+        for i in range(3000):
+            self.clock.schedule_interval(self.callback, 1., i)
+        start = time.time()
+        self.tick(5.)
+        self.assertTrue(time.time() - start < 1.)
+        self.assertEqual(sorted(self.calls), range(3000))
+
+        next_times = [item.next_ts
+                      for item in self.clock._schedule_interval_items]
+        next_times.sort()
+        self.assertEqual(next_times[:3], [5.0625, 5.125, 5.1875])
+        self.assertEqual(next_times[-1], 6.)
+        self.assertTrue(min(next_times) > 5.)
+
+    def test_soft(self):
+        self.clock.schedule_interval(self.callback, 1., 'a')
+        self.clock.schedule_interval_soft(self.callback, 1., 'b')
+        self.tick(0.6)
+        self.assertEqual(self.calls, ['b'])
+        self.tick(0.4)
+        self.assertEqual(self.calls, ['b', 'a'])
+
+class SCHEDULE_ORDER_WHEEL(SCHEDULE_ORDER):
+    scheduler = 'wheel'
+
+    def test_resolution(self):
+        # Functions in the same slot are still called only when due.
+        self.clock = clock.Clock(time_function=lambda: self.time,
+                                 scheduler='wheel', resolution=1.)
+        self.clock.schedule_once(self.callback, 0.75, 'b')
+        self.clock.schedule_once(self.callback, 0.5, 'a')
+        self.clock.schedule_once(self.callback, 1.25, 'c')
+        self.assertAlmostEqual(self.clock.get_sleep_time(True), 0.5)
+        self.tick(0.6)
+        self.assertEqual(self.calls, ['a'])
+        self.assertAlmostEqual(self.clock.get_sleep_time(True), 0.15)
+        self.tick(0.6)
+        self.assertEqual(self.calls, ['a', 'b'])
+        self.tick(0.6)
+        self.assertEqual(self.calls, ['a', 'b', 'c'])
+
+    def test_revolutions(self):
+        # Functions due several revolutions of the wheel apart.
+        revolution = clock._TimerWheel.slots * 0.01
+        for i in range(3):
+            self.clock.schedule_once(self.callback, 0.5 + i * revolution, i)
+        self.tick(0.5)
+        self.assertEqual(self.calls, [0])
+        self.assertAlmostEqual(self.clock.get_sleep_time(True), revolution)
+        self.tick(revolution * 3)
+        self.assertEqual(self.calls, [0, 1, 2])
+
+    def test_cancel_many(self):
+        def other(dt):
+            pass
+        for i in range(10000):
+            self.clock.schedule_once(other, i * 0.001)
+        self.clock.schedule_once(self.callback, 5., 'a')
+        self.clock.unschedule(other)
+        self.assertEqual(len(self.clock._schedule_interval_items), 1)
+        self.tick(5.)
+        self.assertEqual(self.calls, ['a'])
+
+if __name__ == '__main__':
+    unittest.main()
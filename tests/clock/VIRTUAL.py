@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+'''Test that a virtual clock jumps straight to each scheduled function,
+without sleeping.
+'''
+
+__docformat__ = 'restructuredtext'
+__version__ = '$Id: $'
+
+import time
+import unittest
+
+from pyglet import clock
+
+__noninteractive = True
+
+class VIRTUAL(unittest.TestCase):
+    def setUp(self):
+        self.clock = clock.VirtualClock(frame_period=0.25)
+        self.calls = []
+
+    def callback(self, dt, name):
+        self.calls.append((name, self.clock.time(), dt))
+
+    def test_tick(self):
+        self.assertEqual(self.clock.tick(), 0)
+        self.assertEqual(self.clock.time(), 0.)
+
+        self.clock.schedule_once(self.callback, 10., 'a')
+        self.clock.schedule_once(self.callback, 1000., 'b')
+        self.assertEqual(self.clock.get_sleep_time(True), 0.)
+        self.assertEqual(self.clock.tick(), 10.)
+        self.assertEqual(self.clock.tick(), 990.)
+        self.assertEqual(self.calls, [('a', 10., 10.), ('b', 1000., 1000.)])
+        self.assertEqual(self.clock.get_sleep_time(True), None)
+
+        # Nothing scheduled, so time stands still.
+        self.assertEqual(self.clock.tick(), 0)
+
+    def test_every_frame(self):
+        self.clock.tick()
+        self.clock.schedule(self.callback, 'a')
+        self.clock.schedule_once(self.callback, 0.625, 'b')
+        for i in range(4):
+            self.clock.tick()
+        self.assertEqual(self.calls, [
+            ('a', 0.25, 0.25), ('a', 0.5, 0.25), ('a', 0.625, 0.125),
+            ('b', 0.625, 0.625), ('a', 0.875, 0.25)])
+
+    def test_advance(self):
+        start = time.time()
+        self.clock.schedule_interval(self.callback, 1., 'a')
+        self.clock.schedule_once(self.callback, 1000.5, 'b')
+        self.clock.advance(1000.75)
+        self.assertTrue(time.time() - start < 10.)
+        self.assertEqual(self.clock.time(), 1000.75)
+        self.assertEqual(len(self.calls), 1001)
+        self.assertEqual(self.calls[-1], ('b', 1000.5, 1000.5))
+        for i, call in enumerate(self.calls[:-1]):
+            self.assertEqual(call, ('a', i + 1., 1.))
+
+    def test_advance_partial(self):
+        self.clock.schedule_interval(self.callback, 1., 'a')
+        self.clock.advance(0.5)
+        self.assertEqual(self.calls, [])
+        self.clock.advance(0.5)
+        self.assertEqual(self.calls, [('a', 1., 1.)])
+
+    def test_sleep(self):
+        self.clock.sleep(2500000)
+        self.assertEqual(self.clock.time(), 2.5)
+
+if __name__ == '__main__':
+    unittest.main()
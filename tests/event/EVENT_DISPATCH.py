@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+'''Test that events are dispatched to handlers in stack order, and that
+changes to the handler stack take effect at the next dispatch.
+'''
+
+__docformat__ = 'restructuredtext'
+__version__ = '$Id: $'
+
+import unittest
+
+from pyglet import event
+
+__noninteractive = True
+
+class Dispatcher(event.EventDispatcher):
+    def __init__(self):
+        self.calls = []
+
+    def on_default(self, value):
+        self.calls.append(('default', value))
+
+Dispatcher.register_event_type('on_test')
+Dispatcher.register_event_type('on_default')
+
+class EVENT_DISPATCH(unittest.TestCase):
+    def setUp(self):
+        self.dispatcher = Dispatcher()
+        self.calls = self.dispatcher.calls
+
+    def handler(self, name, result=event.EVENT_UNHANDLED):
+        def on_test(value):
+            self.calls.append((name, value))
+            return result
+        return on_test
+
+    def test_no_handlers(self):
+        self.assertEqual(self.dispatcher.dispatch_event('on_test', 1), False)
+        self.assertEqual(self.dispatcher.dispatch_event('on_default', 1),
+                         event.EVENT_UNHANDLED)
+        self.assertEqual(self.calls, [('default', 1)])
+
+    def test_push_pop(self):
+        self.dispatcher.dispatch_event('on_test', 0)
+        self.dispatcher.push_handlers(self.handler('a'))
+        self.dispatcher.dispatch_event('on_test', 1)
+        self.dispatcher.push_handlers(self.handler('b'))
+        self.dispatcher.dispatch_event('on_test', 2)
+        self.dispatcher.pop_handlers()
+        self.dispatcher.dispatch_event('on_test', 3)
+        self.dispatcher.pop_handlers()
+        self.assertEqual(self.dispatcher.dispatch_event('on_test', 4), False)
+        self.assertEqual(self.calls,
+                         [('a', 1), ('b', 2), ('a', 2), ('a', 3)])
+
+    def test_handled(self):
+        self.dispatcher.push_handlers(self.handler('a'))
+        self.dispatcher.push_handlers(self.handler('b', event.EVENT_HANDLED))
+        self.assertEqual(self.dispatcher.dispatch_event('on_test', 1),
+                         event.EVENT_HANDLED)
+        self.assertEqual(self.calls, [('b', 1)])
+
+    def test_set_remove(self):
+        a = self.handler('a')
+        b = self.handler('b')
+        self.dispatcher.dispatch_event('on_test', 0)
+        self.dispatcher.set_handler('on_test', a)
+        self.dispatcher.dispatch_event('on_test', 1)
+        self.dispatcher.set_handler('on_test', b)
+        self.dispatcher.dispatch_event('on_test', 2)
+        self.dispatcher.remove_handler('on_test', b)
+        self.dispatcher.dispatch_event('on_test', 3)
+        self.dispatcher.push_handlers(a)
+        self.dispatcher.dispatch_event('on_test', 4)
+        self.dispatcher.remove_handlers(a)
+        self.dispatcher.dispatch_event('on_test', 5)
+        self.assertEqual(self.calls, [('a', 1), ('b', 2), ('a', 4)])
+
+    def test_default_assigned(self):
+        self.dispatcher.dispatch_event('on_default', 1)
+        self.dispatcher.on_default = self.handler('a')
+        self.dispatcher.dispatch_event('on_default', 2)
+        self.assertEqual(self.calls, [('default', 1), ('a', 2)])
+
+    def test_modify_during_dispatch(self):
+        # A handler that pops itself does not prevent the handlers below it
+        # from receiving the event.
+        def on_test(value):
+            self.calls.append(('pop', value))
+            self.dispatcher.pop_handlers()
+        self.dispatcher.push_handlers(self.handler('a'))
+        self.dispatcher.push_handlers(on_test)
+        self.dispatcher.dispatch_event('on_test', 1)
+        self.dispatcher.dispatch_event('on_test', 2)
+        self.assertEqual(self.calls, [('pop', 1), ('a', 1), ('a', 2)])
+
+    def test_dispatchers_independent(self):
+        other = Dispatcher()
+        self.dispatcher.push_handlers(self.handler('a'))
+        self.dispatcher.dispatch_event('on_test', 1)
+        self.assertEqual(other.dispatch_event('on_test', 2), False)
+        self.assertEqual(self.calls, [('a', 1)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,434 @@
+#!/usr/bin/python
+# $Id:$
+
+'''Test that a batch's draw list is kept consistent with its group tree as
+vertex lists and groups are added and removed.
+'''
+
+import gc
+import random
+import StringIO
+import struct
+import unittest
+import weakref
+
+from pyglet import graphics
+from pyglet.gl import GL_POINTS, GL_TRIANGLES
+from pyglet.graphics import vertexbuffer
+
+__noninteractive = True
+
+class StateGroup(graphics.Group):
+    '''A group with state that can be compared, but which makes no GL
+    calls.'''
+    def __init__(self, state, parent=None):
+        super(StateGroup, self).__init__(parent)
+        self.state = state
+
+    def set_state(self):
+        pass
+
+    def unset_state(self):
+        pass
+
+    def __eq__(self, other):
+        return (self.__class__ is other.__class__ and
+                self.state == other.state and
+                self.parent == other.parent)
+
+    def __hash__(self):
+        return hash((self.state, self.parent))
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.state)
+
+class TestBatchDrawList(unittest.TestCase):
+    def setUp(self):
+        self.batch = graphics.Batch()
+        self.vertex_lists = {}
+
+        self.layers = [graphics.OrderedGroup(i) for i in range(4)]
+        self.groups = list(self.layers)
+        for layer in self.layers:
+            for i in range(5):
+                group = graphics.OrderedGroup(i, layer)
+                self.groups.append(group)
+                self.groups.append(graphics.OrderedGroup(0, group))
+
+    def add(self, group, formats=('v2f/none',)):
+        vertex_list = self.batch.add(1, GL_POINTS, group, *formats)
+        self.vertex_lists[vertex_list] = group
+        return vertex_list
+
+    def delete(self, vertex_list):
+        vertex_list.delete()
+        del self.vertex_lists[vertex_list]
+
+    def get_draw_list(self):
+        '''Describe the batch's draw list as a list of tuples.'''
+        draw_list = []
+        for func in self.batch._draw_list:
+            if getattr(func, '__name__', None) == 'set_state':
+                draw_list.append(('set', func.__self__))
+            elif getattr(func, '__name__', None) == 'unset_state':
+                draw_list.append(('unset', func.__self__))
+            else:
+                draw_list.append(('draw', func.domain))
+        return draw_list
+
+    def get_expected_draw_list(self):
+        '''Walk the groups of the live vertex lists in preorder.'''
+        live = set()
+        for group in self.vertex_lists.values():
+            while group is not None:
+                live.add(group)
+                group = group.parent
+
+        def visit(group):
+            draw_list = [('set', group)]
+            for domain in self.batch.group_map[group].values():
+                draw_list.append(('draw', domain))
+            children = [g for g in live if g.parent == group]
+            for child in sorted(children):
+                draw_list.extend(visit(child))
+            draw_list.append(('unset', group))
+            return draw_list
+
+        draw_list = []
+        for group in sorted(g for g in live if g.parent is None):
+            draw_list.extend(visit(group))
+        return draw_list, live
+
+    def check(self):
+        self.batch._update_draw_list()
+        expected, live = self.get_expected_draw_list()
+        self.assertEqual(set(self.batch.group_map), live)
+        for domain_map in self.batch.group_map.values():
+            for domain in domain_map.values():
+                self.assertFalse(domain._is_empty())
+        self.assertEqual(self.get_draw_list(), expected)
+
+    def test_add_remove(self):
+        vertex_list = self.add(self.groups[-1])
+        self.check()
+        self.delete(vertex_list)
+        self.check()
+        self.assertFalse(self.batch._draw_list)
+
+    def test_order(self):
+        for group in reversed(self.groups):
+            self.add(group)
+        self.check()
+
+    def test_multiple_domains(self):
+        group = self.groups[5]
+        self.add(group)
+        self.check()
+        vertex_list = self.add(group, ('v2f/none', 'c4B/none'))
+        self.check()
+        self.delete(vertex_list)
+        self.check()
+
+    def test_migrate(self):
+        vertex_list = self.add(self.groups[3])
+        self.add(self.groups[7])
+        self.check()
+        self.batch.migrate(vertex_list, GL_POINTS, self.groups[9], self.batch)
+        self.vertex_lists[vertex_list] = self.groups[9]
+        self.check()
+
+    def test_equal_groups(self):
+        # A group equal to, but not the same instance as, one in the batch.
+        self.add(graphics.OrderedGroup(2, self.layers[1]))
+        vertex_list = self.add(graphics.OrderedGroup(2, self.layers[1]))
+        self.check()
+        self.delete(vertex_list)
+        self.check()
+
+    def test_random(self):
+        random.seed(1)
+        for i in range(50):
+            for j in range(random.randint(0, 10)):
+                self.add(random.choice(self.groups))
+            for j in range(random.randint(0, 10)):
+                if self.vertex_lists:
+                    self.delete(random.choice(list(self.vertex_lists)))
+            self.check()
+
+class TestBatchMergeState(unittest.TestCase):
+    def get_calls(self, batch):
+        batch._update_draw_list()
+        calls = []
+        for func in batch._draw_list:
+            if hasattr(func, 'domain'):
+                calls.append('draw')
+            else:
+                calls.append((func.__name__, func.__self__.state))
+        return calls
+
+    def test_merge(self):
+        batch = graphics.Batch(merge_state=True)
+        for order, state in enumerate(('a', 'a', 'b', 'a', 'a')):
+            layer = graphics.OrderedGroup(order)
+            batch.add(1, GL_POINTS, StateGroup(state, layer), 'v2f/none')
+        self.assertEqual(self.get_calls(batch), [
+            ('set_state', 'a'), 'draw', 'draw', ('unset_state', 'a'),
+            ('set_state', 'b'), 'draw', ('unset_state', 'b'),
+            ('set_state', 'a'), 'draw', 'draw', ('unset_state', 'a')])
+        # 10 ordered group calls, and 2 pairs of state group calls
+        self.assertEqual(batch.removed_transitions, 14)
+
+    def test_nested(self):
+        batch = graphics.Batch(merge_state=True)
+        outer = StateGroup('outer')
+        batch.add(1, GL_POINTS, StateGroup('a', outer), 'v2f/none')
+        batch.add(1, GL_POINTS, StateGroup('b', outer), 'v2f/none')
+        calls = self.get_calls(batch)
+        self.assertEqual(calls[0], ('set_state', 'outer'))
+        self.assertEqual(calls[-1], ('unset_state', 'outer'))
+        self.assertEqual(len(calls), 8)
+        self.assertEqual(batch.removed_transitions, 0)
+
+    def test_differing_parents(self):
+        # Parents with state must not be merged away
+        batch = graphics.Batch(merge_state=True)
+        for state in ('x', 'y'):
+            parent = StateGroup(state)
+            batch.add(1, GL_POINTS, StateGroup('a', parent), 'v2f/none')
+        self.assertEqual(len(self.get_calls(batch)), 10)
+        self.assertEqual(batch.removed_transitions, 0)
+
+    def test_disabled(self):
+        batch = graphics.Batch()
+        for order in range(2):
+            layer = graphics.OrderedGroup(order)
+            batch.add(1, GL_POINTS, StateGroup('a', layer), 'v2f/none')
+        batch._update_draw_list()
+        self.assertEqual(len(batch._draw_list), 10)
+        self.assertEqual(batch.removed_transitions, 0)
+
+class TestBatchAddMany(unittest.TestCase):
+    def test_add_many(self):
+        batch = graphics.Batch()
+        vertex_lists = batch.add_many(10, 3, GL_TRIANGLES, None,
+                                      ('v2f/none', range(60)), 'c3B/none')
+        self.assertEqual(len(vertex_lists), 10)
+        self.assertEqual(vertex_lists[0].domain.allocator.starts, [0])
+        self.assertEqual(vertex_lists[0].domain.allocator.sizes, [30])
+        for i, vertex_list in enumerate(vertex_lists):
+            self.assertEqual(vertex_list.count, 3)
+            self.assertEqual(list(vertex_list.vertices),
+                             range(i * 6, i * 6 + 6))
+
+        # Delete individually
+        vertex_lists[4].delete()
+        vertex_lists[5].resize(4)
+        vertex_lists[5].vertices[6:] = [-1, -1]
+        self.assertEqual(list(vertex_lists[6].vertices), range(36, 42))
+        self.assertEqual(list(vertex_lists[5].vertices),
+                         range(30, 36) + [-1, -1])
+        for vertex_list in vertex_lists:
+            if vertex_list is not vertex_lists[4]:
+                vertex_list.delete()
+        batch._update_draw_list()
+        self.assertFalse(batch.group_map)
+
+    def test_add_many_indexed(self):
+        batch = graphics.Batch()
+        batch.add_indexed(1, GL_TRIANGLES, None, [0, 0, 0], 'v2f/none')
+        vertex_lists = batch.add_many_indexed(4, 4, GL_TRIANGLES, None,
+            [0, 1, 2, 0, 2, 3], ('v2f/none', range(32)))
+        for i, vertex_list in enumerate(vertex_lists):
+            start = vertex_list.start
+            self.assertEqual(start, 1 + i * 4)
+            self.assertEqual(list(vertex_list.indices),
+                [start, start + 1, start + 2, start, start + 2, start + 3])
+            self.assertEqual(list(vertex_list.vertices),
+                             range(i * 8, i * 8 + 8))
+
+    def test_add_many_array(self):
+        numpy = vertexbuffer.numpy
+        if numpy is None:
+            return
+        batch = graphics.Batch()
+        vertex_lists = batch.add_many(5, 2, GL_POINTS, None,
+            ('v2f/none', numpy.arange(20)), ('c4B/static', numpy.ones(40)))
+        self.assertEqual(list(vertex_lists[3].vertices), [12, 13, 14, 15])
+        self.assertEqual(list(vertex_lists[3].colors), [1] * 8)
+
+    def test_add_many_length(self):
+        # Short data leaves the remaining components zero.
+        batch = graphics.Batch()
+        vertex_lists = batch.add_many(5, 2, GL_POINTS, None,
+                                      ('v2f/none', range(1, 19)))
+        self.assertEqual(list(vertex_lists[3].vertices), [13, 14, 15, 16])
+        self.assertEqual(list(vertex_lists[4].vertices), [17, 18, 0, 0])
+        self.assertRaises(IndexError, batch.add_many, 5, 2, GL_POINTS,
+                          None, ('v2f/none', range(21)))
+
+    def test_add_many_empty(self):
+        batch = graphics.Batch()
+        self.assertEqual(batch.add_many(0, 2, GL_POINTS, None, 'v2f/none'),
+                         [])
+
+class TestBatchSubset(unittest.TestCase):
+    def test_ranges(self):
+        batch = graphics.Batch()
+        vertex_lists = batch.add_many(10, 2, GL_POINTS, None, 'v2f/none')
+        domain = vertex_lists[0].domain
+        starts, sizes = domain.get_subset(
+            [vertex_lists[i] for i in (7, 1, 2, 3, 5, 8)])
+        self.assertEqual(list(starts), [2, 10, 14])
+        self.assertEqual(list(sizes), [6, 2, 4])
+
+    def test_ranges_indexed(self):
+        batch = graphics.Batch()
+        vertex_lists = batch.add_many_indexed(5, 4, GL_TRIANGLES, None,
+            [0, 1, 2, 0, 2, 3], 'v2f/none')
+        domain = vertex_lists[0].domain
+        starts, sizes = domain.get_subset(vertex_lists[3:] + vertex_lists[:2])
+        self.assertEqual(list(starts), [0, 18])
+        self.assertEqual(list(sizes), [12, 12])
+
+    def test_groups(self):
+        batch = graphics.Batch()
+        parent = StateGroup('parent')
+        groups = [graphics.OrderedGroup(i, parent) for i in range(3)]
+        vertex_lists = [batch.add(1, GL_POINTS, group, 'v2f/none')
+                        for group in groups]
+        other = batch.add(1, GL_POINTS, StateGroup('other'), 'v2f/none')
+        subset = batch.get_subset([vertex_lists[2], vertex_lists[0]])
+        calls = [(func.__name__, func.__self__)
+                 for func in subset._draw_list
+                 if func.__name__ != '<lambda>']
+        self.assertEqual(calls, [
+            ('set_state', parent),
+            ('set_state', groups[0]), ('unset_state', groups[0]),
+            ('set_state', groups[2]), ('unset_state', groups[2]),
+            ('unset_state', parent)])
+        self.assertEqual(len(subset._draw_list), 8)
+
+class TestBatchGarbage(unittest.TestCase):
+    def test_collected(self):
+        # A batch and its vertex lists can be garbage collected, although
+        # each vertex list refers to its domain.
+        gc.collect()
+        garbage = len(gc.garbage)
+        batch = graphics.Batch()
+        vertex_list = batch.add(1, GL_POINTS, None, 'v2f/none')
+        domain = weakref.ref(vertex_list.domain)
+        del batch, vertex_list
+        gc.collect()
+        self.assertEqual(len(gc.garbage), garbage)
+        self.assertEqual(domain(), None)
+
+class TestBatchSave(unittest.TestCase):
+    def group_factory(self, key, parent):
+        self.keys.append((key, parent))
+        if key.startswith('OrderedGroup'):
+            return graphics.OrderedGroup(int(key[13:-1]), parent)
+        return StateGroup(key, parent)
+
+    def save_load(self, batch, group_key=repr):
+        file = StringIO.StringIO()
+        saved_lists = batch.save(file, group_key)
+        self.assertEqual(len(file.getvalue()) % 16, 0)
+        file.seek(0)
+        self.keys = []
+        loaded, loaded_lists = graphics.Batch.load(file, self.group_factory)
+        self.assertEqual(len(loaded_lists), len(saved_lists))
+        for saved, vertex_list in zip(saved_lists, loaded_lists):
+            self.assertEqual(type(vertex_list), type(saved))
+            self.assertEqual(list(vertex_list.vertices),
+                             list(saved.vertices))
+        return loaded, loaded_lists
+
+    def get_vertex_lists(self, batch):
+        vertex_lists = []
+        for domain_map in batch.group_map.values():
+            for domain in domain_map.values():
+                vertex_lists.extend(domain._vertex_lists)
+        return vertex_lists
+
+    def test_save_load(self):
+        batch = graphics.Batch(compact_threshold=0.5)
+        layer = graphics.OrderedGroup(1)
+        parent = StateGroup('parent', layer)
+        points = batch.add(2, GL_POINTS, None, ('v2f/static', [1, 2, 3, 4]))
+        lists = batch.add_many(100, 3, GL_TRIANGLES, parent,
+            ('v2f/dynamic', range(600)), ('c3B/static', [7] * 900))
+        for vertex_list in lists[1::2]:
+            vertex_list.delete()
+        indexed = batch.add_indexed(3, GL_TRIANGLES, graphics.OrderedGroup(0),
+                                    [0, 1, 2, 2, 1, 0], ('v2f/none', range(6)))
+
+        def group_key(group):
+            if isinstance(group, StateGroup):
+                return group.state
+            return repr(group)
+        loaded, loaded_lists = self.save_load(batch, group_key)
+        self.assertEqual(len(loaded_lists), 52)
+        self.assertEqual(set(loaded_lists),
+                         set(self.get_vertex_lists(loaded)))
+        self.assertTrue(('parent', graphics.OrderedGroup(1)) in self.keys)
+        self.assertTrue(('OrderedGroup(1)', None) in self.keys)
+        self.assertEqual(loaded.compact_threshold, 0.5)
+        self.assertEqual(set(loaded.group_map), set(batch.group_map))
+
+        def describe(batch):
+            description = []
+            for vertex_list in self.get_vertex_lists(batch):
+                item = (vertex_list.domain.allocator.capacity,
+                        vertex_list.start,
+                        list(vertex_list.vertices))
+                if hasattr(vertex_list, 'indices'):
+                    item += (list(vertex_list.indices),)
+                if 'colors' in vertex_list.domain.attribute_names:
+                    item += (list(vertex_list.colors),)
+                description.append(item)
+            description.sort()
+            return description
+        self.assertEqual(describe(loaded), describe(batch))
+
+        # The loaded domains remain consistent
+        domain = loaded.group_map[parent].values()[0]
+        self.assertEqual(domain.allocator.get_allocated_regions(),
+                         lists[0].domain.allocator.get_allocated_regions())
+        vertex_lists = sorted(domain._vertex_lists, key=lambda v: v.start)
+        for vertex_list in vertex_lists[1:]:
+            vertex_list.delete()
+        self.assertEqual(list(vertex_lists[0].vertices), range(6))
+        new = loaded.add(3, GL_TRIANGLES, parent, 'v2f/dynamic', 'c3B/static')
+        self.assertEqual(new.domain, domain)
+        loaded._update_draw_list()
+
+    def test_empty(self):
+        loaded, loaded_lists = self.save_load(graphics.Batch())
+        self.assertEqual(loaded.group_map, {})
+        self.assertEqual(loaded_lists, [])
+
+    def test_header(self):
+        value = {'a': (None, True, False, -1, 2 ** 40, 0.5, 'b', u'\xe9'),
+                 'c': (), 'd': {(1, 2): 'e'}}
+        data = graphics._pack_batch_header(value)
+        self.assertEqual(graphics._unpack_batch_header(data), value)
+        for i in range(len(data)):
+            self.assertRaises(ValueError,
+                              graphics._unpack_batch_header, data[:i])
+        self.assertRaises(TypeError, graphics._pack_batch_header, object())
+
+    def test_pickle_rejected(self):
+        # A header is never unpickled.
+        import pickle
+        header = pickle.dumps({'domains': []}, 2)
+        file = StringIO.StringIO(struct.pack('<8sII', 'PYGBATCH', 2,
+                                             len(header)) + header)
+        self.assertRaises(ValueError, graphics.Batch.load,
+                          file, self.group_factory)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, graphics.Batch.load,
+            StringIO.StringIO('not a batch' * 4), self.group_factory)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,255 @@
+#!/usr/bin/python
+# $Id:$
+
+'''Test that compacting a vertex domain preserves the contents of its
+vertex lists while removing free space and shrinking its buffers, and that
+domains whose usage remains low are shrunk automatically.
+'''
+
+import random
+import unittest
+
+from pyglet import graphics
+from pyglet.gl import GL_POINTS
+from pyglet.graphics import vertexdomain
+
+__noninteractive = True
+
+class TestCompact(unittest.TestCase):
+    def create_lists(self, domain, count, indexed=False):
+        random.seed(1)
+        vertex_lists = []
+        for i in range(count):
+            size = random.randint(1, 8)
+            if indexed:
+                vertex_list = domain.create(size, size * 2)
+                vertex_list.indices[:] = \
+                    [vertex_list.start + j // 2 for j in range(size * 2)]
+            else:
+                vertex_list = domain.create(size)
+            vertex_list.vertices[:] = [i] * size * 2
+            vertex_lists.append(vertex_list)
+        return vertex_lists
+
+    def check_lists(self, vertex_lists, indexed=False):
+        for vertex_list in vertex_lists:
+            i = vertex_list.vertices[0]
+            self.assertEqual(list(vertex_list.vertices),
+                             [i] * vertex_list.count * 2)
+            if indexed:
+                self.assertEqual(list(vertex_list.indices),
+                    [vertex_list.start + j // 2
+                     for j in range(vertex_list.count * 2)])
+
+    def delete_some(self, vertex_lists):
+        for vertex_list in vertex_lists[::3] + vertex_lists[1::5]:
+            if vertex_list in vertex_lists:
+                vertex_list.delete()
+                vertex_lists.remove(vertex_list)
+
+    def test_compact(self):
+        domain = vertexdomain.create_domain('v2f/none')
+        vertex_lists = self.create_lists(domain, 100)
+        self.delete_some(vertex_lists)
+        self.assertTrue(domain.allocator.get_fragmentation() > 0)
+
+        domain.compact()
+        count = sum([vertex_list.count for vertex_list in vertex_lists])
+        self.assertEqual(domain.allocator.get_allocated_regions(),
+                         ([0], [count]))
+        self.assertEqual(domain.allocator.capacity,
+                         vertexdomain._nearest_pow2(count))
+        self.check_lists(vertex_lists)
+
+        # The domain remains usable
+        vertex_lists += self.create_lists(domain, 10)
+        self.check_lists(vertex_lists)
+
+    def test_compact_indexed(self):
+        domain = vertexdomain.create_indexed_domain('v2f/none')
+        vertex_lists = self.create_lists(domain, 100, indexed=True)
+        self.delete_some(vertex_lists)
+
+        domain.compact()
+        count = sum([vertex_list.count for vertex_list in vertex_lists])
+        self.assertEqual(domain.allocator.get_allocated_regions(),
+                         ([0], [count]))
+        self.assertEqual(domain.index_allocator.get_allocated_regions(),
+                         ([0], [count * 2]))
+        self.check_lists(vertex_lists, indexed=True)
+
+    def get_allocated_values(self, domain, indexed=False):
+        # The first coordinate of each allocated vertex or, if indexed, of
+        # the vertex referred to by each allocated index.
+        attribute = domain.attribute_names['vertices']
+        vertices = attribute.get_region(attribute.buffer, 0,
+                                        domain.allocator.capacity).array
+        if indexed:
+            allocator = domain.index_allocator
+        else:
+            allocator = domain.allocator
+        values = []
+        for start, size in zip(*allocator.get_allocated_regions()):
+            if indexed:
+                indices = domain.get_index_region(start, size).array
+            else:
+                indices = range(start, start + size)
+            values.extend([vertices[i * 2] for i in indices])
+        values.sort()
+        return values
+
+    def test_compact_unreferenced(self):
+        # Vertex lists that are no longer referenced, but were not deleted,
+        # are still drawn, so their vertices are kept by compaction.
+        for indexed in (False, True):
+            if indexed:
+                domain = vertexdomain.create_indexed_domain('v2f/none')
+            else:
+                domain = vertexdomain.create_domain('v2f/none')
+            vertex_lists = self.create_lists(domain, 100, indexed)
+            self.delete_some(vertex_lists)
+            values = self.get_allocated_values(domain, indexed)
+            del vertex_lists[1::4]
+            self.assertEqual(len(domain._vertex_lists), len(vertex_lists))
+
+            domain.compact()
+            self.assertEqual(len(domain.allocator.starts), 1)
+            self.assertEqual(self.get_allocated_values(domain, indexed),
+                             values)
+            self.check_lists(vertex_lists, indexed)
+
+    def test_compact_threshold(self):
+        domain = vertexdomain.create_domain('v2f/none')
+        domain.compact_threshold = 0.25
+        vertex_lists = [domain.create(4) for i in range(64)]
+        capacity = domain.allocator.capacity
+        for i, vertex_list in enumerate(vertex_lists):
+            vertex_list.vertices[:] = [i] * 8
+
+        # Deleting the last half of the lists does not fragment the domain.
+        for vertex_list in vertex_lists[32:]:
+            vertex_list.delete()
+        del vertex_lists[32:]
+        self.assertEqual(domain.allocator.capacity, capacity)
+
+        # Deleting every other list fragments it.
+        for vertex_list in vertex_lists[::2]:
+            vertex_list.delete()
+        del vertex_lists[::2]
+        self.assertTrue(domain.allocator.capacity < capacity)
+        self.check_lists(vertex_lists)
+
+    def test_batch(self):
+        batch = graphics.Batch(compact_threshold=0.5)
+        vertex_lists = [batch.add(1, GL_POINTS, None, ('v2f/none', (i, i)))
+                        for i in range(100)]
+        for vertex_list in vertex_lists[::2]:
+            vertex_list.delete()
+        vertex_lists = vertex_lists[1::2]
+        self.assertTrue(vertex_lists[0].domain.allocator.capacity <= 64)
+
+        for vertex_list in vertex_lists[:25]:
+            vertex_list.delete()
+        vertex_lists = vertex_lists[25:]
+        batch.compact()
+        domain = vertex_lists[0].domain
+        self.assertEqual(domain.allocator.get_allocated_regions(),
+                         ([0], [25]))
+        self.check_lists(vertex_lists)
+
+class TestShrink(unittest.TestCase):
+    def create_domain(self, indexed=False):
+        if indexed:
+            domain = vertexdomain.create_indexed_domain('v2f/none')
+        else:
+            domain = vertexdomain.create_domain('v2f/none')
+        domain.shrink_threshold = 0.25
+        domain.shrink_frames = 3
+        return domain
+
+    def draw(self, domain, frames):
+        # Each draw of the whole domain checks whether it should shrink.
+        for i in range(frames):
+            domain._check_shrink()
+
+    def test_shrink(self):
+        domain = self.create_domain()
+        vertex_lists = [domain.create(4) for i in range(64)]
+        for i, vertex_list in enumerate(vertex_lists):
+            vertex_list.vertices[:] = [i] * 8
+        keep = vertex_lists[1:3] + vertex_lists[37:39]
+        for vertex_list in vertex_lists:
+            if vertex_list not in keep:
+                vertex_list.delete()
+        vertex_lists = keep
+        self.assertEqual(domain.allocator.capacity, 256)
+
+        self.draw(domain, 2)
+        self.assertEqual(domain.allocator.capacity, 256)
+        self.draw(domain, 1)
+        self.assertEqual(domain.allocator.capacity, 128)
+        self.check_lists(vertex_lists)
+
+        # Usage is 16 / 64 after the next shrink, which is not below the
+        # threshold.
+        self.draw(domain, 10)
+        self.assertEqual(domain.allocator.capacity, 64)
+        self.check_lists(vertex_lists)
+
+    def test_hysteresis(self):
+        domain = self.create_domain()
+        vertex_lists = [domain.create(4) for i in range(16)]
+        for vertex_list in vertex_lists[1:]:
+            vertex_list.delete()
+
+        self.draw(domain, 2)
+        vertex_list = domain.create(16)
+        self.draw(domain, 2)
+        vertex_list.delete()
+        self.draw(domain, 2)
+        self.assertEqual(domain.allocator.capacity, 64)
+        self.draw(domain, 1)
+        self.assertEqual(domain.allocator.capacity, 32)
+
+    def test_default(self):
+        # Shrinking is disabled unless the option is set.
+        domain = vertexdomain.create_domain('v2f/none')
+        self.assertEqual(domain.shrink_threshold, None)
+        vertex_lists = [domain.create(4) for i in range(16)]
+        for vertex_list in vertex_lists[1:]:
+            vertex_list.delete()
+        self.draw(domain, 400)
+        self.assertEqual(domain.allocator.capacity, 64)
+
+    def test_disabled(self):
+        domain = self.create_domain()
+        domain.shrink_threshold = None
+        vertex_lists = [domain.create(4) for i in range(16)]
+        for vertex_list in vertex_lists[1:]:
+            vertex_list.delete()
+        self.draw(domain, 10)
+        self.assertEqual(domain.allocator.capacity, 64)
+
+    def test_indexed(self):
+        domain = self.create_domain(indexed=True)
+        vertex_lists = [domain.create(1, 16) for i in range(16)]
+        for i, vertex_list in enumerate(vertex_lists):
+            vertex_list.vertices[:] = [i, i]
+            vertex_list.indices[:] = [vertex_list.start] * 16
+        for vertex_list in vertex_lists[:13]:
+            vertex_list.delete()
+        vertex_lists = vertex_lists[13:]
+
+        # Only the index buffer is underused.
+        self.draw(domain, 3)
+        self.assertEqual(domain.allocator.capacity, 16)
+        self.assertEqual(domain.index_allocator.capacity, 128)
+        for i, vertex_list in enumerate(vertex_lists):
+            self.assertEqual(list(vertex_list.vertices), [i + 13, i + 13])
+            self.assertEqual(list(vertex_list.indices),
+                             [vertex_list.start] * 16)
+
+    check_lists = TestCompact.check_lists.im_func
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/python
+# $Id:$
+
+'''Test that a mappable buffer records the byte ranges changed since it was
+last bound, and merges them before they are uploaded.
+'''
+
+import ctypes
+import unittest
+
+from pyglet.graphics import vertexbuffer
+
+import base_buffer
+
+__noninteractive = True
+
+class TestMergeRanges(unittest.TestCase):
+    def merge(self, ranges, merge_gap):
+        return vertexbuffer._merge_ranges(list(ranges), merge_gap)
+
+    def test_single(self):
+        self.assertEqual(self.merge([(8, 16)], 0), [(8, 16)])
+
+    def test_overlapping(self):
+        self.assertEqual(self.merge([(8, 16), (0, 10), (12, 14)], 0),
+                         [(0, 16)])
+
+    def test_adjacent(self):
+        self.assertEqual(self.merge([(16, 32), (0, 16)], 0), [(0, 32)])
+
+    def test_gap(self):
+        ranges = [(0, 16), (100, 116), (120, 124), (1000, 1004)]
+        self.assertEqual(self.merge(ranges, 0),
+                         [(0, 16), (100, 116), (120, 124), (1000, 1004)])
+        self.assertEqual(self.merge(ranges, 4),
+                         [(0, 16), (100, 124), (1000, 1004)])
+        self.assertEqual(self.merge(ranges, 84),
+                         [(0, 124), (1000, 1004)])
+        self.assertEqual(self.merge(ranges, 1000), [(0, 1004)])
+
+    def test_contained(self):
+        self.assertEqual(self.merge([(0, 100), (10, 20), (200, 210)], 50),
+                         [(0, 100), (200, 210)])
+
+class TestMappableBuffer(base_buffer.BufferTestCase):
+    def setUp(self):
+        super(TestMappableBuffer, self).setUp()
+        self.buffer = self.create_buffer(
+            vertexbuffer.MappableVertexBufferObject, 4096)
+        self.buffer.merge_gap = 16
+
+    def test_set_data_region(self):
+        self.buffer.set_data_region('ab', 100, 2)
+        self.buffer.set_data_region('c', 102, 1)
+        self.buffer.set_data_region('d', 2000, 1)
+        self.assertEqual(self.buffer._dirty_ranges, [(100, 103), (2000, 2001)])
+        self.assertEqual(self.uploads, [])
+
+        self.buffer.bind()
+        self.assertEqual(self.uploads, [
+            ('glBufferSubData', 100, 'abc'),
+            ('glBufferSubData', 2000, 'd')])
+        self.assertEqual(self.buffer._dirty_ranges, [])
+        self.assertEqual(self.buffer.upload_calls, 2)
+        self.assertEqual(self.buffer.uploaded_bytes, 4)
+
+        # Nothing more is uploaded until the buffer changes again.
+        self.buffer.bind()
+        self.assertEqual(len(self.uploads), 2)
+
+    def test_region(self):
+        region = self.buffer.get_region(8, 4, ctypes.POINTER(ctypes.c_byte * 4))
+        region.array[:] = [1, 2, 3, 4]
+        self.assertEqual(self.buffer._dirty_ranges, [])
+        region.invalidate()
+        other = self.buffer.get_region(20, 2, ctypes.POINTER(ctypes.c_byte * 2))
+        other.array[:] = [5, 6]
+        other.invalidate()
+        self.assertEqual(self.buffer._dirty_ranges, [(8, 12), (20, 22)])
+
+        # Ranges separated by no more than merge_gap are uploaded together.
+        self.buffer.bind()
+        self.assertEqual(self.uploads, [
+            ('glBufferSubData', 8, '\1\2\3\4' + '\0' * 8 + '\5\6')])
+        self.assertEqual(self.buffer.upload_calls, 1)
+        self.assertEqual(self.buffer.uploaded_bytes, 14)
+
+    def test_whole_buffer(self):
+        self.buffer.map()
+        self.buffer.set_data_region('a', 0, 1)
+        self.buffer.bind()
+        self.assertEqual(len(self.uploads), 1)
+        name, offset, data = self.uploads[0]
+        self.assertEqual((name, offset), ('glBufferData', 0))
+        self.assertEqual(data, 'a' + '\0' * 4095)
+        self.assertEqual(self.buffer.uploaded_bytes, 4096)
+
+    def test_set_data(self):
+        # set_data uploads immediately and discards pending ranges.
+        self.buffer.set_data_region('a', 0, 1)
+        self.buffer.set_data('b' * 4096)
+        self.assertEqual(self.uploads, [('glBufferData', 0, 'b' * 4096)])
+        self.buffer.bind()
+        self.assertEqual(len(self.uploads), 1)
+        self.assertEqual(self.buffer.upload_calls, 1)
+
+    def test_reset_upload_counters(self):
+        self.buffer.set_data_region('a', 0, 1)
+        self.buffer.bind()
+        self.buffer.reset_upload_counters()
+        self.assertEqual(self.buffer.upload_calls, 0)
+        self.assertEqual(self.buffer.uploaded_bytes, 0)
+
+    def test_upload_statistics_disabled(self):
+        self.buffer.disable_upload_statistics()
+        self.buffer.set_data_region('a', 0, 1)
+        self.buffer.bind()
+        self.assertEqual(len(self.uploads), 1)
+        self.assertEqual(self.buffer.upload_calls, 0)
+        self.assertEqual(self.buffer.uploaded_bytes, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/python
+# $Id:$
+
+'''Test that indexed vertex domains store 16-bit indices until they hold
+more vertices than can be addressed with them, and are then converted to
+32-bit indices without changing the indices of their vertex lists, and
+back to 16-bit indices once compacted or shrunk to fit them again.
+'''
+
+import unittest
+
+from pyglet import graphics
+from pyglet.gl import *
+from pyglet.graphics import vertexdomain
+
+__noninteractive = True
+
+class TestIndexType(unittest.TestCase):
+    def test_default(self):
+        domain = vertexdomain.create_indexed_domain('v2f/none')
+        self.assertEqual(domain.index_gl_type, GL_UNSIGNED_SHORT)
+        self.assertEqual(domain.index_element_size, 2)
+
+        vertex_list = domain.create(65536, 3)
+        vertex_list.indices[:] = [0, 1, 65535]
+        self.assertEqual(domain.index_gl_type, GL_UNSIGNED_SHORT)
+        self.assertEqual(list(vertex_list.indices), [0, 1, 65535])
+
+    def test_promote(self):
+        domain = vertexdomain.create_indexed_domain('v2f/none')
+        vertex_lists = []
+        for i in range(4):
+            vertex_list = domain.create(4, 6)
+            vertex_list.indices = [vertex_list.start + j for j in range(6)]
+            vertex_lists.append(vertex_list)
+
+        large = domain.create(70000, 2)
+        self.assertEqual(domain.index_gl_type, GL_UNSIGNED_INT)
+        self.assertEqual(domain.index_element_size, 4)
+        large.indices[:] = [large.start, large.start + 69999]
+        self.assertEqual(list(large.indices),
+                         [large.start, large.start + 69999])
+
+        for vertex_list in vertex_lists:
+            self.assertEqual(list(vertex_list.indices),
+                [vertex_list.start + j for j in range(6)])
+
+        # Compacting with the large list still allocated keeps 32-bit
+        # indices.
+        vertex_lists[1].delete()
+        domain.compact()
+        self.assertEqual(domain.index_gl_type, GL_UNSIGNED_INT)
+        self.assertEqual(list(vertex_lists[3].indices), range(8, 14))
+
+        # Deleting it and compacting converts back to 16-bit indices.
+        large.delete()
+        domain.compact()
+        self.assertEqual(domain.index_gl_type, GL_UNSIGNED_SHORT)
+        self.assertEqual(domain.index_element_size, 2)
+        self.assertEqual(list(vertex_lists[0].indices), range(0, 6))
+        self.assertEqual(list(vertex_lists[3].indices), range(8, 14))
+
+    def test_demote_shrink(self):
+        domain = vertexdomain.create_indexed_domain('v2f/none')
+        domain.shrink_threshold = 0.25
+        domain.shrink_frames = 1
+        vertex_list = domain.create(4, 6)
+        vertex_list.indices = range(6)
+        large = domain.create(70000, 2)
+        self.assertEqual(domain.index_gl_type, GL_UNSIGNED_INT)
+        large.delete()
+
+        # Each shrink halves the capacity; the type is converted back once
+        # the capacity can be addressed with 16-bit indices.
+        while domain.allocator.capacity > 65536:
+            self.assertEqual(domain.index_gl_type, GL_UNSIGNED_INT)
+            domain._check_shrink()
+        self.assertEqual(domain.index_gl_type, GL_UNSIGNED_SHORT)
+        self.assertEqual(list(vertex_list.indices), range(6))
+
+    def test_explicit(self):
+        domain = vertexdomain.IndexedVertexDomain(
+            [vertexdomain.create_attribute_usage('v2f/none')],
+            GL_UNSIGNED_INT)
+        domain.create(4, 6)
+        self.assertEqual(domain.index_gl_type, GL_UNSIGNED_INT)
+
+    def test_batch(self):
+        batch = graphics.Batch()
+        vertex_list = batch.add_indexed(4, GL_TRIANGLES, None,
+                                        [0, 1, 2, 0, 2, 3], 'v2f/none')
+        large = batch.add_indexed(70000, GL_TRIANGLES, None,
+                                  [0, 1, 69999], 'v2f/none')
+        self.assertEqual(large.domain, vertex_list.domain)
+        self.assertEqual(list(large.indices), [4, 5, 70003])
+        self.assertEqual(list(vertex_list.indices), [0, 1, 2, 0, 2, 3])
+
+if __name__ == '__main__':
+    unittest.main()
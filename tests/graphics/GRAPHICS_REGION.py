@@ -0,0 +1,101 @@
+#!/usr/bin/python
+# $Id:$
+
+'''Test that interleaved attribute regions read and write the correct
+components of the underlying buffer, with and without NumPy.
+'''
+
+import ctypes
+import unittest
+
+from pyglet.graphics import vertexattribute, vertexbuffer
+
+__noninteractive = True
+
+class TestRegion(unittest.TestCase):
+    def create_attributes(self, count):
+        position = vertexattribute.create_attribute('v2f')
+        color = vertexattribute.create_attribute('c4f')
+        vertexattribute.interleave_attributes([position, color])
+        buffer = vertexbuffer.VertexArray(position.stride * count)
+        return buffer, position, color
+
+    def check_region(self, region_class):
+        buffer, position, color = self.create_attributes(4)
+
+        def get_region(attribute, start, count):
+            byte_start = attribute.stride * start + attribute.offset
+            elem_stride = attribute.stride // attribute.align
+            elem_offset = attribute.offset // attribute.align
+            ptr_type = ctypes.POINTER(
+                attribute.c_type * (count * elem_stride - elem_offset))
+            region = buffer.get_region(byte_start,
+                attribute.stride * count - attribute.offset, ptr_type)
+            return region_class(region, attribute.count * count,
+                                attribute.count, elem_stride)
+
+        positions = get_region(position, 0, 4)
+        colors = get_region(color, 0, 4)
+
+        positions[:] = range(8)
+        colors[:] = [i * 0.5 for i in range(16)]
+        self.assertEqual(list(positions[:]), range(8))
+        self.assertEqual(list(colors[:]), [i * 0.5 for i in range(16)])
+
+        # Aligned partial slice
+        colors[4:8] = [9, 9, 9, 9]
+        self.assertEqual(list(colors[4:8]), [9, 9, 9, 9])
+        self.assertEqual(list(positions[:]), range(8))
+
+        # Single elements
+        positions[5] = 20
+        self.assertEqual(positions[5], 20)
+        self.assertEqual(colors[4], 9)
+
+        # Regions not starting at the first vertex
+        positions = get_region(position, 2, 2)
+        self.assertEqual(list(positions[:]), [4, 20, 6, 7])
+        return positions
+
+    def test_indirect(self):
+        self.check_region(vertexbuffer.IndirectArrayRegion)
+
+    def test_strided(self):
+        if vertexbuffer.numpy is None:
+            return
+        positions = self.check_region(vertexbuffer.StridedArrayRegion)
+
+        # Slices not on vertex boundaries
+        positions[1:3] = [10, 11]
+        self.assertEqual(list(positions[:]), [4, 10, 11, 7])
+        self.assertEqual(list(positions[1::2]), [10, 7])
+
+        # Slices are read as lists, as from IndirectArrayRegion.
+        self.assertEqual(positions[:], [4, 10, 11, 7])
+        self.assertEqual(type(positions[:2]), list)
+        self.assertEqual(type(positions[1::2]), list)
+
+    def test_strided_array_assignment(self):
+        numpy = vertexbuffer.numpy
+        if numpy is None:
+            return
+        buffer, position, color = self.create_attributes(3)
+        colors = color.get_region(buffer, 0, 3)
+        self.assertTrue(isinstance(colors, vertexbuffer.StridedArrayRegion))
+        colors[:] = numpy.arange(12, dtype='f4')
+        self.assertEqual(list(colors.view[2]), [8, 9, 10, 11])
+        self.assertRaises(ValueError, colors.__setitem__,
+                          slice(None), numpy.arange(8))
+
+    def test_set_region_array(self):
+        numpy = vertexbuffer.numpy
+        if numpy is None:
+            return
+        position = vertexattribute.create_attribute('v3f')
+        buffer = vertexbuffer.VertexArray(position.stride * 4)
+        position.set_region(buffer, 1, 2, numpy.arange(6))
+        region = position.get_region(buffer, 0, 4)
+        self.assertEqual(list(region.array), [0] * 3 + range(6) + [0] * 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/python
+# $Id:$
+
+'''Test that a batch with statistics enabled counts the calls made to draw
+it, and that one without statistics draws with an uninstrumented draw list.
+
+The vertex domains' draw methods are replaced so that no OpenGL context is
+needed.
+'''
+
+import unittest
+
+from pyglet import graphics
+from pyglet.gl import GL_POINTS
+from pyglet.graphics import vertexbuffer
+
+__noninteractive = True
+
+class CountingGroup(graphics.Group):
+    def set_state(self):
+        pass
+
+    def unset_state(self):
+        pass
+
+class TestStatistics(unittest.TestCase):
+    def setUp(self):
+        self.batch = graphics.Batch()
+        self.groups = [graphics.OrderedGroup(i, CountingGroup())
+                       for i in range(3)]
+        self.vertex_lists = []
+        for group in self.groups:
+            for i in range(4):
+                self.vertex_lists.append(
+                    self.batch.add(2, GL_POINTS, group, 'v2f/none'))
+
+    def draw(self):
+        self.batch._update_draw_list()
+        for domain_map in self.batch.group_map.values():
+            for domain in domain_map.values():
+                domain.draw = self.draw_domain
+        self.batch.draw()
+
+    def draw_domain(self, mode):
+        pass
+
+    def test_disabled(self):
+        self.assertEqual(self.batch.statistics, None)
+        self.batch._update_draw_list()
+        draw_list = list(self.batch._draw_list)
+        self.assertEqual(len(draw_list), 15)
+
+        self.batch.enable_statistics()
+        self.batch._update_draw_list()
+        self.assertEqual(len(self.batch._draw_list), 17)
+
+        self.batch.disable_statistics()
+        self.batch._update_draw_list()
+        self.assertEqual(self.batch._draw_list, draw_list)
+
+    def test_frame(self):
+        statistics = self.batch.enable_statistics()
+        self.assertEqual(statistics.frame, None)
+        self.assertEqual(statistics.get_summary(), (None, None))
+
+        self.draw()
+        frame = statistics.frame
+        self.assertEqual(frame.draw_calls, 3)
+        self.assertEqual(frame.draw_ranges, 3)
+        self.assertEqual(frame.vertices, 24)
+        self.assertEqual(frame.set_state_calls, 6)
+        self.assertEqual(frame.unset_state_calls, 6)
+        self.assertEqual(frame.domains, 3)
+        self.assertEqual(frame.fragmentation, 0)
+        self.assertEqual(frame.uploaded_bytes, 0)
+
+    def test_fragmentation(self):
+        statistics = self.batch.enable_statistics()
+        for vertex_list in self.vertex_lists[1::2]:
+            vertex_list.delete()
+        self.draw()
+        frame = statistics.frame
+        self.assertEqual(frame.vertices, 12)
+        self.assertEqual(frame.draw_ranges, 6)
+        self.assertTrue(frame.fragmentation > 0)
+
+    def test_uploads(self):
+        statistics = self.batch.enable_statistics()
+        buffer = self.vertex_lists[0].domain._get_buffers()[0]
+        self.assertEqual(buffer.upload_counter,
+                         vertexbuffer._null_upload_counter)
+        def draw_domain(mode):
+            buffer.upload_counter.count(100)
+        self.draw_domain = draw_domain
+        self.draw()
+        self.assertEqual(statistics.frame.uploaded_bytes, 300)
+        self.assertEqual(statistics.frame.upload_calls, 3)
+
+        # Buffers stop counting when statistics are disabled.
+        self.batch.disable_statistics()
+        self.assertEqual(buffer.upload_counter,
+                         vertexbuffer._null_upload_counter)
+        self.assertEqual(buffer.uploaded_bytes, 0)
+
+    def test_summary(self):
+        statistics = self.batch.enable_statistics(history=3)
+        for i in range(2):
+            self.draw()
+        self.vertex_lists.pop().delete()
+        for i in range(3):
+            self.draw()
+        self.assertEqual(len(statistics.frames), 3)
+        mean, maximum = statistics.get_summary()
+        self.assertEqual(mean.vertices, 22)
+        self.assertEqual(maximum.vertices, 22)
+
+        self.vertex_lists.pop().delete()
+        self.draw()
+        mean, maximum = statistics.get_summary()
+        self.assertAlmostEqual(mean.vertices, 64 / 3.)
+        self.assertEqual(maximum.vertices, 22)
+
+        statistics.reset()
+        self.assertEqual(statistics.frame, None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/python
+# $Id:$
+
+'''Test that a streaming buffer uploads its data to the next segment of the
+ring each time it is bound after a change, and orphans its storage when the
+ring wraps around.
+'''
+
+import unittest
+
+from pyglet.graphics import vertexbuffer
+
+import base_buffer
+
+__noninteractive = True
+
+class TestStreamingBuffer(base_buffer.BufferTestCase):
+    def setUp(self):
+        super(TestStreamingBuffer, self).setUp()
+        self.buffer = self.create_buffer(
+            vertexbuffer.StreamingVertexBufferObject, 4)
+
+    def change(self, value):
+        self.buffer.set_data_region(value * 4, 0, 4)
+
+    def test_segments(self):
+        # The first bind uploads to the first segment.
+        self.change('a')
+        self.buffer.bind()
+        self.assertEqual(self.buffer.ptr, 0)
+        self.assertEqual(self.uploads[-1], ('glBufferSubData', 0, 'aaaa'))
+
+        # Binding again without a change uploads nothing.
+        del self.uploads[:]
+        self.buffer.bind()
+        self.assertEqual(self.buffer.ptr, 0)
+        self.assertEqual(self.uploads, [])
+
+        offsets = []
+        for value in 'bcdefg':
+            self.change(value)
+            self.buffer.bind()
+            offsets.append(self.buffer.ptr)
+        self.assertEqual(offsets, [4, 8, 0, 4, 8, 0])
+        self.assertEqual(self.buffer.upload_calls, 7)
+        self.assertEqual(self.buffer.uploaded_bytes, 28)
+
+    def test_wraparound(self):
+        for value in 'abc':
+            self.change(value)
+            self.buffer.bind()
+        self.assertEqual(self.uploads, [
+            ('glBufferData', 0, None),
+            ('glBufferSubData', 0, 'aaaa'),
+            ('glBufferSubData', 4, 'bbbb'),
+            ('glBufferSubData', 8, 'cccc')])
+
+        # Returning to the first segment orphans the storage of all three.
+        del self.uploads[:]
+        self.change('d')
+        self.buffer.bind()
+        self.assertEqual(self.uploads, [
+            ('glBufferData', 0, None),
+            ('glBufferSubData', 0, 'dddd')])
+
+    def test_partial_change(self):
+        # A change to part of the data uploads all of it.
+        self.change('a')
+        self.buffer.bind()
+        self.buffer.set_data_region('b', 2, 1)
+        self.buffer.bind()
+        self.assertEqual(self.uploads[-1], ('glBufferSubData', 4, 'aaba'))
+
+    def test_resize(self):
+        self.change('a')
+        self.buffer.bind()
+        self.buffer.resize(6)
+        self.assertEqual(self.uploads[-1], ('glBufferData', 0, None))
+
+        # The data is uploaded to the first segment of the new storage.
+        self.buffer.bind()
+        self.assertEqual(self.buffer.ptr, 0)
+        self.assertEqual(self.uploads[-1],
+                         ('glBufferSubData', 0, 'aaaa\0\0'))
+        self.change('b')
+        self.buffer.bind()
+        self.assertEqual(self.buffer.ptr, 6)
+
+if __name__ == '__main__':
+    unittest.main()
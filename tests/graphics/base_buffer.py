@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+'''Base class for tests of buffer objects, which records the OpenGL calls
+made by the buffers instead of making them, so that no context is needed.
+'''
+
+__docformat__ = 'restructuredtext'
+__version__ = '$Id: $'
+
+import ctypes
+import unittest
+
+import pyglet
+from pyglet.graphics import vertexbuffer
+
+class FakeContext(object):
+    _workaround_vbo_finish = False
+
+    def delete_buffer(self, id):
+        pass
+
+class BufferTestCase(unittest.TestCase):
+    '''Test case recording the buffer uploads made by `vertexbuffer`.
+
+    `uploads` is a list of ``(function name, offset, bytes)`` for each call
+    to ``glBufferData`` or ``glBufferSubData``; ``bytes`` is None if the
+    call only allocated storage.
+    '''
+    def setUp(self):
+        self.uploads = []
+        self._old_context = pyglet.gl.current_context
+        pyglet.gl.current_context = FakeContext()
+
+        self._old_functions = {}
+        functions = {
+            'glGenBuffers': self.glGenBuffers,
+            'glDeleteBuffers': self.ignore,
+            'glBindBuffer': self.ignore,
+            'glPushClientAttrib': self.ignore,
+            'glPopClientAttrib': self.ignore,
+            'glBufferData': self.glBufferData,
+            'glBufferSubData': self.glBufferSubData,
+        }
+        for name, function in functions.items():
+            self._old_functions[name] = getattr(vertexbuffer, name)
+            setattr(vertexbuffer, name, function)
+
+    def tearDown(self):
+        for name, function in self._old_functions.items():
+            setattr(vertexbuffer, name, function)
+        pyglet.gl.current_context = self._old_context
+
+    def ignore(self, *args):
+        pass
+
+    def glGenBuffers(self, n, id):
+        id.value = 1
+
+    def glBufferData(self, target, size, data, usage):
+        if data is not None:
+            data = ctypes.string_at(data, size)
+        self.uploads.append(('glBufferData', 0, data))
+
+    def glBufferSubData(self, target, offset, size, data):
+        self.uploads.append(('glBufferSubData', offset,
+                             ctypes.string_at(data, size)))
+
+    def create_buffer(self, cls, size):
+        # Create a buffer counting its uploads.
+        buffer = cls(size, vertexbuffer.GL_ARRAY_BUFFER,
+                     vertexbuffer.GL_DYNAMIC_DRAW)
+        buffer.enable_upload_statistics()
+        del self.uploads[:]
+        return buffer
@@ -0,0 +1,131 @@
+#!/usr/bin/python
+# $Id:$
+
+'''Test that animated sprites advance their frames on time, sharing a single
+function scheduled on the clock.
+'''
+
+import unittest
+
+from pyglet import clock
+from pyglet import graphics
+from pyglet import image
+from pyglet import sprite
+from pyglet.gl import *
+
+__noninteractive = True
+
+class TestSpriteAnimation(unittest.TestCase):
+    def setUp(self):
+        self.time = 0.
+        self.old_clock = clock.get_default()
+        self.clock = clock.Clock(time_function=lambda: self.time)
+        clock.set_default(self.clock)
+
+        # Textures are not created in OpenGL, so the batch is never drawn.
+        self.textures = [image.Texture(16, 16, GL_TEXTURE_2D, i + 1)
+                         for i in range(3)]
+        self.batch = graphics.Batch()
+        self.sprites = []
+
+    def tearDown(self):
+        for s in self.sprites:
+            if s._vertex_list is not None:
+                s.delete()
+        clock.set_default(self.old_clock)
+
+    def tick(self, dt):
+        self.time += dt
+        self.clock.tick()
+
+    def create_sprite(self, durations, loop=True):
+        animation = image.Animation.from_image_sequence(
+            self.textures[:len(durations)], 1., loop)
+        for frame, duration in zip(animation.frames, durations):
+            frame.duration = duration
+        s = sprite.Sprite(animation, batch=self.batch)
+        s.ends = 0
+        def on_animation_end():
+            s.ends += 1
+        s.push_handlers(on_animation_end)
+        self.sprites.append(s)
+        return s
+
+    def get_scheduled(self):
+        return (len(self.clock._schedule_items) +
+                len(self.clock._schedule_interval_items))
+
+    def test_frames(self):
+        s = self.create_sprite([1., 2., 1.])
+        self.assertEqual(s._texture.id, 1)
+        self.tick(0.5)
+        self.assertEqual(s._texture.id, 1)
+        self.tick(0.5)
+        self.assertEqual(s._texture.id, 2)
+        self.tick(1.5)
+        self.assertEqual(s._texture.id, 2)
+        self.tick(0.5)
+        self.assertEqual(s._texture.id, 3)
+        self.assertEqual(s.ends, 0)
+        self.tick(1.)
+        self.assertEqual(s._texture.id, 1)
+        self.assertEqual(s.ends, 1)
+
+    def test_lateness(self):
+        s = self.create_sprite([1., 1., 1.])
+        self.tick(1.25)
+        self.assertEqual(s._texture.id, 2)
+        # The late frame is shown for less than its duration.
+        self.tick(0.75)
+        self.assertEqual(s._texture.id, 3)
+
+    def test_end(self):
+        s = self.create_sprite([1., None], loop=False)
+        self.tick(1.)
+        self.assertEqual(s._texture.id, 2)
+        self.assertEqual(s.ends, 1)
+        self.assertEqual(self.get_scheduled(), 0)
+
+    def test_shared(self):
+        sprites = [self.create_sprite([1. + i * 0.1, 1.]) for i in range(10)]
+        self.assertEqual(self.get_scheduled(), 1)
+        self.tick(1.05)
+        self.assertEqual([s._texture.id for s in sprites],
+                         [2] + [1] * 9)
+        self.assertEqual(self.get_scheduled(), 1)
+        self.tick(1.)
+        self.assertEqual([s._texture.id for s in sprites], [1] + [2] * 9)
+
+    def test_delete(self):
+        sprites = [self.create_sprite([1., 1.]) for i in range(3)]
+        sprites[0].delete()
+        self.tick(1.)
+        self.assertEqual([s._texture.id for s in sprites[1:]], [2, 2])
+        for s in sprites[1:]:
+            s.delete()
+        self.assertEqual(self.get_scheduled(), 0)
+
+    def test_set_image(self):
+        s = self.create_sprite([1., 1.])
+        s.image = self.textures[2]
+        self.assertEqual(self.get_scheduled(), 0)
+        self.tick(1.)
+        self.assertEqual(s._texture.id, 3)
+
+    def test_virtual_clock(self):
+        # The animator follows the time of a substituted clock.
+        virtual = clock.VirtualClock(start_time=100.)
+        clock.set_default(virtual)
+        s = self.create_sprite([1., 2.])
+        virtual.advance(0.99)
+        self.assertEqual(s._texture.id, 1)
+        virtual.advance(0.02)
+        self.assertEqual(s._texture.id, 2)
+        self.assertEqual(len(virtual._schedule_items), 1)
+        virtual.advance(2.)
+        self.assertEqual(s._texture.id, 1)
+        s.delete()
+        self.assertEqual(len(virtual._schedule_items), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/python
+# $Id:$
+
+'''Test that a sprite array computes the same vertices as individual
+sprites, with and without NumPy.
+'''
+
+import unittest
+
+from pyglet import graphics
+from pyglet import image
+from pyglet import sprite
+from pyglet.gl import *
+
+__noninteractive = True
+
+class TestSpriteArray(unittest.TestCase):
+    def setUp(self):
+        # Textures are not created in OpenGL, so the batch is never drawn.
+        texture = image.Texture(64, 64, GL_TEXTURE_2D, 1)
+        texture.tex_coords = (0., 0., 0., 1., 0., 0., 1., 1., 0., 0., 1., 0.)
+        self.images = [texture.get_region(0, 0, 16, 16),
+                       texture.get_region(16, 0, 32, 8)]
+        self.images[1].anchor_x = 16
+        self.images[1].anchor_y = 4
+
+    def get_expected(self, x, y, rotation, scale, image_index):
+        # The vertices computed by Sprite, which are truncated to integers.
+        img = self.images[image_index]
+        s = sprite.Sprite.__new__(sprite.Sprite)
+        s._texture = img
+        s._x = x
+        s._y = y
+        s._rotation = rotation
+        s._scale = scale
+        class VertexList(object):
+            vertices = [0] * 8
+        s._vertex_list = VertexList()
+        s._update_position()
+        return list(s._vertex_list.vertices)
+
+    def check(self, numpy):
+        old_numpy = sprite.numpy
+        sprite.numpy = numpy
+        try:
+            batch = graphics.Batch()
+            sprites = sprite.SpriteArray(self.images, 3, batch=batch,
+                                         usage='none')
+            for i, (x, y, rotation, scale, image_index) in enumerate([
+                    (10, 5, 0, 1, 0), (20, 15, 90, 2, 1), (30, 25, 0, 1, 1)]):
+                sprites.x[i] = x
+                sprites.y[i] = y
+                sprites.rotation[i] = rotation
+                sprites.scale[i] = scale
+                sprites.image_index[i] = image_index
+            sprites.red[1] = 10
+            sprites.opacity[2] = 128
+            sprites.update()
+
+            vertices = list(sprites._vertex_list.vertices)
+            for i in range(3):
+                x, y = sprites.x[i], sprites.y[i]
+                expected = self.get_expected(x, y, sprites.rotation[i],
+                    sprites.scale[i], sprites.image_index[i])
+                for a, b in zip(vertices[i * 8:i * 8 + 8], expected):
+                    self.assertTrue(abs(a - b) < 1.01, (a, b))
+
+            colors = list(sprites._vertex_list.colors)
+            self.assertEqual(colors[16:48],
+                             [10, 255, 255, 255] * 4 + [255, 255, 255, 128] * 4)
+            tex_coords = list(sprites._vertex_list.tex_coords)
+            self.assertEqual(tex_coords[12:24],
+                             [float(t) for t in self.images[1].tex_coords])
+
+            sprites.visible[0] = False
+            sprites.update()
+            self.assertEqual(list(sprites._vertex_list.vertices[:8]), [0] * 8)
+
+            # Resizing keeps properties
+            sprites.resize(5)
+            self.assertEqual(list(sprites.x), [10, 20, 30, 0, 0])
+            self.assertEqual(list(sprites.scale), [1, 2, 1, 1, 1])
+            self.assertEqual(len(sprites._vertex_list.vertices), 40)
+            sprites.resize(2)
+            self.assertEqual(list(sprites.y), [5, 15])
+            sprites.delete()
+        finally:
+            sprite.numpy = old_numpy
+
+    def test_numpy(self):
+        if sprite.numpy is not None:
+            self.check(sprite.numpy)
+
+    def test_sequential(self):
+        self.check(None)
+
+    def test_texture(self):
+        other = image.Texture(64, 64, GL_TEXTURE_2D, 2)
+        self.assertRaises(ValueError, sprite.SpriteArray,
+                          [self.images[0], other], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+#!/usr/bin/python
+# $Id:$
+
+'''Test that a sprite culler hides exactly the sprites outside the culling
+rectangle, and follows sprites as they move.
+'''
+
+import unittest
+
+from pyglet import graphics
+from pyglet import image
+from pyglet import sprite
+from pyglet.gl import *
+
+__noninteractive = True
+
+class TestSpriteCuller(unittest.TestCase):
+    def setUp(self):
+        # Textures are not created in OpenGL, so the batch is never drawn.
+        self.texture = image.Texture(16, 16, GL_TEXTURE_2D, 1)
+        self.batch = graphics.Batch()
+        self.culler = sprite.SpriteCuller(cell_size=64)
+
+    def create_sprite(self, x, y, img=None, **kwargs):
+        if img is None:
+            img = self.texture
+        s = sprite.Sprite(img, x, y, batch=self.batch, **kwargs)
+        self.culler.add(s)
+        return s
+
+    def is_hidden(self, s):
+        if s._deferred:
+            self.batch.flush_updates()
+        return list(s._vertex_list.vertices) == [0] * 8
+
+    def test_cull(self):
+        sprites = [self.create_sprite(x, y)
+                   for x in range(-100, 500, 50)
+                   for y in range(-100, 500, 50)]
+        self.culler.cull(0, 0, 200, 100)
+        for s in sprites:
+            inside = (-16 <= s.x <= 200) and (-16 <= s.y <= 100)
+            self.assertEqual(self.is_hidden(s), not inside)
+            self.assertTrue(s.visible)
+
+        self.culler.cull(1000, 1000, 200, 100)
+        for s in sprites:
+            self.assertTrue(self.is_hidden(s))
+
+    def test_move(self):
+        s = self.create_sprite(500, 500)
+        self.culler.cull(0, 0, 100, 100)
+        self.assertTrue(self.is_hidden(s))
+
+        s.set_position(50, 50)
+        self.culler.cull(0, 0, 100, 100)
+        self.assertEqual(self.culler._sprite_cells[s], (0, 0, 1, 1))
+        self.assertFalse(self.is_hidden(s))
+        self.assertEqual(list(s._vertex_list.vertices),
+                         [50, 50, 66, 50, 66, 66, 50, 66])
+
+        s.x = -100
+        self.culler.cull(0, 0, 100, 100)
+        self.assertTrue(self.is_hidden(s))
+
+    def test_rotation_and_scale(self):
+        s = self.create_sprite(-20, 0)
+        self.culler.cull(0, 0, 100, 100)
+        self.assertTrue(self.is_hidden(s))
+        s.scale = 2
+        self.culler.cull(0, 0, 100, 100)
+        self.assertFalse(self.is_hidden(s))
+        s.scale = 1
+        s.rotation = 180
+        self.culler.cull(0, 0, 100, 100)
+        self.assertTrue(self.is_hidden(s))
+
+    def test_visible(self):
+        s = self.create_sprite(10, 10)
+        s.visible = False
+        self.culler.cull(0, 0, 100, 100)
+        self.assertTrue(self.is_hidden(s))
+        s.visible = True
+        self.assertFalse(self.is_hidden(s))
+
+    def test_remove(self):
+        s = self.create_sprite(500, 500)
+        self.culler.cull(0, 0, 100, 100)
+        self.assertTrue(self.is_hidden(s))
+        self.culler.remove(s)
+        self.assertFalse(self.is_hidden(s))
+        self.assertEqual(self.culler._cells, {})
+
+        t = self.create_sprite(500, 500)
+        t.delete()
+        self.assertEqual(self.culler._cells, {})
+        self.assertEqual(self.culler._sprite_cells, {})
+
+    def test_lazy_bounds(self):
+        # Bounds are computed once for any number of changes between culls.
+        s = self.create_sprite(500, 500)
+        computed = []
+        compute_bounds = s._compute_bounds
+        def counting_compute_bounds():
+            computed.append(True)
+            return compute_bounds()
+        s._compute_bounds = counting_compute_bounds
+        for angle in range(0, 360, 10):
+            s.rotation = angle
+            s.set_position(600 - angle, 100)
+        self.assertEqual(computed, [])
+        self.assertTrue(s in self.culler._pending)
+        self.culler.cull(0, 0, 300, 300)
+        self.assertEqual(len(computed), 1)
+        self.assertFalse(self.is_hidden(s))
+        self.culler.cull(0, 0, 300, 300)
+        self.assertEqual(len(computed), 1)
+
+    def test_deferred_flush(self):
+        # The cells of a deferred sprite are updated when it is flushed.
+        s = self.create_sprite(500, 500, deferred=True)
+        s.rotation = 45
+        s.set_position(50, 50)
+        self.assertEqual(self.culler._sprite_cells[s], (7, 7, 8, 8))
+        self.batch.flush_updates()
+        self.assertEqual(self.culler._sprite_cells[s], (0, 0, 1, 0))
+        self.assertEqual(self.culler._pending, set())
+
+    def test_animation(self):
+        # A frame of a different size moves the sprite to its new cells.
+        large = image.Texture(128, 128, GL_TEXTURE_2D, 2)
+        animation = image.Animation.from_image_sequence(
+            [self.texture, large], 1.)
+        s = self.create_sprite(-60, 10, img=animation)
+        self.culler.cull(0, 0, 100, 100)
+        self.assertTrue(self.is_hidden(s))
+        s._animate(0)
+        self.assertTrue(s in self.culler._pending)
+        self.culler.cull(0, 0, 100, 100)
+        self.assertFalse(self.is_hidden(s))
+        sprite._animator.remove(s)
+
+    def test_deferred(self):
+        s = self.create_sprite(500, 500, deferred=True)
+        self.culler.cull(0, 0, 100, 100)
+        self.assertTrue(self.is_hidden(s))
+        s.set_position(50, 50)
+        self.culler.cull(0, 0, 100, 100)
+        self.assertFalse(self.is_hidden(s))
+
+if __name__ == '__main__':
+    unittest.main()
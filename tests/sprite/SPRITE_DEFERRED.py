@@ -0,0 +1,104 @@
+#!/usr/bin/python
+# $Id:$
+
+'''Test that a deferred sprite updates its vertices once, when its batch is
+drawn, and that they then match those of an ordinary sprite.
+'''
+
+import unittest
+
+from pyglet import graphics
+from pyglet import image
+from pyglet import sprite
+from pyglet.gl import *
+
+__noninteractive = True
+
+class CountingSprite(sprite.Sprite):
+    position_updates = 0
+    color_updates = 0
+
+    def _update_position(self):
+        self.position_updates += 1
+        super(CountingSprite, self)._update_position()
+
+    def _update_color(self):
+        self.color_updates += 1
+        super(CountingSprite, self)._update_color()
+
+class TestDeferredSprite(unittest.TestCase):
+    def setUp(self):
+        # Textures are not created in OpenGL, so batches are only flushed,
+        # never drawn.
+        self.texture = image.Texture(16, 16, GL_TEXTURE_2D, 1)
+        self.batch = graphics.Batch()
+
+    def create_sprites(self, batch):
+        deferred = CountingSprite(self.texture, batch=batch, deferred=True)
+        immediate = CountingSprite(self.texture, batch=graphics.Batch())
+        return deferred, immediate
+
+    def modify(self, s):
+        s.x = 10
+        s.y = 20
+        s.rotation = 45
+        s.scale = 2
+        s.opacity = 128
+        s.color = (255, 0, 0)
+
+    def check_equal(self, deferred, immediate):
+        self.assertEqual(list(deferred._vertex_list.vertices),
+                         list(immediate._vertex_list.vertices))
+        self.assertEqual(list(deferred._vertex_list.colors),
+                         list(immediate._vertex_list.colors))
+
+    def test_flush(self):
+        deferred, immediate = self.create_sprites(self.batch)
+        self.assertEqual(deferred.position_updates, 1)
+        self.assertEqual(deferred.color_updates, 1)
+        vertices = list(deferred._vertex_list.vertices)
+
+        self.modify(deferred)
+        self.modify(immediate)
+        self.assertEqual(deferred.position_updates, 1)
+        self.assertEqual(deferred.color_updates, 1)
+        self.assertEqual(list(deferred._vertex_list.vertices), vertices)
+
+        self.batch.flush_updates()
+        self.assertEqual(deferred.position_updates, 2)
+        self.assertEqual(deferred.color_updates, 2)
+        self.assertEqual(immediate.position_updates, 5)
+        self.assertEqual(immediate.color_updates, 3)
+        self.check_equal(deferred, immediate)
+
+        # Nothing is pending after the flush.
+        self.batch.flush_updates()
+        self.assertEqual(deferred.position_updates, 2)
+
+    def test_position_only(self):
+        deferred, immediate = self.create_sprites(self.batch)
+        deferred.set_position(5, 6)
+        deferred.visible = False
+        self.batch.flush_updates()
+        self.assertEqual(deferred.position_updates, 2)
+        self.assertEqual(deferred.color_updates, 1)
+        self.assertEqual(list(deferred._vertex_list.vertices), [0] * 8)
+
+    def test_delete(self):
+        deferred, immediate = self.create_sprites(self.batch)
+        deferred.x = 10
+        deferred.delete()
+        self.batch.flush_updates()
+        self.assertEqual(deferred.position_updates, 1)
+
+    def test_migrate(self):
+        deferred, immediate = self.create_sprites(self.batch)
+        deferred.x = 10
+        batch = graphics.Batch()
+        deferred.batch = batch
+        batch.flush_updates()
+        immediate.x = 10
+        self.check_equal(deferred, immediate)
+
+if __name__ == '__main__':
+    unittest.main()